@@ -0,0 +1,77 @@
+"""Collision time vs. live-sprite count: linear spritecollide vs. SpatialGroup.
+
+Reports the query alone and a full step: move every sprite down its lane
+and run the query, as Game.update() does. Sprites never change lane, so
+the grid needs no upkeep while they move.
+
+Usage: python benchmarks/bench_collisions.py
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+import racer2
+
+COUNTS = [10, 100, 1000, 5000, 20000]
+QUERIES = 200
+ROUNDS = 5
+
+
+def populate(count, rng):
+    """Build the same obstacle field in a plain Group and a SpatialGroup"""
+    plain = pygame.sprite.Group()
+    spatial = racer2.SpatialGroup()
+    for _ in range(count):
+        y = rng.randint(-racer2.SCREEN_HEIGHT, racer2.SCREEN_HEIGHT)
+        speed = rng.randint(3, 6)
+        for group in (plain, spatial):
+            obstacle = racer2.Obstacle(3, rng)
+            obstacle.rect.y = y
+            obstacle.speed = speed
+            group.add(obstacle)
+    return plain, spatial
+
+
+def move(group):
+    """Move every sprite down, wrapping at the bottom so the count stays fixed"""
+    for sprite in group:
+        sprite.rect.y += sprite.speed
+        if sprite.rect.top > racer2.SCREEN_HEIGHT:
+            sprite.rect.y -= 2 * racer2.SCREEN_HEIGHT
+
+
+def time_per_call(func, repeat, rounds=ROUNDS):
+    """Best time per call over several rounds, to keep machine noise out of the comparison"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def main():
+    rng = random.Random(0)
+    car = racer2.Car()
+    print(f"{'sprites':>8} {'linear us':>10} {'grid us':>10} {'speedup':>8} "
+          f"{'linear step us':>15} {'grid step us':>13} {'speedup':>8}")
+    for count in COUNTS:
+        plain, spatial = populate(count, rng)
+        linear = time_per_call(lambda: pygame.sprite.spritecollide(car, plain, False), QUERIES)
+        grid = time_per_call(lambda: spatial.collide(car), QUERIES)
+        steps = max(5, 20000 // count)
+        linear_step = time_per_call(lambda: (move(plain), pygame.sprite.spritecollide(car, plain, False)), steps)
+        grid_step = time_per_call(lambda: (move(spatial), spatial.collide(car)), steps)
+        print(f"{count:>8} {linear * 1e6:>10.1f} {grid * 1e6:>10.1f} {linear / grid:>7.1f}x "
+              f"{linear_step * 1e6:>15.1f} {grid_step * 1e6:>13.1f} {linear_step / grid_step:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Vector document: index, hit-test, region redraw and SVG export vs. document size.
+
+Fills a 4096 x 4096 document with random small strokes and shapes and
+reports, per size:
+- build time per primitive,
+- hit-test time with the quadtree and with a linear scan,
+- time to redraw one 256 x 256 region from the primitives,
+- the longest frame spent working off such regions through a RedrawQueue,
+  as paint2 does after a move (one REDRAW_CHUNK piece can overrun the
+  frame budget),
+- SVG export time to a null stream.
+
+Usage: python benchmarks/bench_paint_document.py
+"""
+import io
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from paint_canvas import TiledCanvas
+from paint2 import REDRAW_BUDGET
+from paint_document import (EQUILATERAL_TRIANGLE, PEN, RHOMBUS, RIGHT_TRIANGLE, SQUARE, Document, Primitive,
+                            RedrawQueue)
+
+SIZE = 4096
+COUNTS = [1000, 10000, 100000]
+HITS = 500
+REGIONS = 20
+
+
+def random_primitive(rng):
+    kind = rng.choice([PEN, SQUARE, RIGHT_TRIANGLE, EQUILATERAL_TRIANGLE, RHOMBUS])
+    color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+    width = rng.choice([3, 5, 8])
+    x, y = rng.uniform(0, SIZE), rng.uniform(0, SIZE)
+    if kind == PEN:
+        points = [(x + rng.uniform(-40, 40), y + rng.uniform(-40, 40)) for _ in range(rng.randint(2, 12))]
+    elif kind == SQUARE:
+        size = rng.randrange(5, 60)
+        points = [(int(x), int(y)), (int(x) + size, int(y) + size)]
+    else:
+        points = [(x + rng.uniform(-30, 30), y + rng.uniform(-30, 30)) for _ in range(3 if kind < RHOMBUS else 4)]
+    return Primitive(kind, color, width, points)
+
+
+def linear_hit_test(document, pos, tolerance=3):
+    for id in reversed(sorted(document.primitives)):
+        primitive = document.primitives[id]
+        if primitive.bounds.inflate(2 * tolerance, 2 * tolerance).collidepoint(pos) \
+                and primitive.distance(pos) <= tolerance:
+            return id
+    return None
+
+
+def run(count):
+    rng = random.Random(1)
+    primitives = [random_primitive(rng) for _ in range(count)]
+    document = Document(SIZE, SIZE)
+    start = time.perf_counter()
+    for primitive in primitives:
+        document.add(primitive)
+    build = (time.perf_counter() - start) / count
+
+    points = [(rng.uniform(0, SIZE), rng.uniform(0, SIZE)) for _ in range(HITS)]
+    start = time.perf_counter()
+    hits = [document.hit_test(pos) for pos in points]
+    indexed = (time.perf_counter() - start) / HITS
+    scan_points = points[:max(5, HITS * 1000 // count)]
+    start = time.perf_counter()
+    scanned = [linear_hit_test(document, pos) for pos in scan_points]
+    linear = (time.perf_counter() - start) / len(scan_points)
+    assert scanned == hits[:len(scan_points)]
+
+    canvas = TiledCanvas(SIZE, SIZE)
+    start = time.perf_counter()
+    for _ in range(REGIONS):
+        x, y = rng.randrange(SIZE - 256), rng.randrange(SIZE - 256)
+        document.rasterize(canvas, pygame.Rect(x, y, 256, 256))
+    region = (time.perf_counter() - start) / REGIONS
+
+    queue = RedrawQueue(document, canvas)
+    for _ in range(REGIONS):
+        queue.add(pygame.Rect(rng.randrange(SIZE - 256), rng.randrange(SIZE - 256), 256, 256))
+    frame = 0.0
+    while queue:
+        start = time.perf_counter()
+        queue.run(REDRAW_BUDGET)
+        frame = max(frame, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    document.write_svg(io.StringIO())
+    export = time.perf_counter() - start
+    return build, indexed, linear, region, frame, export
+
+
+def main():
+    print(f"{'primitives':>10} {'add us':>7} {'hit us':>8} {'scan us':>9} {'region ms':>10} "
+          f"{'frame ms':>9} {'svg s':>7}")
+    for count in COUNTS:
+        build, indexed, linear, region, frame, export = run(count)
+        print(f"{count:>10,} {build * 1e6:>7.1f} {indexed * 1e6:>8.1f} {linear * 1e6:>9.0f} "
+              f"{region * 1000:>10.2f} {frame * 1000:>9.2f} {export:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
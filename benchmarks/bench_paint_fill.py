@@ -0,0 +1,152 @@
+"""Bucket fill on a full 800 x 600 window: scanline fill_runs() on worst-case shapes.
+
+Patterns:
+- blank canvas;
+- square spirals with narrow corridors, one long winding region;
+- checkerboards, with a huge number of short runs (the fill is one cell);
+- a maze of random walls.
+
+Reports the best of REPEATS times to find the fill, to paint it, and for
+both in one repeat. A per-pixel Python breadth-first fill on the blank
+canvas gives the baseline.
+
+The budget is one 60 fps frame (FRAME_BUDGET) for find plus paint in one
+repeat, and the benchmark fails if the best repeat of any pattern goes over
+it. The spirals are the worst case:
+the fill reaches the whole window through 36k-60k runs.
+
+Usage: python benchmarks/bench_paint_fill.py
+"""
+import os
+import random
+import sys
+import time
+from collections import deque
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from paint_canvas import TiledCanvas
+from paint_document import FILL, Primitive
+from paint_fill import fill_runs
+
+WIDTH, HEIGHT = 800, 600
+REPEATS = 10
+FRAME_BUDGET = 1 / 60  # Seconds for finding and painting one fill
+BLACK = (0, 0, 0)
+
+
+def draw_full(canvas, func):
+    canvas.draw(canvas.get_rect(), BLACK, lambda surface, origin: func(surface))
+
+
+def spiral(corridor):
+    def pattern(canvas):
+        step = corridor + 1
+        x, y = WIDTH // 2, HEIGHT // 2
+        points = [(x, y)]
+        length = step
+        direction = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+        i = 0
+        while length < 2 * max(WIDTH, HEIGHT):
+            dx, dy = direction[i % 4]
+            x, y = x + dx * length, y + dy * length
+            points.append((x, y))
+            if i % 2:
+                length += step
+            i += 1
+        draw_full(canvas, lambda surface: pygame.draw.lines(surface, BLACK, False, points, 1))
+        return WIDTH // 2 + 1, HEIGHT // 2 + 1
+    return pattern
+
+
+def checkerboard(cell):
+    def pattern(canvas):
+        def draw(surface):
+            for y in range(0, HEIGHT, cell):
+                for x in range((y // cell) % 2 * cell, WIDTH, 2 * cell):
+                    surface.fill(BLACK, (x, y, cell, cell))
+        draw_full(canvas, draw)
+        return cell, 0
+    return pattern
+
+
+def maze(canvas):
+    rng = random.Random(1)
+    def draw(surface):
+        for _ in range(600):
+            x, y = rng.randrange(WIDTH), rng.randrange(HEIGHT)
+            if rng.random() < 0.5:
+                pygame.draw.line(surface, BLACK, (x, y), (x + rng.randrange(20, 120), y), 2)
+            else:
+                pygame.draw.line(surface, BLACK, (x, y), (x, y + rng.randrange(20, 120)), 2)
+    draw_full(canvas, draw)
+    return 3, 3
+
+
+def blank(canvas):
+    return 0, 0
+
+
+PATTERNS = [("blank", blank), ("spiral 4px", spiral(4)), ("spiral 2px", spiral(2)),
+            ("checker 1px", checkerboard(1)), ("checker 2px", checkerboard(2)), ("maze", maze)]
+
+
+def naive_fill(canvas, seed):
+    """Per-pixel breadth-first fill through get_at/set_at"""
+    size = canvas.tile_size
+    target = canvas.tile((seed[0] // size, seed[1] // size)).get_at((seed[0] % size, seed[1] % size))
+    seen = set()
+    queue = deque([seed])
+    while queue:
+        x, y = queue.popleft()
+        if (x, y) in seen or not (0 <= x < WIDTH and 0 <= y < HEIGHT):
+            continue
+        tile = canvas.tile((x // size, y // size))
+        if tile.get_at((x % size, y % size)) != target:
+            continue
+        seen.add((x, y))
+        tile.set_at((x % size, y % size), (255, 0, 0))
+        queue.extend([(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)])
+    return len(seen)
+
+
+def run(pattern):
+    canvas = TiledCanvas(WIDTH, HEIGHT)
+    seed = pattern(canvas)
+    find = paint = total = float("inf")
+    for i in range(REPEATS):
+        start = time.perf_counter()
+        runs = fill_runs(canvas, seed, canvas.get_rect())
+        middle = time.perf_counter()
+        # Alternate colours so every repeat fills the same area again
+        Primitive(FILL, (255, 0, 0) if i % 2 else (255, 255, 255), 0, runs).draw(canvas)
+        end = time.perf_counter()
+        find = min(find, middle - start)
+        paint = min(paint, end - middle)
+        total = min(total, end - start)
+    pixels = int((runs[:, 2] - runs[:, 1]).sum())
+    return find, paint, total, len(runs), pixels
+
+
+def main():
+    print(f"{'pattern':>12} {'find ms':>8} {'paint ms':>9} {'total ms':>9} {'runs':>7} {'pixels':>8}")
+    over = []
+    for name, pattern in PATTERNS:
+        find, paint, total, runs, pixels = run(pattern)
+        print(f"{name:>12} {find * 1000:>8.2f} {paint * 1000:>9.2f} {total * 1000:>9.2f} {runs:>7} {pixels:>8}")
+        if total > FRAME_BUDGET:
+            over.append(name)
+    canvas = TiledCanvas(WIDTH, HEIGHT)
+    start = time.perf_counter()
+    pixels = naive_fill(canvas, (0, 0))
+    print(f"{'naive blank':>12} {(time.perf_counter() - start) * 1000:>8.0f} {'':>9} {'':>9} {'':>7} {pixels:>8}")
+    if over:
+        print(f"over the {FRAME_BUDGET * 1000:.1f} ms budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
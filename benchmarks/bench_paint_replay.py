@@ -0,0 +1,29 @@
+"""Replay a seeded synthetic paint2 session headless and report its throughput.
+
+The session mixes pen strokes, shapes, fills, moves, colour, size and tool
+clicks, undo and zoom, with pointer motion at 1000 Hz. The canvas hash
+is the same on every run for a given seed, so a changed hash means the
+drawing code changed what it draws.
+
+Usage: python benchmarks/bench_paint_replay.py [SEED] [ACTIONS]
+"""
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paint_replay import Player, report, synthetic_session
+
+ACTIONS = 150
+
+
+def main(argv):
+    seed = int(argv[0]) if argv else 0
+    actions = int(argv[1]) if len(argv) > 1 else ACTIONS
+    recording = synthetic_session(seed, actions)
+    print(report(recording, *Player(recording).verify()))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,88 @@
+"""Saving paint2 drawings: UI-thread cost of a blocking save vs. background tile saves.
+
+For canvases up to 8192 x 8192 with every tile drawn on, reports:
+- naive: pygame.image.save() of the whole canvas as one surface, which
+  would block the UI thread;
+- snapshot: UI-thread time of TileStore.snapshot() for the first (full)
+  save and for an incremental save after a few strokes;
+- write: worker-thread time to encode and write those snapshots.
+
+Usage: python benchmarks/bench_paint_save.py
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from paint_canvas import TiledCanvas
+from paint_document import Document
+from paint_save import TileStore
+
+SIZES = [800, 2048, 4096, 8192]
+NAIVE_LIMIT = 4096  # Larger flat surfaces take too long to be worth timing
+STROKES = 5
+
+
+def scribble(canvas, rng, count):
+    for _ in range(count):
+        x, y = rng.randrange(canvas.width), rng.randrange(canvas.height)
+        rect = pygame.Rect(x - 100, y - 100, 200, 200)
+        end = (x + rng.randrange(-90, 90), y + rng.randrange(-90, 90))
+        canvas.draw(rect, (0, 0, 0), lambda surface, origin: pygame.draw.line(
+            surface, (0, 0, 0), (x - origin[0], y - origin[1]), (end[0] - origin[0], end[1] - origin[1]), 5))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def run(size, directory):
+    rng = random.Random(1)
+    canvas = TiledCanvas(size, size)
+    document = Document(size, size)
+    for key in canvas.tile_keys(canvas.get_rect()):
+        canvas.tile(key).fill((rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        canvas.changed(key)
+    scribble(canvas, rng, size // 8)
+
+    naive = None
+    if size <= NAIVE_LIMIT:
+        flat = pygame.Surface((size, size), 0, 24)
+        for key in canvas.tile_keys(canvas.get_rect()):
+            flat.blit(canvas.tile(key), canvas.tile_rect(key))
+        naive, _ = timed(pygame.image.save, flat, os.path.join(directory, "flat.png"))
+
+    store = TileStore(os.path.join(directory, f"{size}.paint"))
+    full_snapshot, job = timed(store.snapshot, canvas, document)
+    full_write, _ = timed(store.write, *job[1:])
+    scribble(canvas, rng, STROKES)
+    step_snapshot, job = timed(store.snapshot, canvas, document)
+    step_write, _ = timed(store.write, *job[1:])
+    return naive, full_snapshot, full_write, len(job[2]), step_snapshot, step_write
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        print(f"{'canvas':>10} {'naive ms':>9} {'full snap ms':>13} {'full write ms':>14} "
+              f"{'tiles':>6} {'step snap ms':>13} {'step write ms':>14}")
+        for size in SIZES:
+            naive, full_snapshot, full_write, tiles, step_snapshot, step_write = run(size, directory)
+            naive = "-" if naive is None else f"{naive * 1000:.0f}"
+            print(f"{f'{size}x{size}':>10} {naive:>9} {full_snapshot * 1000:>13.1f} {full_write * 1000:>14.0f} "
+                  f"{tiles:>6} {step_snapshot * 1000:>13.2f} {step_write * 1000:>14.1f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Pen stroke cost per frame at 1000 Hz input: per-event lines vs. the batched Stroke engine.
+
+Replays a fast looping stroke sampled at 1000 Hz. The old approach draws a
+line plus two circles per motion event; Stroke gathers each frame's points
+(about 17 at 60 FPS) and draws them as one smoothed, antialiased pass.
+
+Usage: python benchmarks/bench_paint_stroke.py
+"""
+import math
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from paint_canvas import TiledCanvas
+from paint_stroke import Stroke
+
+INPUT_HZ = 1000
+FPS = 60
+SECONDS = 3
+SIZES = [3, 8, 24]
+
+
+def stroke_points():
+    """A fast looping stroke, about 2000 px/s"""
+    points = []
+    for i in range(INPUT_HZ * SECONDS):
+        t = i / INPUT_HZ
+        points.append((int(400 + 300 * math.sin(2.1 * t)), int(300 + 200 * math.sin(3.3 * t + 0.5))))
+    return points
+
+
+def frames(points):
+    per_frame = INPUT_HZ // FPS
+    return [points[i:i + per_frame] for i in range(0, len(points), per_frame)]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run_lines(canvas, batches, size):
+    times = []
+    last = batches[0][0]
+    for batch in batches:
+        start = time.perf_counter()
+        for pos in batch:
+            pygame.draw.line(canvas, (0, 0, 0), last, pos, size)
+            pygame.draw.circle(canvas, (0, 0, 0), last, size // 2)
+            pygame.draw.circle(canvas, (0, 0, 0), pos, size // 2)
+            last = pos
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_stroke(canvas, batches, size):
+    times = []
+    stroke = Stroke(canvas, (0, 0, 0), size)
+    for batch in batches:
+        start = time.perf_counter()
+        for pos in batch:
+            stroke.add(pos)
+        stroke.flush()
+        times.append(time.perf_counter() - start)
+    stroke.end()
+    return times
+
+
+def main():
+    batches = frames(stroke_points())
+    print(f"{'brush':>6} {'lines p50 ms':>13} {'p99':>7} {'stroke p50 ms':>14} {'p99':>7}")
+    for size in SIZES:
+        canvas = pygame.Surface((800, 600))
+        lines = run_lines(canvas, batches, size)
+        canvas = TiledCanvas(800, 600)
+        stroke = run_stroke(canvas, batches, size)
+        print(f"{size:>6} {percentile(lines, 50) * 1000:>13.3f} {percentile(lines, 99) * 1000:>7.3f} "
+              f"{percentile(stroke, 50) * 1000:>14.3f} {percentile(stroke, 99) * 1000:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
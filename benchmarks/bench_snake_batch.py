@@ -0,0 +1,57 @@
+"""Throughput of the batched snake engine vs. number of games.
+
+Steps BatchSnake with random actions and auto-reset, and compares it with
+stepping the same number of snake2.SnakeGame objects one by one.
+
+Usage: python benchmarks/bench_snake_batch.py
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import snake2
+from snake_batch import BatchSnake, DIRECTIONS
+
+COUNTS = [1, 10, 100, 1000, 10000]
+STEPS = 200
+
+
+def batch_rate(n):
+    batch = BatchSnake(n, seed=1, auto_reset=True)
+    actions = np.random.default_rng(1).integers(-1, 4, size=(STEPS, n))
+    batch.observe()
+    start = time.perf_counter()
+    for row in actions:
+        batch.step(row)
+    return STEPS * n / (time.perf_counter() - start)
+
+
+def object_rate(n):
+    rng = random.Random(1)
+    games = [snake2.SnakeGame(seed=i) for i in range(n)]
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        for game in games:
+            game.turn(rng.choice(DIRECTIONS))
+            game.step()
+            if game.game_over:
+                game.reset()
+    return STEPS * n / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'games':>8} {'batch steps/s':>14} {'object steps/s':>15} {'speedup':>8}")
+    for n in COUNTS:
+        batch = batch_rate(n)
+        objects = object_rate(n)
+        print(f"{n:>8} {batch:>14,.0f} {objects:>15,.0f} {batch / objects:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
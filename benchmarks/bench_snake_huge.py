@@ -0,0 +1,56 @@
+"""Huge-board snake: frame time and memory vs. board size.
+
+Drives a long snake around boards from window size up to 4096 x 4096 cells
+and reports the mean ChunkRenderer.draw() time, the number of allocated
+occupancy chunks and the number of cached chunk surfaces.
+
+Usage: python benchmarks/bench_snake_huge.py
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+import snake2
+from snake_huge import ChunkedOccupancy, ChunkRenderer
+
+SIZES = [32, 256, 1024, 4096]
+FRAMES = 600
+FRAMES_PER_TICK = 6
+SNAKE_LENGTH = 200
+
+
+def run(size, screen):
+    game = snake2.SnakeGame(seed=1, occupancy=ChunkedOccupancy(size, size))
+    game.snake.length = SNAKE_LENGTH
+    renderer = ChunkRenderer(screen)
+    turns = [snake2.UP, snake2.RIGHT, snake2.DOWN, snake2.RIGHT]
+    draw_time = 0.0
+    for frame in range(FRAMES):
+        if frame % FRAMES_PER_TICK == 0:
+            # Staircase walk that never crosses itself
+            game.turn(turns[(frame // FRAMES_PER_TICK // 8) % len(turns)])
+            game.step()
+            if game.game_over:
+                game.reset()
+                game.snake.length = SNAKE_LENGTH
+        start = time.perf_counter()
+        renderer.draw(game, (frame % FRAMES_PER_TICK) / FRAMES_PER_TICK)
+        draw_time += time.perf_counter() - start
+    return draw_time / FRAMES, len(game.snake.occupancy.chunks), len(renderer.surfaces)
+
+
+def main():
+    screen = pygame.display.set_mode((snake2.WINDOW_WIDTH, snake2.WINDOW_HEIGHT))
+    print(f"{'board':>12} {'cells':>12} {'draw ms':>8} {'chunks':>7} {'cached':>7}")
+    for size in SIZES:
+        draw_ms, chunks, cached = run(size, screen)
+        print(f"{f'{size}x{size}':>12} {size * size:>12,} {draw_ms * 1000:>8.3f} {chunks:>7} {cached:>7}")
+
+
+if __name__ == "__main__":
+    main()
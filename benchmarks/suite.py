@@ -0,0 +1,445 @@
+"""Headless benchmark suite for racer2, snake2 and paint2 with JSON baselines.
+
+Every case is seeded and runs the same workload in each sample, so the
+only thing that differs between samples is machine noise. A sample
+reports seconds per operation (a step, a frame, a shape, ...).
+
+Cases:
+- racer.update / racer.draw: Game.update() and the dirty-rect Renderer with
+  hundreds to thousands of obstacle sprites on screen;
+- snake.step / snake.food: SnakeGame.step() and food spawning for long
+  snakes on boards from the window grid up to 1024 x 1024 cells;
+- paint.stroke / paint.shape / paint.preview: PaintApp frames while drawing
+  a 1000 Hz pen stroke, committing shapes, and dragging a shape preview.
+
+compare runs a one-sided Welch t-test per case. A case is flagged when it
+is slower with p < alpha and by more than --min-change, so tiny but
+consistent differences are not reported. compare exits with status 1 if
+anything is flagged or a baseline case is missing from the candidate.
+
+Usage:
+    python benchmarks/suite.py list
+    python benchmarks/suite.py run [-k racer] [--samples 10] [--save baseline.json]
+    python benchmarks/suite.py compare baseline.json [candidate.json] [--alpha 0.01]
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from collections import deque
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pygame
+from pygame.locals import *
+
+import paint2
+import racer2
+import snake2
+
+FORMAT_VERSION = 1
+SAMPLES = 10
+WARMUP = 1  # Samples run and discarded before measuring
+SEED = 1
+ALPHA = 0.01
+MIN_CHANGE = 0.05
+
+RACER_STEPS = 60
+SNAKE_STEPS = 2000
+FOOD_SPAWNS = 2000
+PAINT_FRAMES = 60
+PAINT_SHAPES = 40
+INPUT_HZ = 1000
+FPS = 60
+
+
+# Racer
+
+def racer_game(sprites, seed):
+    """Headless game with sprites obstacles on the road and the car parked on the verge"""
+    game = racer2.Game(seed=seed, headless=True)
+    rng = random.Random(seed)
+    for _ in range(sprites):
+        obstacle = game.obstacle_pool.acquire(3, rng)
+        obstacle.rect.y = rng.randint(-racer2.SCREEN_HEIGHT, racer2.SCREEN_HEIGHT)
+        game.obstacles.add(obstacle)
+        game.all_sprites.add(obstacle)
+    game.car.rect.x = 0  # Nothing reaches the grass, so the run never ends
+    return game
+
+
+def racer_update(sprites, seed):
+    game = racer_game(sprites, seed)
+    state = game.get_state()
+
+    def sample():
+        game.set_state(state)
+        start = time.perf_counter()
+        for _ in range(RACER_STEPS):
+            game.update()
+        return (time.perf_counter() - start) / RACER_STEPS
+    return sample
+
+
+def racer_draw(sprites, seed):
+    game = racer_game(sprites, seed)
+    game.observers.append(racer2.Renderer(pygame.display.set_mode((racer2.SCREEN_WIDTH, racer2.SCREEN_HEIGHT))))
+    game.draw()  # First frame is a full repaint
+    state = game.get_state()
+
+    def sample():
+        game.set_state(state)
+        elapsed = 0.0
+        for _ in range(RACER_STEPS):
+            game.update()
+            start = time.perf_counter()
+            game.draw()
+            elapsed += time.perf_counter() - start
+        return elapsed / RACER_STEPS
+    return sample
+
+
+# Snake
+
+def serpentine(size):
+    """Cells of a boustrophedon walk over an even size x size board
+
+    The last cell is directly above the first across the wrapped edge, so on
+    the wrapping board the walk is a cycle a snake can follow forever.
+    """
+    cells = []
+    for y in range(size):
+        row = range(size) if y % 2 == 0 else range(size - 1, -1, -1)
+        cells.extend((x, y) for x in row)
+    return cells
+
+
+def snake_game(board, length, seed):
+    """Game with a snake of length cells laid along the serpentine cycle
+
+    Returns the game, the cycle and, for each cell of the cycle, the
+    direction to the next one.
+    """
+    game = snake2.SnakeGame(seed=seed, occupancy=snake2.Occupancy(board, board))
+    cells = serpentine(board)
+    directions = []
+    for (x0, y0), (x1, y1) in zip(cells, cells[1:] + cells[:1]):
+        dx, dy = x1 - x0, y1 - y0
+        directions.append((dx if abs(dx) <= 1 else -dx // abs(dx), dy if abs(dy) <= 1 else -dy // abs(dy)))
+    snake = game.snake
+    snake.occupancy.clear()
+    snake.positions = deque(reversed(cells[:length]))
+    for cell in snake.positions:
+        snake.occupancy.add(cell)
+    snake.length = length
+    game.food = snake2.Food(snake, game.tick, game.rng)
+    return game, cells, directions
+
+
+def snake_step(board, length, seed):
+    game, cells, directions = snake_game(board, length, seed)
+    index = {cell: i for i, cell in enumerate(cells)}
+
+    def sample():
+        snake = game.snake
+        start = time.perf_counter()
+        for _ in range(SNAKE_STEPS):
+            snake.direction = directions[index[snake.positions[0]]]
+            game.step()
+        elapsed = time.perf_counter() - start
+        game.take_dirty_cells()
+        snake.length = length  # Undo whatever food was eaten
+        return elapsed / SNAKE_STEPS
+    return sample
+
+
+def snake_food(board, length, seed):
+    game, _, _ = snake_game(board, length, seed)
+
+    def sample():
+        game.rng.seed(seed)
+        start = time.perf_counter()
+        for _ in range(FOOD_SPAWNS):
+            game.new_food()
+        elapsed = time.perf_counter() - start
+        game.take_dirty_cells()
+        return elapsed / FOOD_SPAWNS
+    return sample
+
+
+# Paint
+
+def paint_app():
+    app = paint2.PaintApp()
+    app.next_autosave = math.inf  # Autosave would write files mid-benchmark
+    return app
+
+
+def mouse(kind, pos, **attributes):
+    return pygame.event.Event(kind, pos=pos, **attributes)
+
+
+def paint_stroke(size, seed):
+    """A fast looping pen stroke sampled at INPUT_HZ, drawn one frame of points at a time"""
+    app = paint_app()
+    app.brush_size = size
+    per_frame = INPUT_HZ // FPS
+    phase = random.Random(seed).uniform(0, 2 * math.pi)
+    points = [(int(400 + 300 * math.sin(2.1 * t + phase)), int(340 + 200 * math.sin(3.3 * t)))
+              for t in (i / INPUT_HZ for i in range(per_frame * PAINT_FRAMES))]
+    frames = [[mouse(MOUSEMOTION, pos, rel=(0, 0), buttons=(1, 0, 0)) for pos in points[i:i + per_frame]]
+              for i in range(0, len(points), per_frame)]
+
+    def sample():
+        app.update([mouse(MOUSEBUTTONDOWN, points[0], button=1)])
+        elapsed = 0.0
+        for events in frames:
+            start = time.perf_counter()
+            app.update(events)
+            elapsed += time.perf_counter() - start
+        app.update([mouse(MOUSEBUTTONUP, points[-1], button=1)])
+        return elapsed / len(frames)
+    return sample
+
+
+def paint_shape(kind, seed):
+    """Shapes committed to the canvas and document, one press and release each"""
+    app = paint_app()
+    app.mode = kind
+
+    def sample():
+        rng = random.Random(seed)
+        start = time.perf_counter()
+        for _ in range(PAINT_SHAPES):
+            x, y = rng.randrange(50, 750), rng.randrange(100, 550)
+            app.update([mouse(MOUSEBUTTONDOWN, (x, y), button=1)])
+            app.update([mouse(MOUSEBUTTONUP, (x + rng.randrange(-200, 200), y + rng.randrange(-200, 200)), button=1)])
+        return (time.perf_counter() - start) / PAINT_SHAPES
+    return sample
+
+
+def paint_preview(kind, seed):
+    """Frames of dragging a shape: preview update plus composing the screen"""
+    app = paint_app()
+    app.mode = kind
+    rng = random.Random(seed)
+    path = [(rng.randrange(50, 750), rng.randrange(100, 550)) for _ in range(PAINT_FRAMES)]
+
+    def sample():
+        app.update([mouse(MOUSEBUTTONDOWN, (400, 340), button=1)])
+        start = time.perf_counter()
+        for pos in path:
+            app.update([mouse(MOUSEMOTION, pos, rel=(0, 0), buttons=(1, 0, 0))])
+            app.draw()
+        elapsed = time.perf_counter() - start
+        app.update([mouse(MOUSEBUTTONUP, path[-1], button=1)])
+        return elapsed / len(path)
+    return sample
+
+
+SHAPES = {'square': paint2.SQUARE, 'rtri': paint2.RIGHT_TRIANGLE,
+          'etri': paint2.EQUILATERAL_TRIANGLE, 'rhombus': paint2.RHOMBUS}
+
+# (name, unit, setup, arguments); setup(*arguments, seed) returns a function that runs one sample
+CASES = [
+    *[(f"racer.update[sprites={n}]", "step", racer_update, (n,)) for n in (100, 1000, 5000)],
+    *[(f"racer.draw[sprites={n}]", "frame", racer_draw, (n,)) for n in (100, 500, 2000)],
+    *[(f"snake.step[board={b},length={n}]", "step", snake_step, (b, n))
+      for b, n in ((30, 10), (30, 400), (256, 20000), (1024, 200000))],
+    *[(f"snake.food[board={b},length={n}]", "spawn", snake_food, (b, n))
+      for b, n in ((30, 10), (30, 800), (256, 60000), (1024, 1000000))],
+    *[(f"paint.stroke[size={n}]", "frame", paint_stroke, (n,)) for n in (3, 8)],
+    *[(f"paint.shape[{name}]", "shape", paint_shape, (kind,)) for name, kind in SHAPES.items()],
+    *[(f"paint.preview[{name}]", "frame", paint_preview, (kind,)) for name, kind in SHAPES.items()],
+]
+
+
+def run_cases(names, samples, seed=SEED):
+    """{name: {'unit': ..., 'seconds': [per-operation time of each sample]}}"""
+    results = {}
+    for name, unit, setup, arguments in CASES:
+        if name not in names:
+            continue
+        sample = setup(*arguments, seed)
+        for _ in range(WARMUP):
+            sample()
+        seconds = [sample() for _ in range(samples)]
+        results[name] = {'unit': unit, 'seconds': seconds}
+        mean = statistics.fmean(seconds)
+        spread = statistics.stdev(seconds) / mean * 100 if samples > 1 and mean else 0.0
+        print(f"{name:<40} {mean * 1e6:>12.1f} us/{unit:<6} ±{spread:>5.1f}%", flush=True)
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def save(path, results, samples, seed):
+    data = {
+        'version': FORMAT_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'samples': samples,
+        'seed': seed,
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1)
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    if data.get('version') != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported baseline version {data.get('version')}")
+    for name, result in data['results'].items():
+        if len(result['seconds']) < 2:
+            raise ValueError(f"{path}: {name} has fewer than 2 samples, too few to compare")
+    return data
+
+
+def sample_count(text):
+    """argparse type for --samples: the t-test needs at least two samples per case"""
+    samples = int(text)
+    if samples < 2:
+        raise argparse.ArgumentTypeError(f"need at least 2 samples, got {samples}")
+    return samples
+
+
+# Statistics
+
+def incomplete_beta(a, b, x):
+    """Regularized incomplete beta function I_x(a, b), by Lentz's continued fraction"""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - incomplete_beta(b, a, 1.0 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return front * result
+
+
+def welch_test(base, new):
+    """(t, degrees of freedom, one-sided p-value that new is slower than base)"""
+    difference = statistics.fmean(new) - statistics.fmean(base)
+    base_error = statistics.variance(base) / len(base)
+    new_error = statistics.variance(new) / len(new)
+    error = base_error + new_error
+    if error == 0.0:
+        return math.copysign(math.inf, difference), math.inf, 0.0 if difference > 0 else 1.0
+    t = difference / math.sqrt(error)
+    df = error ** 2 / (base_error ** 2 / (len(base) - 1) + new_error ** 2 / (len(new) - 1))
+    tail = 0.5 * incomplete_beta(df / 2, 0.5, df / (df + t * t))  # P(T > |t|)
+    return t, df, tail if t > 0 else 1.0 - tail
+
+
+def compare(baseline, candidate, alpha, min_change, names):
+    """Print a comparison table of the named baseline cases
+
+    Returns the names of the significantly slower cases and of those
+    missing from the candidate.
+    """
+    slower = []
+    missing = []
+    print(f"{'case':<40} {'base us':>10} {'new us':>10} {'change':>8} {'p':>8}")
+    for name in names:
+        base = baseline['results'][name]
+        if name not in candidate['results']:
+            missing.append(name)
+            print(f"{name:<40} {statistics.fmean(base['seconds']) * 1e6:>10.1f} {'-':>10} {'':>8} {'':>8} MISSING")
+            continue
+        base_seconds, new_seconds = base['seconds'], candidate['results'][name]['seconds']
+        base_mean, new_mean = statistics.fmean(base_seconds), statistics.fmean(new_seconds)
+        change = new_mean / base_mean - 1.0
+        _, _, p = welch_test(base_seconds, new_seconds)
+        verdict = ""
+        if p < alpha and change > min_change:
+            verdict = "SLOWER"
+            slower.append(name)
+        elif 1.0 - p < alpha and change < -min_change:
+            verdict = "faster"
+        print(f"{name:<40} {base_mean * 1e6:>10.1f} {new_mean * 1e6:>10.1f} {change * 100:>+7.1f}% {p:>8.4f} {verdict}")
+    return slower, missing
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Headless benchmarks for racer2, snake2 and paint2")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="list the benchmark cases")
+    run = commands.add_parser('run', help="run cases and optionally save them as a baseline")
+    run.add_argument('-k', dest='match', default='', help="only cases whose name contains this")
+    run.add_argument('--samples', type=sample_count, default=SAMPLES, help="measured samples per case (at least 2)")
+    run.add_argument('--seed', type=int, default=SEED, help="workload seed")
+    run.add_argument('--save', metavar='FILE', help="write the results to this JSON file")
+    check = commands.add_parser('compare', help="flag significant slowdowns against a baseline")
+    check.add_argument('baseline', help="baseline JSON file")
+    check.add_argument('candidate', nargs='?', help="results to check (default: run the baseline's cases now)")
+    check.add_argument('-k', dest='match', default='', help="only cases whose name contains this")
+    check.add_argument('--alpha', type=float, default=ALPHA, help="significance level of the one-sided test")
+    check.add_argument('--min-change', type=float, default=MIN_CHANGE,
+                       help="smallest relative slowdown worth flagging")
+    check.add_argument('--save', metavar='FILE', help="write a fresh run to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name, unit, _, _ in CASES:
+            print(f"{name:<40} per {unit}")
+        return 0
+
+    if args.command == 'run':
+        names = [name for name, _, _, _ in CASES if args.match in name]
+        results = run_cases(names, args.samples, args.seed)
+        if args.save:
+            save(args.save, results, args.samples, args.seed)
+        return 0
+
+    baseline = load(args.baseline)
+    names = [name for name in baseline['results'] if args.match in name]
+    if args.candidate:
+        candidate = load(args.candidate)
+    else:
+        results = run_cases(names, baseline['samples'], baseline['seed'])
+        if args.save:
+            save(args.save, results, baseline['samples'], baseline['seed'])
+        candidate = {'results': results}
+        print()
+    slower, missing = compare(baseline, candidate, args.alpha, args.min_change, names)
+    if missing:
+        print(f"\n{len(missing)} baseline case(s) missing from the candidate: {', '.join(missing)}")
+    if slower:
+        print(f"\n{len(slower)} significant slowdown(s): {', '.join(slower)}")
+    return 1 if slower or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
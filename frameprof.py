@@ -0,0 +1,156 @@
+"""Frame-phase profiler and frame-time overlay shared by racer2, snake2 and paint2.
+
+Each app calls begin_frame() at the top of its loop, mark(phase) after each
+phase (events, update, draw, ...) and end_frame() at the bottom. When the
+profiler is disabled those calls return immediately, so it can stay wired
+into normal builds.
+
+F3 toggles the on-screen overlay (and enables profiling). Set
+FRAMEPROF_EXPORT=path.csv or path.jsonl to record every frame from startup
+and write it out when the app exits.
+"""
+import csv
+import json
+import os
+from collections import deque
+from time import perf_counter
+
+import pygame
+
+from textcache import get_atlas, get_font
+
+OVERLAY_KEY = pygame.K_F3
+OVERLAY_SIZE = (190, 110)
+
+
+class FrameProfiler:
+    """Per-phase frame timer with a rolling window of recent frames"""
+    def __init__(self, enabled=False, history=600, export_path=None):
+        self.always_on = enabled or export_path is not None
+        self.enabled = self.always_on
+        self.overlay_visible = False
+        self.export_path = export_path
+        self.frames = deque(maxlen=history)  # Rolling window of (frame_ms, {phase: ms})
+        self.log = []  # Every frame since startup, only kept when exporting
+        self.frame_start = None
+        self.last_mark = None
+        self.phases = {}
+
+    @classmethod
+    def from_env(cls):
+        """Profiler configured from the FRAMEPROF_EXPORT environment variable"""
+        return cls(export_path=os.environ.get('FRAMEPROF_EXPORT') or None)
+
+    def begin_frame(self):
+        """Start timing a frame; the frame time is measured start to start"""
+        if not self.enabled:
+            return
+        now = perf_counter()
+        if self.frame_start is not None:
+            self._record((now - self.frame_start) * 1000.0)
+        self.frame_start = now
+        self.last_mark = now
+        self.phases = {}
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to phase"""
+        if not self.enabled:
+            return
+        now = perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self.last_mark) * 1000.0
+        self.last_mark = now
+
+    def end_frame(self):
+        """Charge the rest of the frame (mostly the clock wait) to 'idle'"""
+        if not self.enabled:
+            return
+        self.mark('idle')
+
+    def _record(self, frame_ms):
+        self.frames.append((frame_ms, self.phases))
+        if self.export_path is not None:
+            self.log.append((frame_ms, self.phases))
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Frame-time percentiles (ms) over the rolling window"""
+        times = sorted(frame_ms for frame_ms, _ in self.frames)
+        if not times:
+            return {p: 0.0 for p in points}
+        return {p: times[min(len(times) - 1, int(len(times) * p / 100))] for p in points}
+
+    def histogram(self, bucket_ms=2.0, buckets=20):
+        """Counts of frame times per bucket_ms-wide bucket (the last bucket is open-ended)"""
+        counts = [0] * buckets
+        for frame_ms, _ in self.frames:
+            counts[min(buckets - 1, int(frame_ms / bucket_ms))] += 1
+        return counts
+
+    def phase_means(self):
+        """Mean time per phase (ms) over the rolling window"""
+        totals = {}
+        for _, phases in self.frames:
+            for phase, ms in phases.items():
+                totals[phase] = totals.get(phase, 0.0) + ms
+        count = max(1, len(self.frames))
+        return {phase: ms / count for phase, ms in totals.items()}
+
+    def handle_event(self, event):
+        """Toggle the overlay on F3; returns True if the event was consumed"""
+        if event.type == pygame.KEYDOWN and event.key == OVERLAY_KEY:
+            self.overlay_visible = not self.overlay_visible
+            self.enabled = self.overlay_visible or self.always_on
+            # Toggling happens mid-frame; restart timing from here
+            self.frame_start = None
+            self.last_mark = perf_counter()
+            self.phases = {}
+            return True
+        return False
+
+    def overlay_rect(self, surface, corner='topright'):
+        """Where the overlay box sits on a surface"""
+        rect = pygame.Rect((0, 0), OVERLAY_SIZE)
+        setattr(rect, corner, getattr(surface.get_rect().inflate(-20, -20), corner))
+        return rect
+
+    def draw_overlay(self, surface, corner='topright'):
+        """Draw the overlay if visible; returns the rect drawn or None"""
+        if not self.overlay_visible:
+            return None
+        atlas = get_atlas(get_font(None, 18), (255, 255, 255))
+        rect = self.overlay_rect(surface, corner)
+        pct = self.percentiles()
+        mean_ms = sum(frame_ms for frame_ms, _ in self.frames) / max(1, len(self.frames))
+        lines = [
+            f"FPS {1000.0 / mean_ms:5.1f}" if mean_ms else "FPS   -",
+            f"p50 {pct[50]:5.1f}  p95 {pct[95]:5.1f}  p99 {pct[99]:5.1f} ms",
+        ]
+        lines += [f"{phase:<7} {ms:6.2f} ms" for phase, ms in self.phase_means().items()]
+        surface.fill((0, 0, 0), rect)
+        for i, line in enumerate(lines[:7]):
+            atlas.blit(surface, line, (rect.x + 6, rect.y + 4 + i * 15))
+        return rect
+
+    def export(self, path=None):
+        """Write recorded frames as CSV or JSONL (chosen by file extension)"""
+        path = path or self.export_path
+        records = self.log if self.export_path is not None else list(self.frames)
+        phases = []
+        for _, frame_phases in records:
+            for phase in frame_phases:
+                if phase not in phases:
+                    phases.append(phase)
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.jsonl'):
+                for i, (frame_ms, frame_phases) in enumerate(records):
+                    f.write(json.dumps({'frame': i, 'frame_ms': round(frame_ms, 4),
+                                        **{p: round(ms, 4) for p, ms in frame_phases.items()}}) + '\n')
+            else:
+                writer = csv.writer(f)
+                writer.writerow(['frame', 'frame_ms'] + phases)
+                for i, (frame_ms, frame_phases) in enumerate(records):
+                    writer.writerow([i, f"{frame_ms:.4f}"] + [f"{frame_phases.get(p, 0.0):.4f}" for p in phases])
+
+    def close(self):
+        """Export on exit if FRAMEPROF_EXPORT was set"""
+        if self.export_path is not None and self.log:
+            self.export()
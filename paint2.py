@@ -3,6 +3,19 @@ import math
 import sys
 from pygame.locals import *
 
+from frameprof import FrameProfiler
+from paint_canvas import CanvasView, TiledCanvas
+from paint_document import (
+    Document, Primitive, RedrawQueue, draw_geometry, points_rect,
+    PEN, SQUARE, RIGHT_TRIANGLE, EQUILATERAL_TRIANGLE, RHOMBUS, FILL,
+)
+from paint_fill import fill_runs
+from paint_history import UndoHistory
+from paint_save import (AUTOSAVE_SECONDS, AUTOSAVE_SUFFIX, SAVE_PATH, BackgroundSaver, SvgExport, TileStore,
+                        read_manifest)
+from paint_stroke import Stroke
+from textcache import get_font, render_text
+
 # Initialize pygame
 pygame.init()
 
@@ -17,31 +30,63 @@ BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
 PURPLE = (128, 0, 128)
 GRAY = (200, 200, 200)
+SVG_PATH = "paint.svg"
+FILL_TOLERANCE = 32  # Largest per-channel difference from the clicked colour that still fills
+REDRAW_BUDGET = 0.006  # Seconds per frame spent redrawing the areas moved primitives left and entered
 
-# Tool modes
-PEN = 0
-SQUARE = 1
-RIGHT_TRIANGLE = 2
-EQUILATERAL_TRIANGLE = 3
-RHOMBUS = 4
+# Tool modes (PEN to FILL are also the document's primitive kinds)
+MOVE = 6
 
 class PaintApp:
-    def __init__(self):
-        """Initialize the paint application"""
+    def __init__(self, canvas_size=(WINDOW_WIDTH, WINDOW_HEIGHT), backing=None, path=None):
+        """Initialize the paint application
+
+        canvas_size may be much larger than the window; backing is an optional
+        file to memory-map the canvas pixels from. path is the drawing to open
+        and save to; a saved drawing there sets the canvas size.
+        """
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("Advanced Paint")
+        manifest = read_manifest(path) if path else None
+        if manifest:
+            canvas_size = (manifest["width"], manifest["height"])
         
         self.clock = pygame.time.Clock()
+        self.profiler = FrameProfiler.from_env()
         self.drawing = False
-        self.last_pos = None
+        self.stroke = None  # Pen stroke in progress
         self.color = BLACK
         self.brush_size = 3
         self.mode = PEN
-        self.start_pos = None
+        self.start_pos = None  # Canvas coordinates where the current drag started
+        self.panning = False
+        self.mouse_pos = pygame.mouse.get_pos()  # Latest pointer position seen in an event
+        self.observers = []  # Called with each frame's events before they are handled
         
         # Create drawing surface
-        self.canvas = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        self.canvas.fill(WHITE)
+        self.canvas = TiledCanvas(*canvas_size, path=backing)
+        self.view = CanvasView(self.canvas)
+        self.history = UndoHistory(self.canvas)
+        self.document = Document(*canvas_size)  # Vector record of everything drawn
+        self.selected = None  # Id of the primitive being moved
+        # Areas to redraw from the document, a few pieces per frame. Anything that
+        # reads or changes canvas pixels directly first finishes the pieces in its way
+        # (see touch()).
+        self.redraw = RedrawQueue(self.document, self.canvas)
+        
+        # Saving runs on a worker thread; only tile snapshots are taken here
+        self.store = TileStore(path or SAVE_PATH)
+        if manifest:
+            self.store.load(self.canvas, self.document)
+        self.autosave_store = TileStore(self.store.path + AUTOSAVE_SUFFIX)
+        self.svg_export = SvgExport(SVG_PATH)
+        self.saver = BackgroundSaver()
+        self.next_autosave = pygame.time.get_ticks() + AUTOSAVE_SECONDS * 1000
+        
+        # Shape preview layer, kept between frames; only preview_rect is non-transparent
+        self.overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        self.preview_rect = None
+        self.preview_pos = None  # Latest drag position (screen) not yet drawn in the preview
         
         # Available colors
         self.colors = [
@@ -59,7 +104,9 @@ class PaintApp:
             ("Square", (300, 10), SQUARE),
             ("R-Tri", (350, 10), RIGHT_TRIANGLE),
             ("E-Tri", (400, 10), EQUILATERAL_TRIANGLE),
-            ("Rhombus", (450, 10), RHOMBUS)
+            ("Rhombus", (450, 10), RHOMBUS),
+            ("Fill", (250, 45), FILL),
+            ("Move", (300, 45), MOVE)
         ]
         
         # Brush size buttons
@@ -77,32 +124,78 @@ class PaintApp:
             if color == self.color:
                 pygame.draw.rect(self.screen, BLACK, (*pos, 30, 30), 2)
         
+        font = get_font(None, 20)
+        
         # Draw tool buttons
         for text, pos, mode in self.tools:
             color = BLUE if self.mode == mode else GRAY
             pygame.draw.rect(self.screen, color, (*pos, 50, 30))
-            text_surf = pygame.font.SysFont(None, 20).render(text, True, BLACK)
+            text_surf = render_text(font, text, BLACK)
             self.screen.blit(text_surf, (pos[0] + 5, pos[1] + 5))
         
         # Draw brush size buttons
         for text, pos, size in self.sizes:
             color = BLUE if self.brush_size == size else GRAY
             pygame.draw.rect(self.screen, color, (*pos, 50, 30))
-            text_surf = pygame.font.SysFont(None, 20).render(text, True, BLACK)
+            text_surf = render_text(font, text, BLACK)
             self.screen.blit(text_surf, (pos[0] + 5, pos[1] + 5))
         
         # Draw clear button
         pygame.draw.rect(self.screen, RED, (WINDOW_WIDTH - 100, 10, 80, 30))
-        text_surf = pygame.font.SysFont(None, 20).render("Clear", True, WHITE)
+        text_surf = render_text(font, "Clear", WHITE)
         self.screen.blit(text_surf, (WINDOW_WIDTH - 90, 15))
 
-    def handle_events(self):
-        """Handle user input events"""
-        for event in pygame.event.get():
+    def handle_events(self, events=None):
+        """Handle user input events (this frame's pygame events unless events is given)"""
+        if events is None:
+            events = pygame.event.get()
+        for observer in self.observers:
+            observer(events)
+        for event in events:
+            if event.type in (MOUSEMOTION, MOUSEBUTTONDOWN, MOUSEBUTTONUP):
+                self.mouse_pos = event.pos
+            if self.profiler.handle_event(event):
+                continue
             if event.type == QUIT:
+                self.profiler.close()
+                self.redraw.finish()
+                self.saver.close()
+                self.canvas.flush()
                 pygame.quit()
                 sys.exit()
             
+            elif event.type == KEYDOWN and event.mod & KMOD_CTRL:
+                # Ctrl+Z undo, Ctrl+Y / Ctrl+Shift+Z redo
+                if event.key == K_z and not event.mod & KMOD_SHIFT:
+                    self.redraw.finish()
+                    self.history.undo()
+                elif event.key in (K_y, K_z):
+                    self.redraw.finish()
+                    self.history.redo()
+                elif event.key == K_e:
+                    self.export_svg()
+                elif event.key == K_s:
+                    self.save()
+            
+            elif event.type == KEYDOWN and event.key == K_HOME:
+                self.view = CanvasView(self.canvas)
+                self.refresh_preview()
+            
+            elif event.type == MOUSEWHEEL:
+                # Zoom around the cursor
+                self.view.zoom_at(self.mouse_pos, event.y)
+                self.refresh_preview()
+            
+            elif event.type == MOUSEBUTTONDOWN and event.button == 2:
+                self.panning = True
+            
+            elif event.type == MOUSEBUTTONUP and event.button == 2:
+                self.panning = False
+            
+            elif event.type == MOUSEMOTION and self.panning:
+                self.view.pan(*event.rel)
+                self.refresh_preview()
+            
             elif event.type == MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left click
                     # Check if clicking on color palette
@@ -125,45 +218,221 @@ class PaintApp:
                     
                     # Check if clicking clear button
                     if pygame.Rect(WINDOW_WIDTH - 100, 10, 80, 30).collidepoint(event.pos):
-                        self.canvas.fill(WHITE)
+                        self.redraw.finish()
+                        self.history.begin()
+                        self.history.touch(self.canvas.get_rect())
+                        self.canvas.clear()
+                        primitives = self.document.clear()
+                        self.history.record(lambda: [self.document.add(p, id) for id, p in primitives.items()],
+                                            self.document.clear)
+                        self.history.end()
                         return
                     
                     # Start drawing
+                    pos = self.view.to_canvas(event.pos)
+                    if self.mode == FILL:
+                        self.fill(pos)
+                        return
+                    if self.mode == MOVE:
+                        self.selected = self.document.hit_test(pos, 3 / self.view.zoom)
+                        if self.selected is None:
+                            return
+                    self.history.begin()
                     self.drawing = True
-                    self.last_pos = event.pos
-                    self.start_pos = event.pos
+                    if self.mode == PEN:
+                        self.stroke = Stroke(self.canvas, self.color, self.brush_size, self.touch)
+                        self.stroke.add(pos)
+                    self.start_pos = pos
             
             elif event.type == MOUSEBUTTONUP:
                 if event.button == 1:  # Left click release
                     if self.drawing and self.start_pos:
-                        if self.mode == PEN:
-                            self.draw_line(self.last_pos, event.pos)
+                        pos = self.view.to_canvas(event.pos)
+                        if self.stroke:
+                            self.stroke.add(pos)
+                            self.stroke.end()
+                            self.add_primitive(Primitive(PEN, self.color, self.brush_size, self.stroke.points))
+                            self.stroke = None
+                        elif self.mode == MOVE:
+                            self.clear_preview()
+                            self.move_selected(self.start_pos, pos)
                         else:
                             # Draw the final shape
-                            self.draw_shape(self.start_pos, event.pos, True)
+                            self.clear_preview()
+                            self.draw_shape(self.start_pos, pos, True)
+                        self.history.end()
                     self.drawing = False
                     self.start_pos = None
+                    self.preview_pos = None
             
             elif event.type == MOUSEMOTION and self.drawing:
-                if self.mode == PEN:
-                    self.draw_line(self.last_pos, event.pos)
-                    self.last_pos = event.pos
-                elif self.mode in [SQUARE, RIGHT_TRIANGLE, EQUILATERAL_TRIANGLE, RHOMBUS]:
-                    # Redraw canvas to remove previous temporary shape
-                    temp_canvas = self.canvas.copy()
-                    self.draw_shape(self.start_pos, event.pos)
-                    self.canvas.blit(temp_canvas, (0, 0))
-                    self.draw_shape(self.start_pos, event.pos)
-
-    def draw_line(self, start, end):
-        """Draw a line between two points"""
-        pygame.draw.line(self.canvas, self.color, start, end, self.brush_size)
-        # Draw circles at the ends for smoother lines
-        pygame.draw.circle(self.canvas, self.color, start, self.brush_size // 2)
-        pygame.draw.circle(self.canvas, self.color, end, self.brush_size // 2)
+                if self.stroke:
+                    # Points are collected here and drawn once per frame by flush_stroke()
+                    self.stroke.add(self.view.to_canvas(event.pos))
+                elif self.mode in [SQUARE, RIGHT_TRIANGLE, EQUILATERAL_TRIANGLE, RHOMBUS, MOVE]:
+                    # Only the latest position matters; update_preview() draws it once per frame
+                    self.preview_pos = event.pos
+
+    def clear_preview(self):
+        """Erase the shape preview from the overlay"""
+        if self.preview_rect:
+            self.overlay.fill((0, 0, 0, 0), self.preview_rect)
+            self.preview_rect = None
+
+    def refresh_preview(self):
+        """Redraw the shape preview after the view moved"""
+        if self.drawing and not self.stroke:
+            self.preview_pos = self.mouse_pos
+
+    def update_preview(self):
+        """Redraw the shape preview at the latest drag position, if it moved"""
+        if self.preview_pos is None or not self.drawing:
+            return
+        self.clear_preview()
+        pos = self.view.to_canvas(self.preview_pos)
+        if self.mode == MOVE:
+            self.preview_rect = self.draw_move_preview(self.start_pos, pos)
+        else:
+            self.preview_rect = self.draw_shape(self.start_pos, pos)
+        self.preview_pos = None
+
+    def flush_stroke(self):
+        """Draw the pen points gathered this frame as one smoothed, antialiased pass"""
+        if self.stroke:
+            self.stroke.flush()
+
+    def save(self):
+        """Start saving the changes since the last save in the background"""
+        self.redraw.finish()
+        if self.saver.save(self.store, self.canvas, self.document):
+            pygame.display.set_caption(f"Advanced Paint - saving {self.store.path}")
+
+    def export_svg(self):
+        """Start writing the document to SVG_PATH in the background"""
+        self.saver.save(self.svg_export, self.canvas, self.document)
+        pygame.display.set_caption(f"Advanced Paint - exporting {SVG_PATH}")
+
+    def update_saves(self):
+        """Report finished saves and start an autosave when one is due"""
+        for store, error in self.saver.poll():
+            if error is not None:
+                pygame.display.set_caption(f"Advanced Paint - saving {store.path} failed: {error}")
+            elif store is self.store:
+                pygame.display.set_caption(f"Advanced Paint - saved {store.path}")
+            elif store is self.svg_export:
+                pygame.display.set_caption(f"Advanced Paint - exported {store.path}")
+        now = pygame.time.get_ticks()
+        if now >= self.next_autosave and not (self.drawing or self.redraw or self.saver.busy):
+            self.next_autosave = now + AUTOSAVE_SECONDS * 1000
+            self.saver.save(self.autosave_store, self.canvas, self.document)
+
+    def fill(self, pos):
+        """Bucket fill the area around pos, as far as the window shows"""
+        region = self.view.visible_rect(self.screen.get_rect())
+        self.redraw.finish(region)
+        runs = fill_runs(self.canvas, pos, region, FILL_TOLERANCE)
+        if runs is None:
+            return
+        primitive = Primitive(FILL, self.color, 0, runs)
+        self.history.begin()
+        self.touch(primitive.bounds)
+        primitive.draw(self.canvas)
+        self.add_primitive(primitive)
+        self.history.end()
+
+    def touch(self, rect):
+        """Get the tiles of rect ready to be drawn on: finish their queued redraws, then save their undo images
+
+        The undo history keeps whole tiles, so every queued piece in them is
+        finished, not just those overlapping rect.
+        """
+        keys = self.canvas.tile_keys(rect)
+        if keys and self.redraw:
+            self.redraw.finish(self.canvas.tile_rect(keys[0]).union(self.canvas.tile_rect(keys[-1])))
+        self.history.touch(rect)
+
+    def add_primitive(self, primitive):
+        """Record a drawn primitive in the document, undoably"""
+        id = self.document.add(primitive)
+        self.history.record(lambda: self.document.remove(id), lambda: self.document.add(primitive, id))
+
+    def move_delta(self, start, end):
+        return round(end[0] - start[0]), round(end[1] - start[1])
+
+    def move_selected(self, start, end):
+        """Move the selected primitive by end - start and queue a redraw of the areas it left and entered
+
+        The move is undone and redone on the document alone; the canvas
+        follows through the redraw queue, so no tile images are kept.
+        """
+        dx, dy = self.move_delta(start, end)
+        id, self.selected = self.selected, None
+        if not (dx or dy):
+            return
+        old = self.document.primitives[id]
+        new = old.moved(dx, dy)
+
+        def place(primitive):
+            self.document.replace(id, primitive)
+            self.redraw.add(old.bounds)
+            self.redraw.add(new.bounds)
+
+        self.history.record(lambda: place(old), lambda: place(new))
+        place(new)
+
+    def draw_move_preview(self, start, end):
+        """Draw the selected primitive moved by end - start on the overlay; returns its screen rect"""
+        view = self.view
+        primitive = self.document.primitives[self.selected].moved(*self.move_delta(start, end))
+        color = (*primitive.color, 128)
+        width = max(1, round(primitive.width * view.zoom))
+        if primitive.kind == FILL:
+            x, y = view.to_screen(primitive.bounds.topleft)
+            rect = pygame.Rect(round(x), round(y), round(primitive.bounds.width * view.zoom),
+                               round(primitive.bounds.height * view.zoom))
+            return pygame.draw.rect(self.overlay, color, rect, 2)
+        if primitive.kind == PEN:
+            points = [view.to_screen(point) for point in primitive.points]
+            if len(points) == 1:
+                return pygame.draw.circle(self.overlay, color, points[0], max(1, width // 2))
+            return pygame.draw.lines(self.overlay, color, False, points, width)
+        return self.draw_preview_geometry(primitive.geometry(), color, primitive.width)
+
+    def draw_preview_geometry(self, shape, color, width):
+        """Draw canvas-space geometry on the overlay at the current zoom"""
+        view = self.view
+        if isinstance(shape, pygame.Rect):
+            x, y = view.to_screen(shape.topleft)
+            shape = pygame.Rect(round(x), round(y), round(shape.width * view.zoom), round(shape.height * view.zoom))
+        else:
+            shape = [view.to_screen(point) for point in shape]
+        return draw_geometry(self.overlay, color, shape, max(1, round(width * view.zoom)))
 
     def draw_shape(self, start, end, final=False):
-        """Draw the selected shape"""
+        """Draw the selected shape on the canvas, or as a translucent preview on the overlay
+
+        start and end are canvas coordinates. Returns the bounding rect of
+        what was drawn (in canvas coordinates when final, else on screen).
+        """
+        shape = self.shape_geometry(start, end)
+        if final:
+            bounds = points_rect(self.shape_points(shape), self.brush_size)
+            self.touch(bounds)
+            self.canvas.draw(bounds, self.color, lambda surface, origin: draw_geometry(
+                surface, self.color, shape, self.brush_size, origin))
+            self.add_primitive(Primitive(self.mode, self.color, self.brush_size, self.shape_points(shape)))
+            return bounds
+        
+        # Preview in screen space at the current zoom
+        return self.draw_preview_geometry(shape, (*self.color, 128), self.brush_size)
+
+    def shape_points(self, shape):
+        if isinstance(shape, pygame.Rect):
+            return [shape.topleft, shape.bottomright]
+        return shape
+
+    def shape_geometry(self, start, end):
+        """Square (as a Rect) or polygon points of the selected shape"""
         x1, y1 = start
         x2, y2 = end
         width = abs(x2 - x1)
@@ -175,23 +444,10 @@ class PaintApp:
         
         if self.mode == SQUARE:
             size = min(width, height)
-            if final:
-                pygame.draw.rect(self.canvas, self.color, 
-                               (rect_x, rect_y, size, size), self.brush_size)
-            else:
-                # Draw temporary square
-                temp_surf = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-                pygame.draw.rect(temp_surf, (*self.color, 128), (rect_x, rect_y, size, size), self.brush_size)
-                self.screen.blit(temp_surf, (0, 0))
+            return pygame.Rect(rect_x, rect_y, size, size)
         
         elif self.mode == RIGHT_TRIANGLE:
             points = [(x1, y1), (x1, y2), (x2, y2)]
-            if final:
-                pygame.draw.polygon(self.canvas, self.color, points, self.brush_size)
-            else:
-                temp_surf = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-                pygame.draw.polygon(temp_surf, (*self.color, 128), points, self.brush_size)
-                self.screen.blit(temp_surf, (0, 0))
         
         elif self.mode == EQUILATERAL_TRIANGLE:
             height = math.sqrt(3) / 2 * width
@@ -201,12 +457,6 @@ class PaintApp:
                 (x1, y1 + height),
                 (x2, y1 + height)
             ]
-            if final:
-                pygame.draw.polygon(self.canvas, self.color, points, self.brush_size)
-            else:
-                temp_surf = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-                pygame.draw.polygon(temp_surf, (*self.color, 128), points, self.brush_size)
-                self.screen.blit(temp_surf, (0, 0))
         
         elif self.mode == RHOMBUS:
             center_x = (x1 + x2) / 2
@@ -217,25 +467,51 @@ class PaintApp:
                 (center_x, y2),
                 (x1, center_y)
             ]
-            if final:
-                pygame.draw.polygon(self.canvas, self.color, points, self.brush_size)
-            else:
-                temp_surf = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-                pygame.draw.polygon(temp_surf, (*self.color, 128), points, self.brush_size)
-                self.screen.blit(temp_surf, (0, 0))
+        
+        return points
+
+    def update(self, events=None):
+        """Handle one frame of input and draw what it changed on the canvas"""
+        self.handle_events(events)
+        self.flush_stroke()
+        if self.redraw:
+            self.redraw.run(REDRAW_BUDGET)
+        self.update_preview()
+        self.update_saves()
+        self.profiler.mark('events')
+
+    def draw(self):
+        """Compose the canvas, preview and UI on the screen"""
+        self.view.render(self.screen)
+        if self.preview_rect:
+            self.screen.blit(self.overlay, self.preview_rect, self.preview_rect)
+        self.profiler.mark('compose')
+        self.draw_ui()
+        self.profiler.draw_overlay(self.screen, 'bottomright')
+        self.profiler.mark('ui')
 
     def run(self):
         """Main application loop"""
+        profiler = self.profiler
         while True:
-            self.screen.fill(WHITE)
-            self.screen.blit(self.canvas, (0, 0))
-            
-            self.handle_events()
-            self.draw_ui()
+            profiler.begin_frame()
+            self.update()
+            self.draw()
             
             pygame.display.flip()
+            profiler.mark('present')
             self.clock.tick(60)
+            profiler.end_frame()
 
 if __name__ == "__main__":
-    app = PaintApp()
+    # Usage: python paint2.py [WIDTHxHEIGHT] [--backing FILE] [--file DRAWING]
+    args = sys.argv[1:]
+    options = {}
+    for option in ('--backing', '--file'):
+        if option in args:
+            index = args.index(option)
+            options[option] = args[index + 1]
+            del args[index:index + 2]
+    size = tuple(int(n) for n in args[0].split('x')) if args else (WINDOW_WIDTH, WINDOW_HEIGHT)
+    app = PaintApp(size, options.get('--backing'), options.get('--file'))
     app.run()
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""Large tiled canvas with zoom/pan rendering for paint2.
+
+TiledCanvas stores the image as TILE_SIZE x TILE_SIZE 24-bit tiles.
+- Blank (never drawn) tiles take no memory; they are created white on the
+  first draw.
+- With a backing path, the pixels live in a numpy memmap with one
+  contiguous block per tile. Tile surfaces are pygame.image.frombuffer()
+  views of that memory, so drawing writes straight to the mapped file and
+  images larger than RAM can be edited. The file starts with a header
+  (canvas and tile size) and one byte per tile saying whether it holds
+  pixels, so blank and cleared tiles stay blank when it is reopened.
+
+Drawing tools work in canvas coordinates. draw() runs a pygame.draw call on
+a scratch surface covering the area, then copies the drawn pixels into the
+tiles. pygame clips lines to the surface, so drawing straight into each
+tile would rasterize differently along the seams.
+
+CanvasView maps the window onto the canvas at a zoom level and a pan
+offset. It blits only the tiles in view, from a per-zoom cache of scaled
+tile surfaces that is refreshed when a tile's version changes.
+"""
+import os
+import struct
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+TILE_SIZE = 256
+ZOOM_LEVELS = [0.125, 0.25, 0.5, 1, 2, 4, 8]
+SCRATCH_PIXELS = 4096 * 4096  # Largest area draw() renders in one piece
+VIEW_CACHE_SIZE = 1024  # Scaled tile surfaces kept across zoom levels
+BLANK_COLOR = (255, 255, 255)
+BACKGROUND_COLOR = (120, 120, 120)  # Window area outside the canvas
+BACKING_MAGIC = b'PTCV'
+BACKING_VERSION = 1
+BACKING_HEADER = struct.Struct('<4sHIII')  # Magic, version, width, height, tile size
+
+
+class TiledCanvas:
+    """Canvas of lazily allocated tiles, optionally backed by a memory-mapped file"""
+    def __init__(self, width, height, tile_size=TILE_SIZE, path=None):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.columns = -(-width // tile_size)
+        self.rows = -(-height // tile_size)
+        self.surfaces = {}  # (tx, ty) -> tile Surface
+        self.versions = {}  # (tx, ty) -> change counter, for view caches
+        self.store = None
+        if path is not None:
+            self.open_backing(path)
+
+    def open_backing(self, path):
+        """Map the tile pixels and written flags from path, creating the file if needed
+
+        Raises ValueError if the file is not a backing file for a canvas of
+        this size and tile size.
+        """
+        tiles = self.rows * self.columns
+        offset = BACKING_HEADER.size + tiles
+        size = offset + tiles * self.tile_size * self.tile_size * 3
+        header = BACKING_HEADER.pack(BACKING_MAGIC, BACKING_VERSION, self.width, self.height, self.tile_size)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                found = f.read(BACKING_HEADER.size)
+            if len(found) < BACKING_HEADER.size or found[:4] != BACKING_MAGIC:
+                raise ValueError(f"{path} is not a canvas backing file")
+            _, version, width, height, tile_size = BACKING_HEADER.unpack(found)
+            if found != header:
+                raise ValueError(f"{path} holds a {width}x{height} canvas with {tile_size} px tiles "
+                                 f"(version {version}), not {self.width}x{self.height} with {self.tile_size} px")
+            if os.path.getsize(path) != size:
+                raise ValueError(f"{path} is {os.path.getsize(path)} bytes, expected {size}")
+        else:
+            with open(path, 'wb') as f:
+                f.write(header)
+                f.truncate(size)  # Sparse where supported; every tile starts unwritten
+        # One byte per tile: whether it holds pixels or is blank
+        self.written = np.memmap(path, dtype=np.uint8, mode='r+', offset=BACKING_HEADER.size,
+                                 shape=(self.rows, self.columns))
+        self.store = np.memmap(path, dtype=np.uint8, mode='r+', offset=offset,
+                               shape=(self.rows, self.columns, self.tile_size, self.tile_size, 3))
+
+    def get_size(self):
+        return self.width, self.height
+
+    def get_rect(self):
+        return pygame.Rect(0, 0, self.width, self.height)
+
+    def tile(self, key, create=True):
+        """Surface of one tile; blank tiles give None unless create is set"""
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            return surface
+        tx, ty = key
+        if self.store is not None:
+            written = self.written[ty, tx]
+            if not (written or create):
+                return None
+            surface = pygame.image.frombuffer(self.store[ty, tx], (self.tile_size, self.tile_size), 'RGB')
+            if not written:
+                surface.fill(BLANK_COLOR)
+                self.written[ty, tx] = True
+        else:
+            if not create:
+                return None
+            surface = pygame.Surface((self.tile_size, self.tile_size), 0, 24)
+            surface.fill(BLANK_COLOR)
+        self.surfaces[key] = surface
+        return surface
+
+    def tile_rect(self, key):
+        """Canvas rect of a tile (edge tiles are clipped to the canvas)"""
+        size = self.tile_size
+        return pygame.Rect(key[0] * size, key[1] * size, size, size).clip(self.get_rect())
+
+    def tile_keys(self, rect):
+        """Keys of the tiles a canvas rect overlaps"""
+        rect = pygame.Rect(rect).clip(self.get_rect())
+        if not rect:
+            return []
+        size = self.tile_size
+        return [(tx, ty)
+                for ty in range(rect.top // size, (rect.bottom - 1) // size + 1)
+                for tx in range(rect.left // size, (rect.right - 1) // size + 1)]
+
+    def changed(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def draw(self, rect, color, func, clip=None):
+        """Draw the area in rect with func(surface, origin), which draws in one solid color
+
+        func draws in the coordinates of surface, i.e. canvas coordinates
+        minus origin. Only pixels inside clip, if given, are changed. Areas
+        above SCRATCH_PIXELS are drawn tile by tile.
+        """
+        rect = pygame.Rect(rect).clip(self.get_rect())
+        target = rect if clip is None else rect.clip(clip)
+        if not target:
+            return
+        if rect.width * rect.height > SCRATCH_PIXELS:
+            for key in self.tile_keys(target):
+                origin = (key[0] * self.tile_size, key[1] * self.tile_size)
+                surface = self.tile(key)
+                surface.set_clip(target.move(-origin[0], -origin[1]))
+                func(surface, origin)
+                surface.set_clip(None)
+                self.changed(key)
+            return
+        key_color = (0, 0, 0) if tuple(color[:3]) != (0, 0, 0) else (255, 255, 255)
+        scratch = pygame.Surface(rect.size, 0, 24)
+        scratch.fill(key_color)
+        scratch.set_colorkey(key_color)
+        func(scratch, rect.topleft)
+        area = target.move(-rect.x, -rect.y)
+        for key in self.tile_keys(target):
+            origin = (key[0] * self.tile_size, key[1] * self.tile_size)
+            self.tile(key).blit(scratch, (target.x - origin[0], target.y - origin[1]), area)
+            self.changed(key)
+
+    def clear_rect(self, rect):
+        """Make an area blank again; whole tiles are dropped"""
+        rect = pygame.Rect(rect).clip(self.get_rect())
+        for key in self.tile_keys(rect):
+            tile_rect = self.tile_rect(key)
+            if rect.contains(tile_rect):
+                self.clear_tile(key)
+                continue
+            surface = self.tile(key, create=False)
+            if surface is not None:
+                surface.fill(BLANK_COLOR, rect.clip(tile_rect).move(-tile_rect.x, -tile_rect.y))
+                self.changed(key)
+
+    def read_tile(self, rect):
+        """RGB bytes of a rect inside one tile, or None if the tile is blank"""
+        key = (rect.x // self.tile_size, rect.y // self.tile_size)
+        surface = self.tile(key, create=False)
+        if surface is None:
+            return None
+        local = rect.move(-key[0] * self.tile_size, -key[1] * self.tile_size)
+        return pygame.image.tobytes(surface.subsurface(local), 'RGB')
+
+    def write_tile(self, rect, data):
+        """Inverse of read_tile: None makes the tile blank again"""
+        key = (rect.x // self.tile_size, rect.y // self.tile_size)
+        if data is None:
+            self.clear_tile(key)
+        else:
+            local = rect.move(-key[0] * self.tile_size, -key[1] * self.tile_size)
+            self.tile(key).blit(pygame.image.frombytes(data, rect.size, 'RGB'), local)
+        self.changed(key)
+
+    def clear_tile(self, key):
+        self.surfaces.pop(key, None)
+        if self.store is not None:
+            self.written[key[1], key[0]] = False
+        self.changed(key)
+
+    def clear(self):
+        """Make every tile blank"""
+        keys = set(self.surfaces)
+        if self.store is not None:
+            # Tiles written in an earlier session may not be loaded yet
+            keys.update((int(tx), int(ty)) for ty, tx in zip(*np.nonzero(self.written)))
+        for key in keys:
+            self.clear_tile(key)
+
+    def flush(self):
+        """Write memory-mapped pixels and written flags out to the backing file"""
+        if self.store is not None:
+            self.store.flush()
+            self.written.flush()
+
+
+class CanvasView:
+    """Zoomed and panned window onto a TiledCanvas
+
+    offset is the screen position of the canvas origin, kept in whole
+    pixels so tiles line up without seams.
+    """
+    def __init__(self, canvas, zoom=1, offset=(0, 0), cache_size=VIEW_CACHE_SIZE):
+        self.canvas = canvas
+        self.zoom = zoom
+        self.offset = offset
+        self.cache = OrderedDict()  # (zoom, key) -> (tile version, scaled surface)
+        self.cache_size = cache_size
+
+    def to_canvas(self, pos):
+        """Canvas coordinates of a screen position"""
+        return ((pos[0] - self.offset[0]) / self.zoom, (pos[1] - self.offset[1]) / self.zoom)
+
+    def to_screen(self, pos):
+        """Screen coordinates of a canvas position"""
+        return (pos[0] * self.zoom + self.offset[0], pos[1] * self.zoom + self.offset[1])
+
+    def pan(self, dx, dy):
+        self.offset = (self.offset[0] + dx, self.offset[1] + dy)
+
+    def zoom_at(self, pos, steps):
+        """Move steps zoom levels in or out, keeping the canvas point under pos fixed"""
+        levels = ZOOM_LEVELS
+        index = min(len(levels) - 1, max(0, levels.index(self.zoom) + steps))
+        zoom = levels[index]
+        if zoom == self.zoom:
+            return
+        x, y = self.to_canvas(pos)
+        self.zoom = zoom
+        self.offset = (round(pos[0] - x * zoom), round(pos[1] - y * zoom))
+
+    def scaled_tile(self, key):
+        """Tile surface at the current zoom, from the cache when up to date"""
+        version = self.canvas.versions.get(key, 0)
+        cache_key = (self.zoom, key)
+        entry = self.cache.get(cache_key)
+        if entry is not None and entry[0] == version:
+            self.cache.move_to_end(cache_key)
+            return entry[1]
+        surface = self.canvas.tile(key, create=False)
+        if surface is None:
+            return None
+        if self.zoom != 1:
+            size = round(self.canvas.tile_size * self.zoom)
+            scale = pygame.transform.smoothscale if self.zoom < 1 else pygame.transform.scale
+            surface = scale(surface, (size, size))
+        self.cache[cache_key] = (version, surface)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return surface
+
+    def visible_rect(self, screen_rect):
+        """Canvas area shown in screen_rect (may extend past the canvas)"""
+        left, top = self.to_canvas(screen_rect.topleft)
+        right, bottom = self.to_canvas(screen_rect.bottomright)
+        return pygame.Rect(int(left), int(top), int(right - left) + 2, int(bottom - top) + 2)
+
+    def render(self, screen):
+        """Draw the visible part of the canvas onto screen"""
+        canvas = self.canvas
+        zoom = self.zoom
+        screen_rect = screen.get_rect()
+        canvas_rect = pygame.Rect(self.offset, (round(canvas.width * zoom), round(canvas.height * zoom)))
+        if not canvas_rect.contains(screen_rect):
+            screen.fill(BACKGROUND_COLOR)
+        for key in canvas.tile_keys(self.visible_rect(screen_rect)):
+            tile_rect = canvas.tile_rect(key)
+            pos = (round(tile_rect.x * zoom) + self.offset[0], round(tile_rect.y * zoom) + self.offset[1])
+            area = pygame.Rect(0, 0, round(tile_rect.width * zoom), round(tile_rect.height * zoom))
+            surface = self.scaled_tile(key)
+            if surface is None:
+                screen.fill(BLANK_COLOR, area.move(pos))
+            else:
+                screen.blit(surface, pos, area)
@@ -0,0 +1,599 @@
+"""Retained vector document for paint2.
+
+Every stroke and shape drawn is also recorded as a Primitive: its kind, its
+colour, its brush width and its points in canvas coordinates. The canvas
+pixels stay the fast path for display. The document adds:
+
+- Hit-testing, so primitives can be selected and moved.
+- Redrawing any region of the canvas from the primitives (rasterize()),
+  at the canvas resolution or scaled. Primitives under a fill that covers
+  the whole region are skipped. RedrawQueue spreads large redraws over
+  several frames.
+- Streaming SVG export: each element is written as soon as it is formatted.
+
+Bucket fills are recorded as the runs of pixels they covered, so they can
+be redrawn, moved and exported like the outlines.
+
+Primitives are indexed by their bounding rects in a QuadTree. Queries and
+hit tests only look at the nodes a rect overlaps, so they stay fast with
+100k+ primitives. Primitive ids grow with every add and give the z-order.
+"""
+import math
+import time
+
+import numpy as np
+import pygame
+
+from paint_canvas import BLANK_COLOR
+from paint_stroke import Stroke, run_boxes, spline_samples
+
+# Primitive kinds, numbered like paint2's tool modes
+PEN = 0
+SQUARE = 1
+RIGHT_TRIANGLE = 2
+EQUILATERAL_TRIANGLE = 3
+RHOMBUS = 4
+FILL = 5
+KIND_NAMES = {PEN: "pen", SQUARE: "square", RIGHT_TRIANGLE: "right-triangle",
+              EQUILATERAL_TRIANGLE: "equilateral-triangle", RHOMBUS: "rhombus", FILL: "fill"}
+
+QUAD_CAPACITY = 16  # Items a quadtree leaf holds before it splits
+QUAD_DEPTH = 12
+HIT_TOLERANCE = 3  # Extra pixels around a primitive that still count as a hit
+REDRAW_CHUNK = 256  # Side of the grid squares a RedrawQueue cuts areas into
+REDRAW_PRIMITIVES = 32  # Pieces overlapping more primitives than this are split before redrawing
+REDRAW_MIN_SIDE = 16  # Pieces this narrow are not split further
+
+
+def points_rect(points, margin):
+    """Bounding rect of some points, grown by margin on every side"""
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    left, top = int(math.floor(min(xs))) - margin, int(math.floor(min(ys))) - margin
+    return pygame.Rect(left, top, int(math.ceil(max(xs))) + margin + 1 - left,
+                       int(math.ceil(max(ys))) + margin + 1 - top)
+
+
+def draw_geometry(surface, color, shape, width, origin=(0, 0)):
+    """Draw a square (Rect) or polygon (point list) outline, translated by -origin"""
+    if isinstance(shape, pygame.Rect):
+        return pygame.draw.rect(surface, color, shape.move(-origin[0], -origin[1]), width)
+    return pygame.draw.polygon(surface, color, [(x - origin[0], y - origin[1]) for x, y in shape], width)
+
+
+def bezier_controls(points):
+    """Inner Bezier control points of the Catmull-Rom spline a Stroke draws through points
+
+    Returns two arrays: the first and second control point of each segment.
+    The spline lies inside the hull of each segment's control points, and
+    SVG can draw it exactly as cubic Beziers.
+    """
+    p = np.asarray(points, dtype=np.float64)
+    padded = np.concatenate([p[:1], p, p[-1:]])  # End segments repeat their end point
+    first = p[:-1] + (padded[2:-1] - padded[:-3]) / 6
+    second = p[1:] - (padded[3:] - padded[1:-2]) / 6
+    return first, second
+
+
+def segment_distance(pos, a, b):
+    """Distance from pos to the line segment a-b"""
+    ax, ay = a
+    dx, dy = b[0] - ax, b[1] - ay
+    length2 = dx * dx + dy * dy
+    t = 0.0
+    if length2:
+        t = min(1.0, max(0.0, ((pos[0] - ax) * dx + (pos[1] - ay) * dy) / length2))
+    return math.hypot(pos[0] - ax - t * dx, pos[1] - ay - t * dy)
+
+
+def svg_color(color):
+    return "#%02x%02x%02x" % tuple(color[:3])
+
+
+def write_svg(file, size, primitives):
+    """Write primitives, bottom first, as an SVG image of size to a text file, one at a time"""
+    width, height = size
+    file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    file.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+               f'viewBox="0 0 {width} {height}">\n')
+    file.write(f'<rect width="100%" height="100%" fill="{svg_color(BLANK_COLOR)}"/>\n')
+    for primitive in primitives:
+        file.write(primitive.svg())
+        file.write("\n")
+    file.write("</svg>\n")
+
+
+class Primitive:
+    """One recorded stroke or shape
+
+    points holds the pen input points for PEN, the top-left and
+    bottom-right corners for SQUARE, and the vertices for the polygons.
+    For FILL it is an int32 array of pixel runs (y, x0, x1), sorted by y,
+    as paint_fill.fill_runs() returns them.
+
+    A pen primitive keeps its flattened spline and the box of each run of it
+    once it has been drawn, so redrawing a region only stamps the runs that
+    reach into it.
+    """
+    __slots__ = ('kind', 'color', 'width', 'points', 'bounds', 'cached_polyline')
+
+    def __init__(self, kind, color, width, points):
+        self.kind = kind
+        self.color = tuple(color[:3])
+        self.width = width
+        if kind == FILL:
+            self.points = np.asarray(points, dtype=np.int32).reshape(-1, 3)
+        else:
+            self.points = [tuple(point) for point in points]
+        self.bounds = self.compute_bounds()
+        self.cached_polyline = None
+
+    def record(self):
+        """Plain lists for saving; Primitive(*record) rebuilds the primitive"""
+        points = self.points.tolist() if self.kind == FILL else self.points
+        return [self.kind, self.color, self.width, points]
+
+    def geometry(self):
+        """Rect for a square, point list for the other kinds"""
+        if self.kind == SQUARE:
+            (x0, y0), (x1, y1) = self.points
+            return pygame.Rect(x0, y0, x1 - x0, y1 - y0)
+        return self.points
+
+    def compute_bounds(self):
+        if self.kind == FILL:
+            runs = self.points
+            top, left = runs[:, :2].min(axis=0)
+            return pygame.Rect(int(left), int(top), int(runs[:, 2].max() - left), int(runs[-1, 0] + 1 - top))
+        if self.kind != PEN:
+            return points_rect(self.points, self.width)
+        margin = int(math.ceil(self.width / 2)) + 2  # Stroke.stamp's reach
+        if len(self.points) == 1:
+            return points_rect(self.points, margin)
+        first, second = bezier_controls(self.points)
+        hull = np.concatenate([np.asarray(self.points), first, second])
+        return points_rect(hull.tolist(), margin)
+
+    def polyline(self):
+        """Spline samples of a pen primitive and their run_boxes(), computed on first use"""
+        if self.cached_polyline is None:
+            points = self.points
+            samples = spline_samples(points) if len(points) > 1 else np.array(points * 2, dtype=np.float64)
+            self.cached_polyline = samples, run_boxes(samples, self.width)
+        return self.cached_polyline
+
+    def moved(self, dx, dy):
+        if self.kind == FILL:
+            return Primitive(FILL, self.color, self.width, self.points + np.array([dy, dx, dx], dtype=np.int32))
+        primitive = Primitive(self.kind, self.color, self.width, [(x + dx, y + dy) for x, y in self.points])
+        if self.cached_polyline is not None and isinstance(dx, int) and isinstance(dy, int):
+            # Whole-pixel moves shift the polyline and its boxes exactly
+            samples, boxes = self.cached_polyline
+            primitive.cached_polyline = samples + (dx, dy), boxes + (dx, dy, dx, dy)
+        return primitive
+
+    def scaled(self, factor):
+        if self.kind == FILL:
+            # Each run covers rows y * factor to (y + 1) * factor, at least one
+            ys, x0, x1 = self.points.T.astype(np.float64)
+            top = np.floor(ys * factor).astype(np.int64)
+            rows = np.maximum(1, np.floor((ys + 1) * factor).astype(np.int64) - top)
+            left = np.floor(x0 * factor).astype(np.int64)
+            right = np.maximum(left + 1, np.ceil(x1 * factor).astype(np.int64))
+            offsets = np.arange(rows.sum()) - np.repeat(np.cumsum(rows) - rows, rows)
+            runs = np.stack([np.repeat(top, rows) + offsets, np.repeat(left, rows), np.repeat(right, rows)], axis=1)
+            return Primitive(FILL, self.color, self.width, runs[np.argsort(runs[:, 0], kind='stable')])
+        points = [(x * factor, y * factor) for x, y in self.points]
+        if self.kind == SQUARE:
+            points = [(round(x), round(y)) for x, y in points]
+        return Primitive(self.kind, self.color, max(1, round(self.width * factor)), points)
+
+    def distance(self, pos):
+        """Distance from pos to the drawn outline (0 inside the brush)"""
+        points = self.points
+        if self.kind == FILL:
+            x, y = int(math.floor(pos[0])), int(math.floor(pos[1]))
+            lo, hi = np.searchsorted(points[:, 0], [y, y + 1])
+            row = points[lo:hi]
+            return 0.0 if ((row[:, 1] <= x) & (x < row[:, 2])).any() else math.inf
+        if self.kind == PEN:
+            if len(points) == 1:
+                edge = math.dist(pos, points[0])
+            else:
+                edge = min(segment_distance(pos, a, b) for a, b in zip(points, points[1:]))
+            return max(0.0, edge - self.width / 2)
+        if self.kind == SQUARE:
+            (x0, y0), (x1, y1) = points
+            points = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        edge = min(segment_distance(pos, a, b) for a, b in zip(points, points[1:] + points[:1]))
+        return max(0.0, edge - self.width)
+
+    def draw(self, canvas, clip=None):
+        """Draw onto a TiledCanvas, changing only pixels inside clip"""
+        if self.kind == FILL:
+            self.draw_runs(canvas, clip)
+            return
+        if self.kind == PEN:
+            Stroke(canvas, self.color, self.width, clip=clip).draw_samples(*self.polyline())
+            return
+        shape = self.geometry()
+        canvas.draw(self.bounds, self.color, lambda surface, origin: draw_geometry(
+            surface, self.color, shape, self.width, origin), clip)
+
+    def covers(self, rect):
+        """Whether drawing this primitive sets every pixel of rect (only fills can)
+
+        True when each row of rect lies inside one run. Rows are checked
+        rather than pixels counted because the runs of scaled fills can overlap.
+        """
+        if self.kind != FILL or not self.bounds.contains(rect):
+            return False
+        runs = self.points
+        lo, hi = np.searchsorted(runs[:, 0], [rect.top, rect.bottom])
+        band = runs[lo:hi]
+        spanned = np.zeros(rect.height, dtype=bool)
+        spanned[band[(band[:, 1] <= rect.left) & (band[:, 2] >= rect.right), 0] - rect.top] = True
+        return bool(spanned.all())
+
+    def coverage(self, rect):
+        """Bool array (row-major) of the pixels of rect that a fill's runs set"""
+        runs = self.points
+        lo, hi = np.searchsorted(runs[:, 0], [rect.top, rect.bottom])
+        band = runs[lo:hi]
+        # Runs are clipped to rect; those outside it start and end at the same place
+        stride = rect.width + 1
+        rows = (band[:, 0] - rect.top) * stride - rect.left
+        starts = rows + np.clip(band[:, 1], rect.left, rect.right)
+        ends = rows + np.clip(band[:, 2], rect.left, rect.right)
+        cells = rect.height * stride
+        # Gaps and runs in turn. Runs in order that don't overlap (all but some scaled
+        # fills) never make a length negative and give the coverage in one np.repeat.
+        bounds = np.empty(2 * len(band) + 2, dtype=np.int64)
+        bounds[0], bounds[-1] = 0, cells
+        bounds[1:-1:2], bounds[2:-1:2] = starts, ends
+        lengths = np.diff(bounds)
+        if (lengths >= 0).all():
+            inside = np.zeros(len(lengths), dtype=bool)
+            inside[1::2] = True
+            covered = np.repeat(inside, lengths)
+        else:
+            # +1 where a run starts, -1 where it ends; the running sum is the coverage
+            marks = np.bincount(starts, minlength=cells) - np.bincount(ends, minlength=cells)
+            covered = np.cumsum(marks, dtype=np.int16) > 0
+        return covered.reshape(rect.height, stride)[:, :-1]
+
+    def draw_runs(self, canvas, clip):
+        """Set the pixels of a fill's runs, one row of tiles at a time
+
+        Tiles the runs fully cover are filled; the others get the coverage
+        blitted as an 8-bit stencil, where index 1 is the fill colour and 0
+        the colorkey. SDL's colorkey blit is many times faster than masked
+        copies into a pixels3d view.
+        """
+        rect = self.bounds if clip is None else self.bounds.clip(clip)
+        size = canvas.tile_size
+        row = covered = None
+        for key in canvas.tile_keys(rect):
+            if key[1] != row:
+                row = key[1]
+                top, bottom = max(rect.top, row * size), min(rect.bottom, (row + 1) * size)
+                covered = self.coverage(pygame.Rect(rect.left, top, rect.width, bottom - top))
+            part = canvas.tile_rect(key).clip(rect)
+            cells = covered[:, part.left - rect.left:part.right - rect.left]
+            if not cells.any():
+                continue
+            local = part.move(-key[0] * size, -key[1] * size)
+            surface = canvas.tile(key)
+            if cells.all():
+                surface.fill(self.color, local)
+            else:
+                stencil = pygame.image.frombuffer(np.ascontiguousarray(cells).view(np.uint8), part.size, "P")
+                stencil.set_palette_at(1, self.color)
+                stencil.set_colorkey(0)
+                surface.blit(stencil, local)
+            canvas.changed(key)
+
+    def svg(self):
+        """SVG element for this primitive"""
+        color = svg_color(self.color)
+        width = self.width
+        kind = KIND_NAMES[self.kind]
+        if self.kind == FILL:
+            path = "".join(f"M{x0},{y}h{x1 - x0}v1h{x0 - x1}z" for y, x0, x1 in self.points.tolist())
+            return f'<path class="{kind}" d="{path}" fill="{color}" shape-rendering="crispEdges"/>'
+        if self.kind == PEN:
+            if len(self.points) == 1:
+                x, y = self.points[0]
+                return f'<circle class="{kind}" cx="{x:g}" cy="{y:g}" r="{width / 2:g}" fill="{color}"/>'
+            first, second = bezier_controls(self.points)
+            path = [f"M{self.points[0][0]:g},{self.points[0][1]:g}"]
+            for (ax, ay), (bx, by), (x, y) in zip(first.tolist(), second.tolist(), self.points[1:]):
+                path.append(f"C{ax:.2f},{ay:.2f} {bx:.2f},{by:.2f} {x:g},{y:g}")
+            return (f'<path class="{kind}" d="{" ".join(path)}" fill="none" stroke="{color}" '
+                    f'stroke-width="{width}" stroke-linecap="round" stroke-linejoin="round"/>')
+        if self.kind == SQUARE:
+            # pygame draws the border inside the rect, so inset SVG's centred stroke
+            rect = self.geometry()
+            return (f'<rect class="{kind}" x="{rect.x + width / 2:g}" y="{rect.y + width / 2:g}" '
+                    f'width="{max(0, rect.width - width):g}" height="{max(0, rect.height - width):g}" '
+                    f'fill="none" stroke="{color}" stroke-width="{width}"/>')
+        points = " ".join(f"{x:g},{y:g}" for x, y in self.points)
+        return f'<polygon class="{kind}" points="{points}" fill="none" stroke="{color}" stroke-width="{width}"/>'
+
+
+class QuadNode:
+    __slots__ = ('rect', 'loose', 'depth', 'items', 'children')
+
+    def __init__(self, rect, depth):
+        self.rect = rect
+        self.loose = rect.inflate(rect.width, rect.height)  # Rect its items may extend over
+        self.depth = depth
+        self.items = {}  # Item -> rect
+        self.children = None
+
+
+class QuadTree:
+    """Loose quadtree of item rects
+
+    Each node accepts items that extend up to half its size past its edges.
+    An item goes down to the child holding its centre for as long as it
+    fits in that child's loose rect, so small items that straddle a split
+    line still reach small nodes. Items outside the root are kept in the
+    root.
+    """
+    def __init__(self, rect, capacity=QUAD_CAPACITY, max_depth=QUAD_DEPTH):
+        self.root = QuadNode(pygame.Rect(rect), 0)
+        self.capacity = capacity
+        self.max_depth = max_depth
+        self.nodes = {}  # Item -> node holding it
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def child_for(self, node, rect):
+        x, y, w, h = node.rect
+        index = (rect.centerx >= x + w // 2) + 2 * (rect.centery >= y + h // 2)
+        child = node.children[index]
+        return child if child.loose.contains(rect) else None
+
+    def insert(self, item, rect):
+        node = self.root
+        while node.children:
+            child = self.child_for(node, rect)
+            if child is None:
+                break
+            node = child
+        node.items[item] = rect
+        self.nodes[item] = node
+        if node.children is None and len(node.items) > self.capacity and node.depth < self.max_depth:
+            self.split(node)
+
+    def split(self, node):
+        x, y, w, h = node.rect
+        half_w, half_h = w // 2, h // 2
+        if not (half_w and half_h):
+            return
+        node.children = [QuadNode(pygame.Rect(cx, cy, cw, ch), node.depth + 1)
+                         for cy, ch in ((y, half_h), (y + half_h, h - half_h))
+                         for cx, cw in ((x, half_w), (x + half_w, w - half_w))]
+        for item, rect in list(node.items.items()):
+            child = self.child_for(node, rect)
+            if child is not None:
+                del node.items[item]
+                child.items[item] = rect
+                self.nodes[item] = child
+
+    def remove(self, item):
+        node = self.nodes.pop(item)
+        del node.items[item]
+
+    def query(self, rect):
+        """Items whose rects overlap rect, in no particular order"""
+        rect = pygame.Rect(rect)
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            found.extend(item for item, item_rect in node.items.items() if item_rect.colliderect(rect))
+            if node.children:
+                stack.extend(child for child in node.children if child.loose.colliderect(rect))
+        return found
+
+
+class Document:
+    """Ordered primitives of one drawing with a spatial index"""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.primitives = {}  # Id -> Primitive
+        self.index = QuadTree((0, 0, width, height))
+        self.next_id = 0
+        self.version = 0  # Bumped on every change, for savers
+
+    def __len__(self):
+        return len(self.primitives)
+
+    def add(self, primitive, id=None):
+        """Add a primitive on top (or back at its old id, for undo); returns its id"""
+        if id is None:
+            id = self.next_id
+        self.next_id = max(self.next_id, id + 1)
+        self.primitives[id] = primitive
+        self.index.insert(id, primitive.bounds)
+        self.version += 1
+        return id
+
+    def remove(self, id):
+        self.index.remove(id)
+        self.version += 1
+        return self.primitives.pop(id)
+
+    def replace(self, id, primitive):
+        """Swap the primitive at id for another, keeping its place in the z-order"""
+        self.remove(id)
+        self.add(primitive, id)
+
+    def clear(self):
+        """Remove every primitive; returns them by id"""
+        primitives = self.primitives
+        self.primitives = {}
+        self.index = QuadTree((0, 0, self.width, self.height))
+        self.version += 1
+        return primitives
+
+    def query(self, rect):
+        """Ids of the primitives whose bounds overlap rect, bottom first"""
+        return sorted(self.index.query(rect))
+
+    def hit_test(self, pos, tolerance=HIT_TOLERANCE):
+        """Id of the topmost primitive drawn within tolerance of pos, or None"""
+        reach = int(math.ceil(tolerance))
+        area = pygame.Rect(int(pos[0]) - reach, int(pos[1]) - reach, 2 * reach + 2, 2 * reach + 2)
+        for id in reversed(self.query(area)):
+            if self.primitives[id].distance(pos) <= tolerance:
+                return id
+        return None
+
+    def rasterize(self, canvas, rect=None, scale=1):
+        """Redraw rect of a TiledCanvas (all of it by default) from the primitives
+
+        With a scale, canvas is a scaled copy of the drawing and rect is in
+        its coordinates.
+        """
+        rect = canvas.get_rect() if rect is None else pygame.Rect(rect).clip(canvas.get_rect())
+        if not rect:
+            return
+        canvas.clear_rect(rect)
+        source = rect if scale == 1 else points_rect(
+            [(rect.left / scale, rect.top / scale), (rect.right / scale, rect.bottom / scale)], 1)
+        ids = self.query(source)
+        # Whatever lies under the topmost fill covering the whole area is hidden
+        for i in range(len(ids) - 1, -1, -1):
+            if self.primitives[ids[i]].covers(source):
+                ids = ids[i:]
+                break
+        for id in ids:
+            primitive = self.primitives[id]
+            if scale != 1:
+                primitive = primitive.scaled(scale)
+            primitive.draw(canvas, rect)
+
+    def ordered(self):
+        """The primitives, bottom first"""
+        return [self.primitives[id] for id in sorted(self.primitives)]
+
+    def write_svg(self, file):
+        write_svg(file, (self.width, self.height), self.ordered())
+
+    def save_svg(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            self.write_svg(file)
+
+
+class RedrawQueue:
+    """Areas of a canvas waiting to be redrawn from a document, worked off a piece at a time
+
+    add() cuts an area into pieces along a grid of REDRAW_CHUNK squares
+    aligned with the canvas tiles. Areas that reach into the same square
+    are merged into their bounding rect, so where they overlap the pixels
+    are redrawn once. run() redraws pieces until a time budget is spent,
+    which spreads a large redraw over several frames. Redrawing costs
+    about the same per primitive whatever the area, so run() first splits
+    pieces that overlap more than max_primitives into quarters.
+    """
+    def __init__(self, document, canvas, chunk=REDRAW_CHUNK, max_primitives=REDRAW_PRIMITIVES):
+        self.document = document
+        self.canvas = canvas
+        self.chunk = chunk
+        self.max_primitives = max_primitives
+        self.pieces = {}  # (column, row) of the chunk grid, or a split piece's key -> rect to redraw
+        self.splits = 0  # For keys of split pieces
+
+    def __len__(self):
+        return len(self.pieces)
+
+    def add(self, rect):
+        """Queue an area of the canvas for redrawing"""
+        rect = pygame.Rect(rect).clip(self.canvas.get_rect())
+        if not rect:
+            return
+        chunk = self.chunk
+        for row in range(rect.top // chunk, (rect.bottom - 1) // chunk + 1):
+            for column in range(rect.left // chunk, (rect.right - 1) // chunk + 1):
+                part = pygame.Rect(column * chunk, row * chunk, chunk, chunk).clip(rect)
+                queued = self.pieces.get((column, row))
+                self.pieces[(column, row)] = part if queued is None else queued.union(part)
+
+    def run(self, budget):
+        """Redraw queued pieces, at least one, until budget seconds have passed; returns how many are left"""
+        deadline = time.perf_counter() + budget
+        while self.pieces:
+            key = next(iter(self.pieces))
+            piece = self.pieces.pop(key)
+            if (max(piece.size) >= 2 * REDRAW_MIN_SIDE
+                    and len(self.document.query(piece)) > self.max_primitives):
+                # Halve each side that is long enough
+                xs = [piece.left, piece.centerx, piece.right] if piece.width >= 2 * REDRAW_MIN_SIDE else [
+                    piece.left, piece.right]
+                ys = [piece.top, piece.centery, piece.bottom] if piece.height >= 2 * REDRAW_MIN_SIDE else [
+                    piece.top, piece.bottom]
+                for top, bottom in zip(ys, ys[1:]):
+                    for left, right in zip(xs, xs[1:]):
+                        self.splits += 1
+                        self.pieces[('split', self.splits)] = pygame.Rect(left, top, right - left, bottom - top)
+                continue
+            self.document.rasterize(self.canvas, piece)
+            if time.perf_counter() >= deadline:
+                break
+        return len(self.pieces)
+
+    def finish(self, rect=None):
+        """Redraw the queued pieces that overlap rect, or everything still queued"""
+        if rect is None:
+            self.run(math.inf)
+            return
+        for key in [key for key, piece in self.pieces.items() if piece.colliderect(rect)]:
+            self.document.rasterize(self.canvas, self.pieces.pop(key))
+
+
+if __name__ == "__main__":
+    # Check that redrawing a region from the document matches the live drawing
+    import os
+    import random
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from paint_canvas import TiledCanvas
+    from paint_fill import fill_runs
+
+    rng = random.Random(1)
+    live = TiledCanvas(800, 600)
+    document = Document(800, 600)
+    for _ in range(200):
+        kind = rng.choice(list(KIND_NAMES))
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        width = rng.choice([3, 5, 8])
+        x, y = rng.uniform(0, 800), rng.uniform(0, 600)
+        if kind == FILL:
+            points = fill_runs(live, (x, y), live.get_rect())
+        elif kind == PEN:
+            points = [(x + rng.uniform(-60, 60), y + rng.uniform(-60, 60)) for _ in range(rng.randint(1, 8))]
+        elif kind == SQUARE:
+            size = rng.randrange(5, 80)
+            points = [(int(x), int(y)), (int(x) + size, int(y) + size)]
+        else:
+            points = [(x + rng.uniform(-50, 50), y + rng.uniform(-50, 50)) for _ in range(3 if kind < RHOMBUS else 4)]
+        primitive = Primitive(kind, color, width, points)
+        primitive.draw(live)
+        document.add(primitive)
+
+    redrawn = TiledCanvas(800, 600)
+    document.rasterize(redrawn)
+    region = pygame.Rect(150, 100, 300, 250)
+    document.rasterize(live, region)
+    diff = [np.abs(pygame.surfarray.array3d(live.tile(key)).astype(int)
+                   - pygame.surfarray.array3d(redrawn.tile(key))).max()
+            for key in live.tile_keys(live.get_rect())]
+    print("max channel difference after region redraw:", max(diff))
+    probes = [(p.points[0][1], p.points[0][0]) if p.kind == FILL else p.points[0]
+              for p in document.primitives.values()]
+    hits = sum(document.hit_test(probe, 0) is not None for probe in probes)
+    print("primitives hit at their first point:", hits, "of", len(document))
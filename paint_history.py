@@ -0,0 +1,123 @@
+"""Tile-based undo/redo history for paint2.
+
+History works on the tiles of a paint_canvas.TiledCanvas. Before an
+operation draws, the app calls touch() with the area it is about to change.
+The first touch of each tile in an operation stores a zlib-compressed copy
+of the tile, or None while the tile is still blank. When the operation
+ends, the after-image of every touched tile that actually changed is stored
+too, so it can be redone. Changes that are not pixels, such as edits to
+the vector document, are added to the operation with record().
+
+Undo and redo only decompress and blit the tiles of one operation, so
+their cost does not depend on how deep the history is. Old operations are
+dropped oldest-first once the compressed tiles exceed the memory budget.
+"""
+import zlib
+from collections import deque
+
+import pygame
+
+HISTORY_BUDGET = 32 * 1024 * 1024  # Bytes of compressed tile images kept
+COMPRESS_LEVEL = 1
+
+
+class UndoHistory:
+    """Undo/redo stacks of per-tile before/after images for one TiledCanvas"""
+    def __init__(self, canvas, budget=HISTORY_BUDGET):
+        self.canvas = canvas
+        self.budget = budget
+        self.undo_stack = deque()  # Operations, oldest first: ([(tile rect, before, after), ...], actions)
+        self.redo_stack = []
+        self.size = 0  # Compressed bytes held by both stacks
+        self.pending = None  # Tile key -> before image for the operation in progress
+        self.actions = []  # (undo, redo) callables recorded in the operation in progress
+
+    def tile_bytes(self, rect):
+        data = self.canvas.read_tile(rect)
+        return None if data is None else zlib.compress(data, COMPRESS_LEVEL)
+
+    def restore(self, rect, data):
+        self.canvas.write_tile(rect, None if data is None else zlib.decompress(data))
+
+    def begin(self):
+        """Start an operation (ending any that is still open)"""
+        self.end()
+        self.pending = {}
+        self.actions = []
+
+    def touch(self, rect):
+        """Save the before-image of the tiles in rect that this operation has not touched yet"""
+        if self.pending is None:
+            self.begin()
+        for key in self.canvas.tile_keys(rect):
+            if key not in self.pending:
+                self.pending[key] = self.tile_bytes(self.canvas.tile_rect(key))
+
+    def record(self, undo, redo):
+        """Add a non-pixel change to this operation: undo() reverts it, redo() applies it again"""
+        if self.pending is None:
+            self.begin()
+        self.actions.append((undo, redo))
+
+    def end(self):
+        """Finish the open operation and push it on the undo stack"""
+        pending, self.pending = self.pending, None
+        actions, self.actions = self.actions, []
+        if not (pending or actions):
+            return
+        tiles = []
+        for key, before in (pending or {}).items():
+            rect = self.canvas.tile_rect(key)
+            after = self.tile_bytes(rect)
+            if after != before:
+                tiles.append((rect, before, after))
+        if not (tiles or actions):
+            return
+        operation = (tiles, actions)
+        self.size += operation_size(operation)
+        self.undo_stack.append(operation)
+        for dropped in self.redo_stack:
+            self.size -= operation_size(dropped)
+        self.redo_stack.clear()
+        # Drop the oldest operations over budget, but always keep the newest one
+        while self.size > self.budget and len(self.undo_stack) > 1:
+            self.size -= operation_size(self.undo_stack.popleft())
+
+    def undo(self):
+        """Undo the last operation; returns the area changed, or None"""
+        self.end()
+        if not self.undo_stack:
+            return None
+        operation = self.undo_stack.pop()
+        tiles, actions = operation
+        for rect, before, _ in tiles:
+            self.restore(rect, before)
+        for undo, _ in reversed(actions):
+            undo()
+        self.redo_stack.append(operation)
+        return operation_bounds(operation)
+
+    def redo(self):
+        """Redo the last undone operation; returns the area changed, or None"""
+        self.end()
+        if not self.redo_stack:
+            return None
+        operation = self.redo_stack.pop()
+        tiles, actions = operation
+        for _, redo in actions:
+            redo()
+        for rect, _, after in tiles:
+            self.restore(rect, after)
+        self.undo_stack.append(operation)
+        return operation_bounds(operation)
+
+
+def operation_size(operation):
+    return sum(len(before or b'') + len(after or b'') for _, before, after in operation[0])
+
+
+def operation_bounds(operation):
+    tiles = operation[0]
+    if not tiles:
+        return pygame.Rect(0, 0, 0, 0)
+    return tiles[0][0].unionall([rect for rect, _, _ in tiles])
@@ -0,0 +1,354 @@
+"""Input recording and headless replay benchmark for paint2.
+
+A recording is the stream of input events PaintApp.handle_events() saw,
+grouped by frame, plus a hash of the final canvas for regression checks.
+Replaying feeds every frame's events back through PaintApp.update() and
+draw() on the SDL dummy video driver, as fast as possible. Frames without
+events are skipped. It reports events per second and per-event latency
+percentiles. An event's latency is the time to process and draw the frame
+it arrived in.
+
+Recordings start from a blank canvas. Autosave is off during replay,
+because its timing depends on the wall clock.
+
+File layout (little-endian):
+    header   magic, version, canvas width and height, frames, events,
+             starting mouse position, SHA-256 of the final canvas
+    events   zlib of one fixed-size record per event: frames since the
+             previous event, type code and up to six fields
+
+Usage:
+    python paint_replay.py record out.prpl [WIDTHxHEIGHT]
+    python paint_replay.py play out.prpl
+    python paint_replay.py generate out.prpl [--seed N]
+"""
+import hashlib
+import math
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+import pygame
+from pygame.locals import *
+
+import paint2
+
+MAGIC = b'PRPL'
+VERSION = 1
+HEADER = struct.Struct('<4sBIIIIhh32s')
+EVENT = struct.Struct('<HBhhhhHI')  # Frame delta, type code, a, b, c, d, f, e
+EVENT_TYPES = [MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEMOTION, MOUSEWHEEL, KEYDOWN, KEYUP]
+NO_HASH = bytes(32)
+PERCENTILES = [50, 90, 99]
+
+# Synthetic sessions
+MOUSE_HZ = 1000  # Pointer events per second while dragging
+FPS = 60
+SESSION_ACTIONS = 300
+
+
+class ReplayError(Exception):
+    """Raised for malformed recordings or a canvas that no longer matches"""
+
+
+def encode_event(event):
+    """(a, b, c, d, f, e) fields of a recordable event"""
+    if event.type in (MOUSEBUTTONDOWN, MOUSEBUTTONUP):
+        return (*event.pos, event.button, 0, 0, 0)
+    if event.type == MOUSEMOTION:
+        buttons = sum(bool(pressed) << i for i, pressed in enumerate(event.buttons))
+        return (*event.pos, *event.rel, buttons, 0)
+    if event.type == MOUSEWHEEL:
+        return (event.x, event.y, 0, 0, 0, 0)
+    return (0, 0, 0, 0, event.mod, event.key)
+
+
+def decode_event(kind, a, b, c, d, f, e):
+    if kind in (MOUSEBUTTONDOWN, MOUSEBUTTONUP):
+        return pygame.event.Event(kind, pos=(a, b), button=c)
+    if kind == MOUSEMOTION:
+        return pygame.event.Event(kind, pos=(a, b), rel=(c, d), buttons=tuple(bool(f >> i & 1) for i in range(3)))
+    if kind == MOUSEWHEEL:
+        return pygame.event.Event(kind, x=a, y=b, flipped=False)
+    return pygame.event.Event(kind, key=e, mod=f, unicode='', scancode=0)
+
+
+def canvas_hash(canvas):
+    """SHA-256 of every allocated tile's key and pixels"""
+    digest = hashlib.sha256()
+    for key in sorted(canvas.surfaces):
+        digest.update(struct.pack('<ii', *key))
+        digest.update(canvas.read_tile(canvas.tile_rect(key)) or b'')
+    return digest.digest()
+
+
+def headless_display():
+    """Switch to the SDL dummy video driver, so replays need no window"""
+    if os.environ.get("SDL_VIDEODRIVER") != "dummy":
+        pygame.display.quit()
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        pygame.display.init()
+
+
+class Recording:
+    """A recorded session: canvas size, events by frame and the final canvas hash"""
+    def __init__(self, size, frames, events, mouse_pos=(0, 0), final_hash=NO_HASH):
+        self.size = size
+        self.frames = frames
+        self.events = events  # [(frame, event), ...] in the order they were handled
+        self.mouse_pos = mouse_pos
+        self.final_hash = final_hash
+
+    def save(self, path):
+        records = bytearray()
+        previous = 0
+        for frame, event in self.events:
+            # Only whether the frame changed matters to replay, so long gaps are clamped
+            records += EVENT.pack(min(frame - previous, 0xFFFF), EVENT_TYPES.index(event.type),
+                                  *encode_event(event))
+            previous = frame
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, *self.size, self.frames, len(self.events),
+                                *self.mouse_pos, self.final_hash))
+            f.write(zlib.compress(bytes(records), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ReplayError("Recording is truncated")
+        magic, version, width, height, frames, count, mouse_x, mouse_y, final_hash = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError("Not a paint recording (or unsupported version)")
+        try:
+            records = zlib.decompress(data[HEADER.size:])
+        except zlib.error as error:
+            raise ReplayError(f"Recording is corrupt: {error}")
+        if len(records) != count * EVENT.size:
+            raise ReplayError("Recording is truncated")
+        events = []
+        frame = 0
+        for delta, code, *fields in EVENT.iter_unpack(records):
+            frame += delta
+            events.append((frame, decode_event(EVENT_TYPES[code], *fields)))
+        return cls((width, height), frames, events, (mouse_x, mouse_y), final_hash)
+
+    def frame_events(self):
+        """Lists of events handled together, one per frame that had any"""
+        frames = []
+        last = None
+        for frame, event in self.events:
+            if frame != last:
+                frames.append([])
+                last = frame
+            frames[-1].append(event)
+        return frames
+
+
+class Recorder:
+    """Records the events a PaintApp handles
+
+    attach() registers the recorder as an observer of the app's
+    handle_events(), which calls it once per frame.
+    """
+    def __init__(self):
+        self.app = None
+        self.frame = 0
+        self.events = []
+        self.mouse_pos = (0, 0)
+
+    def attach(self, app):
+        self.app = app
+        self.mouse_pos = app.mouse_pos
+        app.observers.append(self)
+
+    def __call__(self, events):
+        self.frame += 1
+        self.events.extend((self.frame, event) for event in events if event.type in EVENT_TYPES)
+
+    def recording(self):
+        """The session so far, with the hash of the canvas as it is now"""
+        self.app.redraw.finish()
+        return Recording(self.app.canvas.get_size(), self.frame, list(self.events), self.mouse_pos,
+                         canvas_hash(self.app.canvas))
+
+
+class Player:
+    """Replays a Recording through a fresh PaintApp as fast as possible"""
+    def __init__(self, recording):
+        headless_display()
+        self.recording = recording
+        self.app = paint2.PaintApp(recording.size)
+        self.app.mouse_pos = recording.mouse_pos
+        self.app.next_autosave = math.inf
+
+    def play(self):
+        """Replay every frame; returns (seconds, per-event latencies in seconds)"""
+        app = self.app
+        latencies = []
+        total = 0.0
+        for events in self.recording.frame_events():
+            start = time.perf_counter()
+            app.update(events)
+            app.draw()
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            latencies.extend([elapsed] * len(events))
+        # Moves left for later frames still count towards the total
+        start = time.perf_counter()
+        app.redraw.finish()
+        total += time.perf_counter() - start
+        app.saver.close()
+        return total, latencies
+
+    def verify(self):
+        """Play, then check the final canvas against the recorded hash"""
+        total, latencies = self.play()
+        final_hash = canvas_hash(self.app.canvas)
+        if self.recording.final_hash != NO_HASH and final_hash != self.recording.final_hash:
+            raise ReplayError(f"Replay diverged: canvas hash {final_hash.hex()}, "
+                              f"expected {self.recording.final_hash.hex()}")
+        return total, latencies, final_hash
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def report(recording, total, latencies, final_hash):
+    rate = len(latencies) / total if total else 0.0
+    spread = "  ".join(f"p{p} {percentile(latencies, p) * 1000:.2f} ms" for p in PERCENTILES)
+    return (f"{len(latencies)} events in {len(recording.frame_events())} frames, {total:.2f} s: "
+            f"{rate:,.0f} events/s\n"
+            f"latency {spread}  max {max(latencies) * 1000:.2f} ms\n"
+            f"canvas {final_hash.hex()}")
+
+
+def synthetic_session(seed=0, actions=SESSION_ACTIONS, size=(paint2.WINDOW_WIDTH, paint2.WINDOW_HEIGHT)):
+    """A seeded drawing session: pen strokes, shapes, fills, moves, tool clicks, undo and zoom"""
+    rng = random.Random(seed)
+    app = paint2.PaintApp(size)  # Only for the toolbar layout
+    app.saver.close()
+    colors = [(pos[0] + 15, pos[1] + 15) for _, pos in app.colors]
+    tools = {mode: (pos[0] + 25, pos[1] + 15) for _, pos, mode in app.tools}
+    sizes = [(pos[0] + 25, pos[1] + 15) for _, pos, _ in app.sizes]
+    per_frame = MOUSE_HZ // FPS
+    frames = []
+
+    def click(pos, button=1):
+        frames.append([pygame.event.Event(MOUSEBUTTONDOWN, pos=pos, button=button)])
+        frames.append([pygame.event.Event(MOUSEBUTTONUP, pos=pos, button=button)])
+
+    def drag(points, button=1):
+        pressed = (button == 1, button == 2, button == 3)
+        frames.append([pygame.event.Event(MOUSEBUTTONDOWN, pos=points[0], button=button)])
+        for i in range(1, len(points), per_frame):
+            frames.append([pygame.event.Event(MOUSEMOTION, pos=point, buttons=pressed,
+                                              rel=(point[0] - previous[0], point[1] - previous[1]))
+                           for previous, point in zip(points[i - 1:], points[i:i + per_frame])])
+        frames.append([pygame.event.Event(MOUSEBUTTONUP, pos=points[-1], button=button)])
+
+    def key(code, mod=KMOD_CTRL):
+        frames.append([pygame.event.Event(KEYDOWN, key=code, mod=mod, unicode='', scancode=0)])
+
+    def canvas_point():
+        return rng.randrange(20, size[0] - 20), rng.randrange(90, size[1] - 20)
+
+    def curve(start, samples):
+        """A wandering pointer path sampled at MOUSE_HZ"""
+        x, y = start
+        heading = rng.uniform(0, 2 * math.pi)
+        points = []
+        for _ in range(samples):
+            heading += rng.uniform(-0.15, 0.15)
+            x = min(size[0] - 5, max(5, x + 3 * math.cos(heading)))
+            y = min(size[1] - 5, max(85, y + 3 * math.sin(heading)))
+            points.append((round(x), round(y)))
+        return points
+
+    for _ in range(actions):
+        roll = rng.random()
+        if roll < 0.08:
+            click(rng.choice(colors))
+        elif roll < 0.12:
+            click(rng.choice(sizes))
+        elif roll < 0.15:
+            key(K_z)
+        elif roll < 0.16:
+            key(K_y)
+        elif roll < 0.18:
+            frames.append([pygame.event.Event(MOUSEMOTION, pos=canvas_point(), rel=(0, 0), buttons=(0, 0, 0))])
+            frames.append([pygame.event.Event(MOUSEWHEEL, x=0, y=rng.choice([-1, 1]), flipped=False)])
+        elif roll < 0.19:
+            key(K_HOME, 0)
+        elif roll < 0.55:
+            click(tools[paint2.PEN])
+            drag(curve(canvas_point(), rng.randrange(100, 600)))
+        elif roll < 0.85:
+            click(tools[rng.choice([paint2.SQUARE, paint2.RIGHT_TRIANGLE, paint2.EQUILATERAL_TRIANGLE,
+                                    paint2.RHOMBUS])])
+            start = canvas_point()
+            drag(curve(start, rng.randrange(60, 300)))
+        elif roll < 0.92:
+            click(tools[paint2.FILL])
+            click(canvas_point())
+        else:
+            click(tools[paint2.MOVE])
+            drag(curve(canvas_point(), rng.randrange(30, 200)))
+
+    events = [(frame, event) for frame, batch in enumerate(frames, 1) for event in batch]
+    return Recording(size, len(frames), events, (0, 0))
+
+
+def record(path, size):
+    """Run paint2 with a recorder attached; save the session on quit"""
+    app = paint2.PaintApp(size)
+    recorder = Recorder()
+    recorder.attach(app)
+    while True:
+        events = pygame.event.get()
+        quitting = any(event.type == QUIT for event in events)
+        app.update([event for event in events if event.type != QUIT])
+        app.draw()
+        pygame.display.flip()
+        app.clock.tick(FPS)
+        if quitting:
+            break
+    app.saver.close()
+    recording = recorder.recording()
+    recording.save(path)
+    print(f"Saved {len(recording.events)} events over {recording.frames} frames to {path}")
+    pygame.quit()
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == 'record':
+        size = tuple(int(n) for n in argv[2].split('x')) if len(argv) >= 3 else (
+            paint2.WINDOW_WIDTH, paint2.WINDOW_HEIGHT)
+        record(argv[1], size)
+    elif len(argv) == 2 and argv[0] == 'play':
+        recording = Recording.load(argv[1])
+        print(report(recording, *Player(recording).verify()))
+    elif len(argv) >= 2 and argv[0] == 'generate':
+        seed = int(argv[3]) if len(argv) >= 4 and argv[2] == '--seed' else 0
+        headless_display()
+        recording = synthetic_session(seed)
+        player = Player(recording)
+        player.play()
+        recording.final_hash = canvas_hash(player.app.canvas)
+        recording.save(argv[1])
+        print(f"Saved {len(recording.events)} events over {recording.frames} frames to {argv[1]}")
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,233 @@
+"""Background saving, autosave and loading for paint2.
+
+A drawing is saved as a directory (a tile store):
+
+    canvas.json      canvas size and tile size, written last
+    document.jsonl   one vector primitive per line
+    tiles/X_Y.png    one PNG per tile that is not blank
+
+TiledCanvas bumps a tile's version whenever it is drawn on, so a TileStore
+only has to compare versions with the ones it last wrote to find the dirty
+tiles. Saving happens in two halves:
+
+- snapshot() runs on the UI thread between frames. It copies the raw bytes
+  of the dirty tiles (and the primitive list if the document changed), so
+  the save is consistent even if drawing continues.
+- write() runs on the BackgroundSaver worker thread. It does the PNG
+  encoding and all file I/O. Files are written under temporary names and
+  renamed into place.
+
+The PNGs are encoded here with zlib rather than pygame.image.save(),
+because zlib releases the GIL while it compresses and keeps the UI thread
+responsive.
+
+SVG export goes through the same worker: SvgExport takes a copy of the
+primitive list as its snapshot.
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import numpy as np
+import pygame
+
+from paint_document import Primitive, write_svg
+
+SAVE_PATH = "drawing.paint"
+AUTOSAVE_SUFFIX = ".autosave"
+AUTOSAVE_SECONDS = 30
+PNG_LEVEL = 6
+
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(data, size):
+    """PNG file bytes of packed 24-bit RGB pixels"""
+    width, height = size
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # Filter byte 0 (none) per row
+    rows[:, 1:] = np.frombuffer(data, dtype=np.uint8).reshape(height, width * 3)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", header)
+            + png_chunk(b"IDAT", zlib.compress(rows.tobytes(), PNG_LEVEL)) + png_chunk(b"IEND", b""))
+
+
+def write_file(path, data, mode="wb"):
+    """Write a file under a temporary name, then rename it over path"""
+    temporary = path + ".tmp"
+    with open(temporary, mode) as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def tile_name(key):
+    return f"{key[0]}_{key[1]}.png"
+
+
+def read_manifest(path):
+    """canvas.json of a saved drawing, or None if there is none"""
+    try:
+        with open(os.path.join(path, "canvas.json"), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+class TileStore:
+    """A saved drawing on disk, with the versions of what was last written to it"""
+    def __init__(self, path):
+        self.path = path
+        self.saved = {}  # Tile key -> canvas version last snapshotted
+        self.document_version = None
+
+    def dirty(self, canvas, document):
+        """Whether anything changed since the last snapshot"""
+        return (document.version != self.document_version
+                or any(self.saved.get(key) != version for key, version in canvas.versions.items()))
+
+    def snapshot(self, canvas, document):
+        """Copy what changed since the last snapshot; returns a job for write(), or None"""
+        # The first snapshot after a load or forget() replaces whatever is on disk
+        full = not self.saved and self.document_version is None
+        tiles = []
+        for key, version in canvas.versions.items():
+            if self.saved.get(key) != version:
+                rect = canvas.tile_rect(key)
+                tiles.append((key, rect.size, canvas.read_tile(rect)))
+                self.saved[key] = version
+        primitives = None
+        if document.version != self.document_version:
+            primitives = document.ordered()
+            self.document_version = document.version
+        if not tiles and primitives is None:
+            return None
+        manifest = {"width": canvas.width, "height": canvas.height, "tile_size": canvas.tile_size}
+        return self, manifest, tiles, primitives, full
+
+    def forget(self):
+        """Forget what was written, so the next snapshot takes everything"""
+        self.saved = {}
+        self.document_version = None
+
+    def write(self, manifest, tiles, primitives, full):
+        """Write a snapshot to disk (worker thread)"""
+        directory = os.path.join(self.path, "tiles")
+        os.makedirs(directory, exist_ok=True)
+        if full:
+            keep = {tile_name(key) for key, _, data in tiles if data is not None}
+            for name in os.listdir(directory):
+                if name not in keep:
+                    os.remove(os.path.join(directory, name))
+        for key, size, data in tiles:
+            path = os.path.join(directory, tile_name(key))
+            if data is None:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                write_file(path, encode_png(data, size))
+        if primitives is not None:
+            lines = "".join(json.dumps(p.record(), separators=(",", ":")) + "\n" for p in primitives)
+            write_file(os.path.join(self.path, "document.jsonl"), lines, "w")
+        write_file(os.path.join(self.path, "canvas.json"), json.dumps(manifest), "w")
+
+    def load(self, canvas, document):
+        """Read the saved drawing into a blank canvas and an empty document"""
+        directory = os.path.join(self.path, "tiles")
+        names = os.listdir(directory) if os.path.isdir(directory) else []
+        for name in names:
+            if not name.endswith(".png"):
+                continue
+            key = tuple(int(n) for n in name[:-4].split("_"))
+            canvas.tile(key).blit(pygame.image.load(os.path.join(directory, name)), (0, 0))
+            canvas.changed(key)
+        path = os.path.join(self.path, "document.jsonl")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    document.add(Primitive(*json.loads(line)))
+        # What was just loaded is already on disk
+        self.saved = dict(canvas.versions)
+        self.document_version = document.version
+
+
+class SvgExport:
+    """An SVG file exported through the BackgroundSaver like a TileStore
+
+    snapshot() copies the primitive list on the UI thread (primitives are
+    replaced, not changed, when edited); write() formats and writes the
+    file on the worker thread.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def snapshot(self, canvas, document):
+        return self, (document.width, document.height), document.ordered()
+
+    def forget(self):
+        pass
+
+    def write(self, size, primitives):
+        temporary = self.path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            write_svg(file, size, primitives)
+        os.replace(temporary, self.path)
+
+
+class BackgroundSaver:
+    """Worker thread that writes TileStore snapshots in the order they are queued"""
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0  # Jobs queued or being written; only touched on the UI thread
+        self.thread = threading.Thread(target=self.work, name="paint-saver", daemon=True)
+        self.thread.start()
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            store = job[0]
+            error = None
+            try:
+                store.write(*job[1:])
+            except Exception as caught:  # Reported to the UI thread, which keeps running
+                error = caught
+            finally:
+                # One result per job, so pending always goes back down
+                self.results.put((store, error))
+
+    def save(self, store, canvas, document):
+        """Queue a save of what changed; returns False if there was nothing to save"""
+        job = store.snapshot(canvas, document)
+        if job is None:
+            return False
+        self.pending += 1
+        self.jobs.put(job)
+        return True
+
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def poll(self):
+        """Finished saves since the last poll, as (store, error or None)"""
+        finished = []
+        while True:
+            try:
+                store, error = self.results.get_nowait()
+            except queue.Empty:
+                return finished
+            self.pending -= 1
+            if error is not None:
+                store.forget()
+            finished.append((store, error))
+
+    def close(self):
+        """Finish the queued saves and stop the worker"""
+        self.jobs.put(None)
+        self.thread.join()
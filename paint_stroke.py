@@ -0,0 +1,190 @@
+"""Batched, smoothed pen strokes for paint2.
+
+The app feeds a Stroke every pointer position it sees and calls flush()
+once per frame. flush() renders all the spline segments that the points so
+far fully determine, in one pass:
+
+- The curve is a Catmull-Rom spline through the input points, sampled every
+  SAMPLE_SPACING pixels.
+- The resulting polyline is stamped as antialiased capsules. Each run of up
+  to RUN_LENGTH segments is evaluated on its bounding box with NumPy, then
+  blended straight into the pixels of the TiledCanvas tiles it covers
+  through pygame.surfarray.
+
+Per-tile coverage buffers keep the maximum coverage seen for each pixel.
+Overlapping segments therefore blend once, not once per stamp, so joins
+don't get darker. Only tiles the stroke touches get a buffer.
+"""
+import math
+
+import numpy as np
+import pygame
+
+SAMPLE_SPACING = 2.0  # Pixels between spline samples
+RUN_LENGTH = 16  # Polyline segments evaluated together
+
+
+def spline_samples(points, start=0, stop=None, spacing=SAMPLE_SPACING):
+    """Polyline of the spline through points from point start to point stop (default: the last)
+
+    Each segment of the uniform Catmull-Rom spline is sampled every
+    spacing pixels, from its start point up to but not including its end;
+    the final end point closes the polyline. All segments are evaluated at
+    once.
+    """
+    p = np.asarray(points, dtype=np.float64)
+    if stop is None:
+        stop = len(p) - 1
+    padded = np.concatenate([p[:1], p, p[-1:]])  # End segments repeat their end point
+    i = np.arange(start, stop)
+    p0, p1, p2, p3 = padded[i], padded[i + 1], padded[i + 2], padded[i + 3]
+    steps = np.maximum(1, np.ceil(np.hypot(*(p2 - p1).T) / spacing).astype(np.int64))
+    segment = np.repeat(np.arange(len(i)), steps)
+    t = ((np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / steps[segment])[:, None]
+    p0, p1, p2, p3 = p0[segment], p1[segment], p2[segment], p3[segment]
+    samples = 0.5 * (2 * p1 + (p2 - p0) * t + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t ** 2
+                     + (3 * p1 - p0 - 3 * p2 + p3) * t ** 3)
+    return np.concatenate([samples, p[stop:stop + 1]])
+
+
+def run_boxes(samples, width):
+    """Box (x0, y0, x1, y1) each run of a polyline can touch when stamped at a brush width
+
+    One row per run of RUN_LENGTH segments, in the order Stroke.draw_samples() stamps them.
+    """
+    r = width / 2.0
+    starts = np.arange(0, len(samples) - 1, RUN_LENGTH)
+    ends = np.minimum(starts + RUN_LENGTH, len(samples) - 1)
+    low = np.minimum(np.minimum.reduceat(samples, starts), samples[ends])
+    high = np.maximum(np.maximum.reduceat(samples, starts), samples[ends])
+    return np.concatenate([np.floor(low - r - 1), np.ceil(high + r + 2)], axis=1).astype(np.int64)
+
+
+class Stroke:
+    """One pen stroke on a TiledCanvas, rendered incrementally
+
+    before_draw, if given, is called with each rect just before it is
+    drawn (paint2 passes UndoHistory.touch). clip limits drawing to part of
+    the canvas, for redrawing a region of a document.
+    """
+    def __init__(self, canvas, color, width, before_draw=None, clip=None):
+        self.canvas = canvas
+        self.color = np.array(color[:3], dtype=np.float32)
+        self.radius = width / 2.0
+        self.before_draw = before_draw
+        self.clip = canvas.get_rect() if clip is None else pygame.Rect(clip).clip(canvas.get_rect())
+        self.points = []
+        self.rendered = 0  # Segments (point i to i + 1) already drawn
+        self.coverage = {}  # Tile key -> float32 coverage of the tile's pixels
+
+    def add(self, pos):
+        """Append an input point (repeats are ignored)"""
+        if not self.points or pos != self.points[-1]:
+            self.points.append(pos)
+
+    def flush(self, final=False):
+        """Draw every segment whose shape is known; returns the rect drawn or None
+
+        A segment needs the point after its end, so the last one waits for
+        the next point, or for final=True at the end of the stroke.
+        """
+        points = self.points
+        last = len(points) - 1 if final else len(points) - 2
+        if not points or (self.rendered >= last and not (final and len(points) == 1)):
+            return None
+        if len(points) == 1:
+            samples = np.array([points[0], points[0]], dtype=np.float64)
+        else:
+            samples = spline_samples(points, self.rendered, last)
+            self.rendered = last
+        return self.draw_samples(samples)
+
+    def draw_samples(self, samples, boxes=None):
+        """Stamp a polyline in runs of RUN_LENGTH segments; returns the rect drawn or None
+
+        boxes, from run_boxes(), lets runs that miss the clip rect be skipped
+        without looking at their samples.
+        """
+        starts = range(0, len(samples) - 1, RUN_LENGTH)
+        if boxes is not None:
+            clip = self.clip
+            hit = ((boxes[:, 0] < clip.right) & (boxes[:, 2] > clip.left)
+                   & (boxes[:, 1] < clip.bottom) & (boxes[:, 3] > clip.top))
+            starts = [starts[i] for i in np.flatnonzero(hit)]
+        dirty = None
+        for start in starts:
+            rect = self.stamp(samples[start:start + RUN_LENGTH + 1])
+            if rect:
+                dirty = rect if dirty is None else dirty.union(rect)
+        return dirty
+
+    def end(self):
+        """Draw the rest of the stroke"""
+        return self.flush(final=True)
+
+    def stamp(self, samples):
+        """Blend antialiased capsules along a short polyline into the canvas"""
+        r = self.radius
+        clip = self.clip
+        x0 = max(clip.left, int(math.floor(samples[:, 0].min() - r - 1)))
+        y0 = max(clip.top, int(math.floor(samples[:, 1].min() - r - 1)))
+        x1 = min(clip.right, int(math.ceil(samples[:, 0].max() + r + 2)))
+        y1 = min(clip.bottom, int(math.ceil(samples[:, 1].max() + r + 2)))
+        if x0 >= x1 or y0 >= y1:
+            return None
+        rect = pygame.Rect(x0, y0, x1 - x0, y1 - y0)
+
+        # Coverage of each segment over a small box around it; a pixel's
+        # coverage is the largest any segment gives it
+        a = samples[:-1]
+        ab = samples[1:] - a
+        corner = np.floor(np.minimum(a, samples[1:]) - r - 1).astype(np.int64)
+        side = int(np.ceil(np.abs(ab).max() + 2 * r + 3))
+        # Segments entirely outside the clip rect add nothing
+        keep = ((corner[:, 0] < x1) & (corner[:, 0] + side > x0)
+                & (corner[:, 1] < y1) & (corner[:, 1] + side > y0))
+        if not keep.all():
+            a, ab, corner = a[keep], ab[keep], corner[keep]
+        length2 = (ab ** 2).sum(axis=1)
+        length2[length2 == 0] = 1.0
+        steps = np.arange(side)
+        px = corner[:, 0, None] + steps  # (segment, column) pixel x
+        py = corner[:, 1, None] + steps
+        xs = (px - a[:, 0, None])[:, :, None]
+        ys = (py - a[:, 1, None])[:, None, :]
+        t = np.clip((xs * ab[:, 0, None, None] + ys * ab[:, 1, None, None]) / length2[:, None, None], 0.0, 1.0)
+        distance = np.sqrt((xs - t * ab[:, 0, None, None]) ** 2 + (ys - t * ab[:, 1, None, None]) ** 2)
+        segment_cover = np.clip(r + 0.5 - distance, 0.0, 1.0).astype(np.float32)
+        cover = np.zeros((x1 - x0, y1 - y0), dtype=np.float32)
+        for (cx, cy), box in zip(corner.tolist(), segment_cover):
+            left, top = max(x0, cx), max(y0, cy)
+            right, bottom = min(x1, cx + side), min(y1, cy + side)
+            if left < right and top < bottom:
+                part = cover[left - x0:right - x0, top - y0:bottom - y0]
+                np.maximum(part, box[left - cx:right - cx, top - cy:bottom - cy], out=part)
+
+        if not cover.any():
+            return None
+        if self.before_draw:
+            self.before_draw(rect)
+        size = self.canvas.tile_size
+        for key in self.canvas.tile_keys(rect):
+            part = self.canvas.tile_rect(key).clip(rect)
+            coverage = self.coverage.get(key)
+            if coverage is None:
+                coverage = self.coverage[key] = np.zeros((size, size), dtype=np.float32)
+            local = part.move(-key[0] * size, -key[1] * size)
+            old = coverage[local.left:local.right, local.top:local.bottom]
+            new = np.maximum(old, cover[part.left - x0:part.right - x0, part.top - y0:part.bottom - y0])
+            if not (new > old).any():
+                continue
+            # Blend in only the extra coverage: with base the pixel before the
+            # stroke, base + (color - base) * new == current + (color - current) * k
+            k = np.where(old < 1.0, (new - old) / np.maximum(1.0 - old, 1e-6), 0.0)[..., None]
+            pixels = pygame.surfarray.pixels3d(self.canvas.tile(key))
+            region = pixels[local.left:local.right, local.top:local.bottom]
+            region[...] = (region + (self.color - region) * k + 0.5).astype(np.uint8)
+            del pixels, region  # Unlock the surface
+            old[...] = new
+            self.canvas.changed(key)
+        return rect
@@ -1,8 +1,12 @@
 import pygame
 import random
 import sys
+from dataclasses import dataclass
 from pygame.locals import *
 
+from frameprof import FrameProfiler
+from textcache import get_font, render_text
+
 # Initialize pygame
 pygame.init()
 
@@ -16,6 +20,11 @@ COIN_SIZE = 30
 FPS = 60
 COINS_FOR_SPEED_INCREASE = 5  # Number of coins needed to increase enemy speed
 SPEED_INCREMENT = 0.5  # How much enemy speed increases
+INITIAL_ENEMY_SPEED = 3  # Base speed for enemies at the start of a run
+OBSTACLE_INTERVAL = (60, 120)  # Range of frames between obstacle spawns
+COIN_INTERVAL = (90, 180)  # Range of frames between coin spawns
+COIN_WEIGHTS = (70, 25, 5)  # Bronze / silver / gold spawn weights
+LANE_CELL_WIDTH = 25  # Width of the SpatialGroup columns
 
 # Colors
 BLACK = (0, 0, 0)
@@ -28,42 +37,239 @@ BLUE = (0, 0, 255)
 SILVER = (192, 192, 192)
 GOLD = (255, 215, 0)
 
-class Car(pygame.sprite.Sprite):
+@dataclass(frozen=True)
+class RacerConfig:
+    """Difficulty parameters for a Game; defaults are the module constants
+
+    Raises ValueError for values a game cannot run with, so a bad config
+    fails where it is made rather than partway through a run.
+    """
+    coins_for_speed_increase: int = COINS_FOR_SPEED_INCREASE
+    speed_increment: float = SPEED_INCREMENT
+    initial_enemy_speed: float = INITIAL_ENEMY_SPEED
+    obstacle_interval: tuple = OBSTACLE_INTERVAL
+    coin_interval: tuple = COIN_INTERVAL
+    coin_weights: tuple = COIN_WEIGHTS
+
+    def __post_init__(self):
+        if self.coins_for_speed_increase < 1:
+            raise ValueError(f"coins_for_speed_increase must be at least 1, not {self.coins_for_speed_increase}")
+        if not self.speed_increment > 0:
+            raise ValueError(f"speed_increment must be positive, not {self.speed_increment}")
+        for name in ('obstacle_interval', 'coin_interval'):
+            interval = getattr(self, name)
+            if len(interval) != 2 or not 0 < interval[0] <= interval[1]:
+                raise ValueError(f"{name} must be (low, high) frames with 0 < low <= high, not {interval}")
+        weights = self.coin_weights
+        if len(weights) != len(COIN_TYPES) or min(weights) < 0 or not any(weights):
+            raise ValueError(f"coin_weights must be {len(COIN_TYPES)} non-negative weights with a positive sum, not {weights}")
+
+    def difficulty(self, base_enemy_speed):
+        """Number of speed increases reached at a given base enemy speed"""
+        return int((base_enemy_speed - self.initial_enemy_speed) / self.speed_increment)
+
+# Coin types: colour, value and speed range (drawn by COIN_WEIGHTS)
+COIN_TYPES = {
+    'bronze': (YELLOW, 1, (2, 4)),
+    'silver': (SILVER, 3, (3, 5)),
+    'gold': (GOLD, 5, (4, 6)),
+}
+
+# Draw layers for the dirty-rect renderer
+SPRITE_LAYER = 0
+HUD_LAYER = 1
+
+# Input bitmask flags (one bit per arrow key)
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
+
+def keyboard_input():
+    """Read the arrow keys into an input bitmask"""
+    keys = pygame.key.get_pressed()
+    controls = 0
+    if keys[K_LEFT]:
+        controls |= INPUT_LEFT
+    if keys[K_RIGHT]:
+        controls |= INPUT_RIGHT
+    if keys[K_UP]:
+        controls |= INPUT_UP
+    if keys[K_DOWN]:
+        controls |= INPUT_DOWN
+    return controls
+
+def no_input():
+    """Input source for headless runs that never presses anything"""
+    return 0
+
+class SpatialGroup(pygame.sprite.Group):
+    """Sprite group with a lane broad phase: sprites are bucketed by the column of their left edge
+
+    Obstacles and coins only move down the road, never sideways, so each
+    sprite is filed once when it is added and dropped when it is killed or
+    removed; moving costs nothing. A sprite that does move sideways must be
+    passed to reindex().
+    """
+    def __init__(self, *sprites, cell_width=LANE_CELL_WIDTH):
+        self.cell_width = cell_width
+        self.columns = {}  # column -> set of sprites whose left edge is in it
+        self.sprite_columns = {}  # sprite -> column it is filed under
+        self.max_width = 0  # Widest sprite ever added, to know how far left to look
+        super().__init__(*sprites)
+
+    def _file(self, sprite):
+        column = sprite.rect.left // self.cell_width
+        self.columns.setdefault(column, set()).add(sprite)
+        self.sprite_columns[sprite] = column
+
+    def _unfile(self, sprite):
+        column = self.sprite_columns.pop(sprite)
+        bucket = self.columns[column]
+        bucket.discard(sprite)
+        if not bucket:
+            del self.columns[column]
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self._file(sprite)
+        self.max_width = max(self.max_width, sprite.rect.width)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self._unfile(sprite)
+
+    def reindex(self, sprite):
+        """Move a sprite to the column matching its current rect"""
+        if sprite.rect.left // self.cell_width != self.sprite_columns[sprite]:
+            self._unfile(sprite)
+            self._file(sprite)
+
+    def collide(self, sprite, dokill=False):
+        """Drop-in for pygame.sprite.spritecollide that only tests sprites in overlapping lanes"""
+        rect = sprite.rect
+        colliderect = rect.colliderect
+        columns = self.columns
+        hits = []
+        # A sprite overlaps rect horizontally only if its left edge is in (left - max_width, right)
+        for column in range((rect.left - self.max_width + 1) // self.cell_width,
+                            (rect.right - 1) // self.cell_width + 1):
+            bucket = columns.get(column)
+            if bucket:
+                hits.extend([other for other in bucket if colliderect(other.rect)])
+        if dokill:
+            for other in hits:
+                other.kill()
+        return hits
+
+# Shared pre-rendered sprite images, keyed by (kind, colour)
+_surface_cache = {}
+
+def shared_surface(kind, color):
+    """Return the shared image for a car or coin of the given colour
+
+    Images are rendered once and converted to the display format as soon as
+    a display exists, so every sprite of the same look blits the same surface.
+    """
+    key = (kind, color)
+    entry = _surface_cache.get(key)
+    if entry is not None and (entry[1] or pygame.display.get_surface() is None):
+        return entry[0]
+    if kind == 'car':
+        surface = pygame.Surface((CAR_WIDTH, CAR_HEIGHT))
+        surface.fill(color)
+    else:
+        surface = pygame.Surface((COIN_SIZE, COIN_SIZE), pygame.SRCALPHA)
+        pygame.draw.circle(surface, color, (COIN_SIZE//2, COIN_SIZE//2), COIN_SIZE//2)
+    converted = pygame.display.get_surface() is not None
+    if converted:
+        surface = surface.convert() if kind == 'car' else surface.convert_alpha()
+    _surface_cache[key] = (surface, converted)
+    return surface
+
+def prerender_surfaces():
+    """Render and convert every car and coin image up front (call after set_mode)"""
+    for color in (RED, BLUE):
+        shared_surface('car', color)
+    for color, _, _ in COIN_TYPES.values():
+        shared_surface('coin', color)
+
+class SpritePool:
+    """Keeps killed sprites of one class for reuse instead of reallocating them"""
+    def __init__(self, sprite_class):
+        self.sprite_class = sprite_class
+        self.free = []
+
+    def acquire(self, *args):
+        """Return a recycled sprite reset with args, or a new one if none are free"""
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(*args)
+        else:
+            sprite = self.sprite_class(*args)
+            sprite.pool = self
+        return sprite
+
+    def release(self, sprite):
+        self.free.append(sprite)
+
+class PooledSprite(pygame.sprite.DirtySprite):
+    """Sprite that returns itself to its pool when killed
+
+    Pooled sprites move every step, so they are always dirty.
+    """
+    pool = None
+
+    def __init__(self):
+        super().__init__()
+        self.dirty = 2
+
+    def kill(self):
+        was_alive = self.alive()
+        super().kill()
+        if was_alive and self.pool is not None:
+            self.pool.release(self)
+
+class Car(pygame.sprite.DirtySprite):
     """Player's car class"""
     def __init__(self):
         super().__init__()
-        self.image = pygame.Surface((CAR_WIDTH, CAR_HEIGHT))
-        self.image.fill(RED)
+        self.image = shared_surface('car', RED)
         self.rect = self.image.get_rect()
         self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT - CAR_HEIGHT - 20)
         self.speed = 5
+        self.controls = 0  # Input bitmask for the current step
 
     def update(self):
-        """Update car position based on key presses"""
-        keys = pygame.key.get_pressed()
-        if keys[K_LEFT] and self.rect.left > (SCREEN_WIDTH - ROAD_WIDTH) // 2:
+        """Update car position based on the current input bitmask"""
+        if self.controls & INPUT_LEFT and self.rect.left > (SCREEN_WIDTH - ROAD_WIDTH) // 2:
             self.rect.x -= self.speed
-        if keys[K_RIGHT] and self.rect.right < (SCREEN_WIDTH + ROAD_WIDTH) // 2:
+        if self.controls & INPUT_RIGHT and self.rect.right < (SCREEN_WIDTH + ROAD_WIDTH) // 2:
             self.rect.x += self.speed
-        if keys[K_UP] and self.rect.top > 0:
+        if self.controls & INPUT_UP and self.rect.top > 0:
             self.rect.y -= self.speed
-        if keys[K_DOWN] and self.rect.bottom < SCREEN_HEIGHT:
+        if self.controls & INPUT_DOWN and self.rect.bottom < SCREEN_HEIGHT:
             self.rect.y += self.speed
+        if self.controls:
+            self.dirty = 1
 
-class Obstacle(pygame.sprite.Sprite):
+class Obstacle(PooledSprite):
     """Obstacle cars class with dynamic speed"""
-    def __init__(self, base_speed):
+    def __init__(self, base_speed, rng=random):
         super().__init__()
-        self.image = pygame.Surface((CAR_WIDTH, CAR_HEIGHT))
-        self.image.fill(BLUE)
+        self.image = shared_surface('car', BLUE)
         self.rect = self.image.get_rect()
-        self.rect.x = random.randint(
+        self.reset(base_speed, rng)
+
+    def reset(self, base_speed, rng=random):
+        """Place the obstacle at the top of the road with a fresh speed"""
+        self.rect.x = rng.randint(
             (SCREEN_WIDTH - ROAD_WIDTH) // 2,
             (SCREEN_WIDTH + ROAD_WIDTH) // 2 - CAR_WIDTH
         )
         self.rect.y = -CAR_HEIGHT
         self.base_speed = base_speed
-        self.speed = random.randint(int(base_speed), int(base_speed + 3))
+        self.speed = rng.randint(int(base_speed), int(base_speed + 3))
 
     def update(self):
         """Move obstacle down the screen"""
@@ -71,38 +277,35 @@ class Obstacle(pygame.sprite.Sprite):
         if self.rect.top > SCREEN_HEIGHT:
             self.kill()
 
-class Coin(pygame.sprite.Sprite):
+class Coin(PooledSprite):
     """Collectible coins with different weights/values"""
-    def __init__(self):
+    def __init__(self, rng=random, weights=COIN_WEIGHTS):
         super().__init__()
-        # Randomly determine coin type (70% bronze, 25% silver, 5% gold)
-        coin_type = random.choices(
+        self.rect = pygame.Rect(0, 0, COIN_SIZE, COIN_SIZE)
+        self.reset(rng, weights)
+
+    def reset(self, rng=random, weights=COIN_WEIGHTS):
+        """Roll a new coin type and starting position"""
+        # Randomly determine coin type (70% bronze, 25% silver, 5% gold by default)
+        coin_type = rng.choices(
             ['bronze', 'silver', 'gold'],
-            weights=[70, 25, 5]
+            weights=weights
         )[0]
         
         # Set properties based on coin type
-        if coin_type == 'bronze':
-            self.color = YELLOW
-            self.value = 1
-            self.speed = random.randint(2, 4)
-        elif coin_type == 'silver':
-            self.color = SILVER
-            self.value = 3
-            self.speed = random.randint(3, 5)
-        else:  # gold
-            self.color = GOLD
-            self.value = 5
-            self.speed = random.randint(4, 6)
-            
-        self.image = pygame.Surface((COIN_SIZE, COIN_SIZE), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, self.color, (COIN_SIZE//2, COIN_SIZE//2), COIN_SIZE//2)
-        self.rect = self.image.get_rect()
-        self.rect.x = random.randint(
+        self.set_type(coin_type)
+        self.speed = rng.randint(*COIN_TYPES[coin_type][2])
+        self.rect.x = rng.randint(
             (SCREEN_WIDTH - ROAD_WIDTH) // 2,
             (SCREEN_WIDTH + ROAD_WIDTH) // 2 - COIN_SIZE
         )
-        self.rect.y = random.randint(-1000, -COIN_SIZE)
+        self.rect.y = rng.randint(-1000, -COIN_SIZE)
+
+    def set_type(self, coin_type):
+        """Apply the colour, value and image of a coin type"""
+        self.coin_type = coin_type
+        self.color, self.value, _ = COIN_TYPES[coin_type]
+        self.image = shared_surface('coin', self.color)
 
     def update(self):
         """Move coin down the screen"""
@@ -110,23 +313,146 @@ class Coin(pygame.sprite.Sprite):
         if self.rect.top > SCREEN_HEIGHT:
             self.kill()
 
+class HudText(pygame.sprite.DirtySprite):
+    """HUD label that only re-renders its text surface when the text changes"""
+    def __init__(self, font, color, pos, centered=False):
+        super().__init__()
+        self.font = font
+        self.color = color
+        self.pos = pos
+        self.centered = centered
+        self.text = None
+        self.image = pygame.Surface((0, 0))
+        self.rect = self.image.get_rect(topleft=pos)
+        self.visible = 0
+
+    def set_text(self, text):
+        """Show text (or hide the label when text is None)"""
+        if text == self.text:
+            return
+        self.text = text
+        if text is None:
+            self.visible = 0
+        else:
+            self.image = render_text(self.font, text, self.color)
+            if self.centered:
+                self.rect = self.image.get_rect(center=self.pos)
+            else:
+                self.rect = self.image.get_rect(topleft=self.pos)
+            self.visible = 1
+        self.dirty = 1
+
+class Renderer:
+    """Draws the game state to the display; attached to a Game as an observer
+
+    Uses a dirty-rect pipeline: the static road is pre-composited into a
+    background surface, game.all_sprites (a LayeredDirty group) reports the
+    rects it changed, and only those are pushed with display.update().
+    """
+    def __init__(self, screen):
+        self.screen = screen
+        self.font = get_font('Arial', 24)
+        prerender_surfaces()
+        self.background = self.build_background()
+        self.game = None
+
+        # HUD labels live on their own layer above the sprites
+        self.score_text = HudText(self.font, WHITE, (10, 10))
+        self.coins_text = HudText(self.font, WHITE, (10, 40))
+        self.speed_text = HudText(self.font, WHITE, (10, 70))
+        self.game_over_text = HudText(self.font, RED, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2), centered=True)
+        self.hud = [self.score_text, self.coins_text, self.speed_text, self.game_over_text]
+
+    def build_background(self):
+        """Pre-composite the grass, road and lane markings"""
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        background.fill(GREEN)
+        pygame.draw.rect(background, GRAY, 
+                         ((SCREEN_WIDTH - ROAD_WIDTH) // 2, 0, ROAD_WIDTH, SCREEN_HEIGHT))
+        
+        # Draw road markings
+        for y in range(0, SCREEN_HEIGHT, 40):
+            pygame.draw.rect(background, WHITE, 
+                             (SCREEN_WIDTH // 2 - 5, y, 10, 20))
+        return background.convert()
+
+    def attach(self, game):
+        """Hook the HUD into a game's sprite group and schedule a full repaint"""
+        self.game = game
+        game.all_sprites.add(*self.hud, layer=HUD_LAYER)
+        game.all_sprites.clear(self.screen, self.background)
+        self.screen.blit(self.background, (0, 0))
+        game.all_sprites.repaint_rect(self.screen.get_rect())
+
+    def __call__(self, game):
+        """Draw the changed parts of the frame and push only those to the display"""
+        full_redraw = self.game is not game
+        if full_redraw:
+            self.attach(game)
+
+        # HUD text is only re-rendered when its value changes
+        self.score_text.set_text(f"Score: {game.score}")
+        self.coins_text.set_text(f"Coins: {game.coins_collected}")
+        self.speed_text.set_text(f"Difficulty: {game.config.difficulty(game.base_enemy_speed)}")
+        self.game_over_text.set_text("GAME OVER - Press R to restart" if game.game_over else None)
+
+        rects = game.all_sprites.draw(self.screen)
+        if full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
 class Game:
-    """Main game class with enhanced features"""
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Enhanced Racer Game")
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont('Arial', 24)
+    """Main game class with enhanced features
+
+    The simulation only depends on ``input_source`` (a callable returning an
+    input bitmask) and a seeded RNG, so with ``headless=True`` it runs without
+    a window or clock. Observers are called with the game after every step.
+    Difficulty parameters come from ``config`` (a RacerConfig).
+    """
+    def __init__(self, seed=None, input_source=None, headless=False, config=None):
+        self.headless = headless
+        self.config = config or RacerConfig()
+        self.observers = []
+        if headless:
+            self.screen = None
+            self.clock = None
+            self.input_source = input_source or no_input
+        else:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Enhanced Racer Game")
+            self.clock = pygame.time.Clock()
+            self.input_source = input_source or keyboard_input
+            self.observers.append(Renderer(self.screen))
         self.running = True
+        self.profiler = FrameProfiler.from_env()
+
+        # Sprite groups and pools of recycled obstacles/coins
+        self.all_sprites = pygame.sprite.LayeredDirty()
+        self.obstacles = SpatialGroup()
+        self.coins = SpatialGroup()
+        self.obstacle_pool = SpritePool(Obstacle)
+        self.coin_pool = SpritePool(Coin)
+        self.car = None
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Start a new run, reseeding the RNG (a fresh seed is drawn if none is given)"""
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.frame = 0
         self.score = 0
         self.coins_collected = 0
         self.game_over = False
-        self.base_enemy_speed = 3  # Initial base speed for enemies
+        self.base_enemy_speed = self.config.initial_enemy_speed
         
-        # Sprite groups
-        self.all_sprites = pygame.sprite.Group()
-        self.obstacles = pygame.sprite.Group()
-        self.coins = pygame.sprite.Group()
+        # Clear the previous run; obstacles and coins go back to their pools
+        for sprite in self.obstacles.sprites() + self.coins.sprites():
+            sprite.kill()
+        if self.car is not None:
+            self.car.kill()
         
         # Create player car
         self.car = Car()
@@ -136,11 +462,55 @@ class Game:
         self.obstacle_timer = 0
         self.coin_timer = 0
 
+    def get_state(self):
+        """Snapshot of the simulation state as plain (JSON-friendly) data"""
+        return {
+            'seed': self.seed,
+            'frame': self.frame,
+            'score': self.score,
+            'coins_collected': self.coins_collected,
+            'game_over': self.game_over,
+            'base_enemy_speed': self.base_enemy_speed,
+            'obstacle_timer': self.obstacle_timer,
+            'coin_timer': self.coin_timer,
+            'car': [self.car.rect.x, self.car.rect.y],
+            'obstacles': [[o.rect.x, o.rect.y, o.speed, o.base_speed] for o in self.obstacles],
+            'coins': [[c.rect.x, c.rect.y, c.speed, c.coin_type] for c in self.coins],
+            'rng': self.rng.getstate(),
+        }
+
+    def set_state(self, state):
+        """Restore a snapshot taken with get_state()"""
+        self.reset(state['seed'])
+        version, internal, gauss_next = state['rng']
+        self.rng.setstate((version, tuple(internal), gauss_next))
+        for key in ('frame', 'score', 'coins_collected', 'game_over',
+                    'base_enemy_speed', 'obstacle_timer', 'coin_timer'):
+            setattr(self, key, state[key])
+        self.car.rect.topleft = state['car']
+
+        # Pooled sprites roll random attributes on reset, so use a scratch RNG
+        # and then overwrite them with the saved values
+        scratch = random.Random(0)
+        for x, y, speed, base_speed in state['obstacles']:
+            obstacle = self.obstacle_pool.acquire(base_speed, scratch)
+            obstacle.rect.topleft = (x, y)
+            obstacle.speed = speed
+            self.obstacles.add(obstacle)
+            self.all_sprites.add(obstacle)
+        for x, y, speed, coin_type in state['coins']:
+            coin = self.coin_pool.acquire(scratch)
+            coin.set_type(coin_type)
+            coin.rect.topleft = (x, y)
+            coin.speed = speed
+            self.coins.add(coin)
+            self.all_sprites.add(coin)
+
     def spawn_obstacles(self):
         """Spawn new obstacles at random intervals with current base speed"""
         self.obstacle_timer += 1
-        if self.obstacle_timer > random.randint(60, 120):
-            new_obstacle = Obstacle(self.base_enemy_speed)
+        if self.obstacle_timer > self.rng.randint(*self.config.obstacle_interval):
+            new_obstacle = self.obstacle_pool.acquire(self.base_enemy_speed, self.rng)
             self.obstacles.add(new_obstacle)
             self.all_sprites.add(new_obstacle)
             self.obstacle_timer = 0
@@ -148,8 +518,8 @@ class Game:
     def spawn_coins(self):
         """Spawn new coins at random intervals"""
         self.coin_timer += 1
-        if self.coin_timer > random.randint(90, 180):
-            new_coin = Coin()
+        if self.coin_timer > self.rng.randint(*self.config.coin_interval):
+            new_coin = self.coin_pool.acquire(self.rng, self.config.coin_weights)
             self.coins.add(new_coin)
             self.all_sprites.add(new_coin)
             self.coin_timer = 0
@@ -157,17 +527,25 @@ class Game:
     def handle_events(self):
         """Handle game events"""
         for event in pygame.event.get():
+            if self.profiler.handle_event(event):
+                if not self.profiler.overlay_visible:
+                    # Let the dirty-rect renderer paint over the hidden overlay
+                    self.all_sprites.repaint_rect(self.profiler.overlay_rect(self.screen))
+                continue
             if event.type == QUIT:
                 self.running = False
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
                     self.running = False
                 if event.key == K_r and self.game_over:
-                    self.__init__()  # Reset game
+                    self.reset()  # Reset game
 
     def update(self):
-        """Update game state"""
+        """Advance the simulation by one fixed step"""
         if not self.game_over:
+            self.frame += 1
+            self.car.controls = self.input_source()
+
             # Spawn objects
             self.spawn_obstacles()
             self.spawn_coins()
@@ -176,59 +554,51 @@ class Game:
             self.all_sprites.update()
             
             # Check for collisions with obstacles
-            if pygame.sprite.spritecollide(self.car, self.obstacles, False):
+            if self.obstacles.collide(self.car):
                 self.game_over = True
             
             # Check for coin collection
-            coins_hit = pygame.sprite.spritecollide(self.car, self.coins, True)
+            coins_hit = self.coins.collide(self.car, dokill=True)
             for coin in coins_hit:
                 self.coins_collected += 1
                 self.score += coin.value
                 
                 # Increase enemy speed after collecting N coins
-                if self.coins_collected % COINS_FOR_SPEED_INCREASE == 0:
-                    self.base_enemy_speed += SPEED_INCREMENT
+                if self.coins_collected % self.config.coins_for_speed_increase == 0:
+                    self.base_enemy_speed += self.config.speed_increment
 
     def draw(self):
-        """Draw everything to the screen"""
-        # Draw background
-        self.screen.fill(GREEN)
-        pygame.draw.rect(self.screen, GRAY, 
-                         ((SCREEN_WIDTH - ROAD_WIDTH) // 2, 0, ROAD_WIDTH, SCREEN_HEIGHT))
-        
-        # Draw road markings
-        for y in range(0, SCREEN_HEIGHT, 40):
-            pygame.draw.rect(self.screen, WHITE, 
-                             (SCREEN_WIDTH // 2 - 5, y, 10, 20))
-        
-        # Draw all sprites
-        self.all_sprites.draw(self.screen)
-        
-        # Draw score and coins counter
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-        coins_text = self.font.render(f"Coins: {self.coins_collected}", True, WHITE)
-        speed_text = self.font.render(f"Difficulty: {int((self.base_enemy_speed - 3) * 2)}", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(coins_text, (10, 40))
-        self.screen.blit(speed_text, (10, 70))
-        
-        # Draw game over screen if needed
-        if self.game_over:
-            game_over_text = self.font.render("GAME OVER - Press R to restart", True, RED)
-            self.screen.blit(game_over_text, 
-                            (SCREEN_WIDTH // 2 - game_over_text.get_width() // 2, 
-                             SCREEN_HEIGHT // 2))
-        
-        pygame.display.flip()
+        """Notify observers (the renderer, when not headless) of the new state"""
+        for observer in self.observers:
+            observer(self)
+
+    def simulate(self, max_steps):
+        """Run up to max_steps headless steps or until game over; return steps taken"""
+        steps = 0
+        while steps < max_steps and not self.game_over:
+            self.update()
+            self.draw()
+            steps += 1
+        return steps
 
     def run(self):
         """Main game loop"""
+        profiler = self.profiler
         while self.running:
             self.clock.tick(FPS)
+            profiler.begin_frame()
             self.handle_events()
+            profiler.mark('events')
             self.update()
+            profiler.mark('update')
             self.draw()
+            overlay = profiler.draw_overlay(self.screen)
+            if overlay:
+                pygame.display.update(overlay)
+            profiler.mark('draw')
+            profiler.end_frame()
 
+        profiler.close()
         pygame.quit()
         sys.exit()
 
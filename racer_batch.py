@@ -0,0 +1,304 @@
+"""Vectorized batch engine that steps many racer games at once.
+
+Every game is a row in a set of NumPy arrays (car position, score, timers,
+base enemy speed, and fixed-capacity slot arrays for obstacles and coins).
+The rules and scoring mirror ``racer2.Game.update()``; run this module to
+check it against the sprite-based implementation.
+"""
+import math
+import random
+
+import numpy as np
+
+import racer2
+from racer2 import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, ROAD_WIDTH, CAR_WIDTH, CAR_HEIGHT, COIN_SIZE,
+    RacerConfig, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN,
+)
+
+# Road bounds and car start (same values racer2 uses)
+ROAD_LEFT = (SCREEN_WIDTH - ROAD_WIDTH) // 2
+ROAD_RIGHT = (SCREEN_WIDTH + ROAD_WIDTH) // 2
+CAR_SPEED = 5
+CAR_START_X = SCREEN_WIDTH // 2 - CAR_WIDTH // 2
+CAR_START_Y = SCREEN_HEIGHT - CAR_HEIGHT - 20 - CAR_HEIGHT // 2
+
+# Coin types in racer2 order: bronze, silver, gold
+COIN_VALUES = np.array([1, 3, 5], dtype=np.int32)
+COIN_MIN_SPEEDS = np.array([2, 3, 4], dtype=np.int32)
+COIN_TYPE_NAMES = ['bronze', 'silver', 'gold']
+
+
+def _slot_capacity(travel, min_speed, interval):
+    """Upper bound on how many entities of one kind can be alive at once"""
+    lifetime = math.ceil(travel / min_speed)
+    return lifetime // (interval[0] + 1) + 2
+
+
+class BatchRacer:
+    """N racer games stored as NumPy arrays and stepped in one call
+
+    All games share one RacerConfig (the racer2 defaults unless given).
+    """
+    def __init__(self, n, seed=None, config=None):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        self.config = config or RacerConfig()
+        weights = np.array(self.config.coin_weights, dtype=np.float64)
+        self.coin_probabilities = weights / weights.sum()
+        self.obstacle_capacity = _slot_capacity(
+            SCREEN_HEIGHT + 2 * CAR_HEIGHT, max(1, int(self.config.initial_enemy_speed)),
+            self.config.obstacle_interval)
+        self.coin_capacity = _slot_capacity(
+            SCREEN_HEIGHT + 1000 + COIN_SIZE, COIN_MIN_SPEEDS.min(), self.config.coin_interval)
+
+        # Per-game state
+        self.car_x = np.zeros(n, dtype=np.int32)
+        self.car_y = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.coins_collected = np.zeros(n, dtype=np.int64)
+        self.base_enemy_speed = np.zeros(n, dtype=np.float64)
+        self.obstacle_timer = np.zeros(n, dtype=np.int32)
+        self.coin_timer = np.zeros(n, dtype=np.int32)
+        self.frame = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+
+        # Per-slot entity state
+        oc, cc = self.obstacle_capacity, self.coin_capacity
+        self.obstacle_x = np.zeros((n, oc), dtype=np.int32)
+        self.obstacle_y = np.zeros((n, oc), dtype=np.int32)
+        self.obstacle_speed = np.zeros((n, oc), dtype=np.int32)
+        self.obstacle_alive = np.zeros((n, oc), dtype=bool)
+        self.coin_x = np.zeros((n, cc), dtype=np.int32)
+        self.coin_y = np.zeros((n, cc), dtype=np.int32)
+        self.coin_speed = np.zeros((n, cc), dtype=np.int32)
+        self.coin_value = np.zeros((n, cc), dtype=np.int32)
+        self.coin_type = np.zeros((n, cc), dtype=np.int8)
+        self.coin_alive = np.zeros((n, cc), dtype=bool)
+
+        # Random values drawn by the most recent step (used by the equivalence check)
+        self.last_draws = None
+        self.reset()
+
+    def reset(self, mask=None):
+        """Reset the games selected by a boolean mask (all games by default)"""
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        mask = np.array(mask, dtype=bool)  # May alias self.game_over, which is cleared below
+        self.car_x[mask] = CAR_START_X
+        self.car_y[mask] = CAR_START_Y
+        self.score[mask] = 0
+        self.coins_collected[mask] = 0
+        self.base_enemy_speed[mask] = self.config.initial_enemy_speed
+        self.obstacle_timer[mask] = 0
+        self.coin_timer[mask] = 0
+        self.frame[mask] = 0
+        self.game_over[mask] = False
+        self.obstacle_alive[mask] = False
+        self.coin_alive[mask] = False
+
+    def _free_slots(self, alive, env):
+        """First free slot per selected game; raise if a game ran out of slots"""
+        slots = np.argmin(alive[env], axis=1)
+        if alive[env, slots].any():
+            raise RuntimeError("Batch slot capacity exceeded")
+        return slots
+
+    def step(self, controls):
+        """Advance every running game by one step
+
+        controls is an int array of input bitmasks, one per game.
+        Returns (score gained this step, game_over mask).
+        """
+        controls = np.asarray(controls)
+        config = self.config
+        active = ~self.game_over
+        n = self.n
+        draws = {}
+        self.frame[active] += 1
+
+        # Spawn obstacles (the threshold is drawn every step, like racer2)
+        self.obstacle_timer[active] += 1
+        threshold = self.rng.integers(config.obstacle_interval[0], config.obstacle_interval[1] + 1, size=n)
+        env = np.flatnonzero(active & (self.obstacle_timer > threshold))
+        draws['obstacle_threshold'] = threshold
+        draws['obstacle_env'] = env
+        if env.size:
+            base = self.base_enemy_speed[env]
+            x = self.rng.integers(ROAD_LEFT, ROAD_RIGHT - CAR_WIDTH + 1, size=env.size)
+            speed = self.rng.integers(base.astype(np.int64), (base + 3).astype(np.int64) + 1)
+            slots = self._free_slots(self.obstacle_alive, env)
+            self.obstacle_x[env, slots] = x
+            self.obstacle_y[env, slots] = -CAR_HEIGHT
+            self.obstacle_speed[env, slots] = speed
+            self.obstacle_alive[env, slots] = True
+            self.obstacle_timer[env] = 0
+            draws['obstacle_x'] = x
+            draws['obstacle_speed'] = speed
+
+        # Spawn coins
+        self.coin_timer[active] += 1
+        threshold = self.rng.integers(config.coin_interval[0], config.coin_interval[1] + 1, size=n)
+        env = np.flatnonzero(active & (self.coin_timer > threshold))
+        draws['coin_threshold'] = threshold
+        draws['coin_env'] = env
+        if env.size:
+            kind = self.rng.choice(len(COIN_VALUES), size=env.size, p=self.coin_probabilities)
+            speed = COIN_MIN_SPEEDS[kind] + self.rng.integers(0, 3, size=env.size)
+            x = self.rng.integers(ROAD_LEFT, ROAD_RIGHT - COIN_SIZE + 1, size=env.size)
+            y = self.rng.integers(-1000, -COIN_SIZE + 1, size=env.size)
+            slots = self._free_slots(self.coin_alive, env)
+            self.coin_x[env, slots] = x
+            self.coin_y[env, slots] = y
+            self.coin_speed[env, slots] = speed
+            self.coin_value[env, slots] = COIN_VALUES[kind]
+            self.coin_type[env, slots] = kind
+            self.coin_alive[env, slots] = True
+            self.coin_timer[env] = 0
+            draws['coin_type'] = kind
+            draws['coin_speed'] = speed
+            draws['coin_x'] = x
+            draws['coin_y'] = y
+        self.last_draws = draws
+
+        # Move the car (checks run in the same order as Car.update)
+        move = active & (controls & INPUT_LEFT != 0) & (self.car_x > ROAD_LEFT)
+        self.car_x -= CAR_SPEED * move
+        move = active & (controls & INPUT_RIGHT != 0) & (self.car_x + CAR_WIDTH < ROAD_RIGHT)
+        self.car_x += CAR_SPEED * move
+        move = active & (controls & INPUT_UP != 0) & (self.car_y > 0)
+        self.car_y -= CAR_SPEED * move
+        move = active & (controls & INPUT_DOWN != 0) & (self.car_y + CAR_HEIGHT < SCREEN_HEIGHT)
+        self.car_y += CAR_SPEED * move
+
+        # Move obstacles and coins, killing those that left the screen
+        moving = self.obstacle_alive & active[:, None]
+        self.obstacle_y += self.obstacle_speed * moving
+        self.obstacle_alive &= ~(moving & (self.obstacle_y > SCREEN_HEIGHT))
+        moving = self.coin_alive & active[:, None]
+        self.coin_y += self.coin_speed * moving
+        self.coin_alive &= ~(moving & (self.coin_y > SCREEN_HEIGHT))
+
+        # AABB collisions against the car (same test as Rect.colliderect)
+        car_x = self.car_x[:, None]
+        car_y = self.car_y[:, None]
+        crashed = (self.obstacle_alive
+                   & (self.obstacle_x < car_x + CAR_WIDTH) & (car_x < self.obstacle_x + CAR_WIDTH)
+                   & (self.obstacle_y < car_y + CAR_HEIGHT) & (car_y < self.obstacle_y + CAR_HEIGHT)
+                   ).any(axis=1)
+        hit = (self.coin_alive
+               & (self.coin_x < car_x + CAR_WIDTH) & (car_x < self.coin_x + COIN_SIZE)
+               & (self.coin_y < car_y + CAR_HEIGHT) & (car_y < self.coin_y + COIN_SIZE))
+        self.coin_alive &= ~hit
+
+        # Coin pickup and difficulty increase
+        gained = (self.coin_value * hit).sum(axis=1)
+        picked = hit.sum(axis=1)
+        before = self.coins_collected.copy()
+        self.coins_collected += picked
+        self.score += gained
+        per_increase = config.coins_for_speed_increase
+        increases = self.coins_collected // per_increase - before // per_increase
+        self.base_enemy_speed += increases * config.speed_increment
+
+        self.game_over |= active & crashed
+        return gained, self.game_over.copy()
+
+
+class _ScriptedRandom:
+    """Stands in for random.Random in racer2, returning queued values in call order"""
+    def __init__(self):
+        self.queue = []
+
+    def randint(self, a, b):
+        value = int(self.queue.pop(0))
+        assert a <= value <= b, (value, a, b)
+        return value
+
+    def choices(self, population, weights=None):
+        return [population[int(self.queue.pop(0))]]
+
+
+def _sprite_state(game):
+    """Comparable summary of a racer2.Game"""
+    obstacles = sorted((o.rect.x, o.rect.y, o.speed) for o in game.obstacles)
+    coins = sorted((c.rect.x, c.rect.y, c.speed, c.value) for c in game.coins)
+    return (game.car.rect.x, game.car.rect.y, game.score, game.coins_collected,
+            game.base_enemy_speed, game.game_over, obstacles, coins)
+
+
+def _batch_state(batch, i):
+    """Comparable summary of game i of a BatchRacer"""
+    alive = batch.obstacle_alive[i]
+    obstacles = sorted(zip(batch.obstacle_x[i][alive].tolist(), batch.obstacle_y[i][alive].tolist(),
+                           batch.obstacle_speed[i][alive].tolist()))
+    alive = batch.coin_alive[i]
+    coins = sorted(zip(batch.coin_x[i][alive].tolist(), batch.coin_y[i][alive].tolist(),
+                       batch.coin_speed[i][alive].tolist(), batch.coin_value[i][alive].tolist()))
+    return (int(batch.car_x[i]), int(batch.car_y[i]), int(batch.score[i]),
+            int(batch.coins_collected[i]), float(batch.base_enemy_speed[i]),
+            bool(batch.game_over[i]), obstacles, coins)
+
+
+def check_equivalence(n=8, steps=5000, seed=0, config=None):
+    """Step a BatchRacer and n sprite-based racer2 games side by side
+
+    Each sprite game replays the random values the batch engine drew, and
+    both are driven with the same random inputs. Raises AssertionError on the
+    first mismatch. Finished games are restarted on both sides.
+    """
+    batch = BatchRacer(n, seed=seed, config=config)
+    policy = random.Random(seed)
+    games = []
+    for _ in range(n):
+        game = racer2.Game(headless=True, config=config)
+        game.rng = _ScriptedRandom()
+        games.append(game)
+
+    for step in range(steps):
+        controls = np.array([policy.randrange(16) for _ in range(n)])
+        active = ~batch.game_over
+        batch.step(controls)
+        draws = batch.last_draws
+        obstacle_env = {e: k for k, e in enumerate(draws['obstacle_env'].tolist())}
+        coin_env = {e: k for k, e in enumerate(draws['coin_env'].tolist())}
+        for i, game in enumerate(games):
+            if not active[i]:
+                continue
+            queue = [draws['obstacle_threshold'][i]]
+            if i in obstacle_env:
+                k = obstacle_env[i]
+                queue += [draws['obstacle_x'][k], draws['obstacle_speed'][k]]
+            queue.append(draws['coin_threshold'][i])
+            if i in coin_env:
+                k = coin_env[i]
+                queue += [draws['coin_type'][k], draws['coin_speed'][k], draws['coin_x'][k], draws['coin_y'][k]]
+            game.rng.queue = queue
+            game.input_source = lambda c=int(controls[i]): c
+            game.update()
+            assert not game.rng.queue, (step, i, "unused random values")
+            assert _sprite_state(game) == _batch_state(batch, i), (step, i)
+
+        # Restart finished games on both sides so the whole run is compared
+        for i in np.flatnonzero(batch.game_over):
+            games[i].reset()
+            games[i].rng = _ScriptedRandom()
+        batch.reset(batch.game_over)
+    return steps
+
+
+if __name__ == "__main__":
+    import time
+
+    check_equivalence()
+    print("Equivalence check passed")
+
+    for n in (1, 100, 1000, 10000):
+        batch = BatchRacer(n, seed=1)
+        controls = np.random.default_rng(1).integers(0, 16, size=(200, n))
+        start = time.perf_counter()
+        for row in controls:
+            batch.step(row)
+            batch.reset(batch.game_over)
+        elapsed = time.perf_counter() - start
+        print(f"N={n:>6}: {200 * n / elapsed:,.0f} game-steps/sec")
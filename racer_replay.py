@@ -0,0 +1,203 @@
+"""Deterministic replay recording and fast-forward playback for racer2.
+
+A replay is the run's seed plus one 4-bit input mask per simulation frame
+(two frames packed per byte), the final score/coin count for verification,
+and a seek index of periodic state snapshots.
+
+File layout (little-endian):
+    header   magic, version, seed, frames, score, coins, snapshot interval,
+             snapshot count
+    inputs   ceil(frames / 2) bytes of packed input masks
+    index    per snapshot: frame, compressed length, zlib(JSON state)
+
+Usage:
+    python racer_replay.py record out.rpl [--seed N]
+    python racer_replay.py play out.rpl
+    python racer_replay.py seek out.rpl FRAME
+"""
+import json
+import struct
+import sys
+import zlib
+
+import racer2
+
+MAGIC = b'RRPL'
+VERSION = 1
+HEADER = struct.Struct('<4sBQIqIII')
+SNAPSHOT_HEADER = struct.Struct('<II')
+SNAPSHOT_INTERVAL = 600  # Frames between seek snapshots (10 seconds at 60 FPS)
+
+
+class ReplayError(Exception):
+    """Raised for malformed replay files or failed verification"""
+
+
+def pack_inputs(inputs):
+    """Pack 4-bit input masks two per byte"""
+    packed = bytearray((len(inputs) + 1) // 2)
+    for i, mask in enumerate(inputs):
+        packed[i // 2] |= (mask & 0xF) << (4 * (i % 2))
+    return bytes(packed)
+
+
+def unpack_inputs(packed, frames):
+    """Inverse of pack_inputs"""
+    return [(packed[i // 2] >> (4 * (i % 2))) & 0xF for i in range(frames)]
+
+
+class Replay:
+    """A recorded run: seed, per-frame inputs, final result and seek snapshots"""
+    def __init__(self, seed, inputs, score, coins, snapshots=None,
+                 snapshot_interval=SNAPSHOT_INTERVAL):
+        self.seed = seed
+        self.inputs = inputs
+        self.score = score
+        self.coins = coins
+        self.snapshots = snapshots or {}  # frame -> Game.get_state() dict
+        self.snapshot_interval = snapshot_interval
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, len(self.inputs), self.score,
+                                self.coins, self.snapshot_interval, len(self.snapshots)))
+            f.write(pack_inputs(self.inputs))
+            for frame in sorted(self.snapshots):
+                blob = zlib.compress(json.dumps(self.snapshots[frame], separators=(',', ':')).encode())
+                f.write(SNAPSHOT_HEADER.pack(frame, len(blob)))
+                f.write(blob)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ReplayError("Replay file is truncated")
+        magic, version, seed, frames, score, coins, interval, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError("Not a racer replay (or unsupported version)")
+        offset = HEADER.size
+        packed = data[offset:offset + (frames + 1) // 2]
+        offset += len(packed)
+        snapshots = {}
+        for _ in range(count):
+            frame, length = SNAPSHOT_HEADER.unpack_from(data, offset)
+            offset += SNAPSHOT_HEADER.size
+            snapshots[frame] = json.loads(zlib.decompress(data[offset:offset + length]))
+            offset += length
+        return cls(seed, unpack_inputs(packed, frames), score, coins, snapshots, interval)
+
+
+class Recorder:
+    """Records the input masks a Game consumes, plus periodic state snapshots
+
+    attach() wraps the game's input source and registers the recorder as an
+    observer. A new recording starts whenever the game starts a new run.
+    """
+    def __init__(self, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.snapshot_interval = snapshot_interval
+        self.game = None
+        self.seed = None
+        self.inputs = []
+        self.snapshots = {}
+
+    def attach(self, game):
+        self.game = game
+        source = game.input_source
+
+        def recording_input():
+            if game.frame == 1:  # First step of a new run
+                self.seed = game.seed
+                self.inputs = []
+                self.snapshots = {}
+            controls = source()
+            self.inputs.append(controls)
+            return controls
+
+        game.input_source = recording_input
+        game.observers.append(self)
+
+    def __call__(self, game):
+        """Observer hook: snapshot every snapshot_interval frames"""
+        frame = game.frame
+        if frame and frame % self.snapshot_interval == 0 and frame not in self.snapshots:
+            self.snapshots[frame] = game.get_state()
+
+    def replay(self):
+        """The recording so far as a Replay"""
+        return Replay(self.seed, list(self.inputs), self.game.score, self.game.coins_collected,
+                      dict(self.snapshots), self.snapshot_interval)
+
+
+class Player:
+    """Re-simulates a Replay headless and as fast as possible"""
+    def __init__(self, replay):
+        self.replay = replay
+        self.game = racer2.Game(seed=replay.seed, headless=True, input_source=self._next_input)
+        self.position = 0  # Index of the next input to feed
+
+    def _next_input(self):
+        controls = self.replay.inputs[self.position]
+        self.position += 1
+        return controls
+
+    def seek(self, frame):
+        """Jump to the state after `frame` steps, starting from the nearest snapshot"""
+        frame = min(frame, len(self.replay.inputs))
+        start = max((f for f in self.replay.snapshots if f <= frame), default=0)
+        if frame < self.position or start > self.position:
+            if start:
+                self.game.set_state(self.replay.snapshots[start])
+            else:
+                self.game.reset(self.replay.seed)
+            self.position = start
+        while self.position < frame and not self.game.game_over:
+            self.game.update()
+        return self.game
+
+    def verify(self):
+        """Play to the end and check the recorded score and coin count"""
+        game = self.seek(len(self.replay.inputs))
+        if (game.score, game.coins_collected) != (self.replay.score, self.replay.coins):
+            raise ReplayError(
+                f"Replay diverged: got score {game.score} / {game.coins_collected} coins, "
+                f"expected {self.replay.score} / {self.replay.coins}")
+        return game
+
+
+def record(path, seed=None):
+    """Play the game with a recorder attached; save the last run on quit"""
+    game = racer2.Game(seed=seed)
+    recorder = Recorder()
+    recorder.attach(game)
+    while game.running:
+        game.clock.tick(racer2.FPS)
+        game.handle_events()
+        game.update()
+        game.draw()
+    if recorder.inputs:
+        recorder.replay().save(path)
+        print(f"Saved {len(recorder.inputs)} frames to {path}")
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == 'record':
+        seed = int(argv[3]) if len(argv) >= 4 and argv[2] == '--seed' else None
+        record(argv[1], seed)
+    elif len(argv) == 2 and argv[0] == 'play':
+        replay = Replay.load(argv[1])
+        game = Player(replay).verify()
+        print(f"OK: {len(replay.inputs)} frames, score {game.score}, coins {game.coins_collected}")
+    elif len(argv) == 3 and argv[0] == 'seek':
+        game = Player(Replay.load(argv[1])).seek(int(argv[2]))
+        state = game.get_state()
+        del state['rng']
+        print(json.dumps(state))
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
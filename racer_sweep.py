@@ -0,0 +1,194 @@
+"""Multiprocess difficulty-tuning sweep for the racer.
+
+Runs seeded headless racer2 episodes for every combination of the given
+RacerConfig values and policies, spread over a process pool, and prints a
+table of survival time, score and coin statistics per combination.
+
+Usage:
+    python racer_sweep.py --set coins_for_speed_increase=3,5,8 \\
+        --set speed_increment=0.5,1.0 --set obstacle_interval=40:80,60:120 \\
+        --policy random,dodge --episodes 40 --csv results.csv
+"""
+import argparse
+import csv
+import itertools
+import os
+import random
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields, replace
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import racer2
+from racer2 import RacerConfig, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN
+
+
+def random_policy(game, rng):
+    """Hold a random input mask for a random number of frames"""
+    state = {'mask': 0, 'frames': 0}
+
+    def policy():
+        if state['frames'] <= 0:
+            state['mask'] = rng.choice([0, 0, INPUT_LEFT, INPUT_RIGHT, INPUT_UP, INPUT_DOWN])
+            state['frames'] = rng.randint(5, 30)
+        state['frames'] -= 1
+        return state['mask']
+    return policy
+
+
+def dodge_policy(game, rng):
+    """Steer away from obstacles ahead in the car's lane, otherwise chase coins"""
+    road_left = (racer2.SCREEN_WIDTH - racer2.ROAD_WIDTH) // 2
+    road_right = (racer2.SCREEN_WIDTH + racer2.ROAD_WIDTH) // 2
+
+    def policy():
+        car = game.car.rect
+        danger = pygame.Rect(car.left - 10, car.top - 250, car.width + 20, car.height + 250)
+        threats = [o.rect for o in game.obstacles if danger.colliderect(o.rect)]
+        if threats:
+            # Dodge to whichever side of the nearest threat is reachable sooner
+            threat = max(threats, key=lambda r: r.bottom)
+            to_left = car.right - threat.left if threat.left - road_left >= car.width else None
+            to_right = threat.right - car.left if road_right - threat.right >= car.width else None
+            if to_right is None or (to_left is not None and to_left < to_right):
+                return INPUT_LEFT | INPUT_DOWN
+            return INPUT_RIGHT | INPUT_DOWN
+        coins = [c.rect for c in game.coins if c.rect.bottom > 0 and c.rect.top < car.bottom]
+        if coins:
+            target = min(coins, key=lambda r: abs(r.centerx - car.centerx))
+            if target.centerx < car.centerx - 5:
+                return INPUT_LEFT
+            if target.centerx > car.centerx + 5:
+                return INPUT_RIGHT
+        return 0
+    return policy
+
+
+POLICIES = {'random': random_policy, 'dodge': dodge_policy}
+
+
+def run_episode(task):
+    """Run one headless episode; task is (config, policy name, seed, max_steps)"""
+    config, policy_name, seed, max_steps = task
+    game = racer2.Game(seed=seed, headless=True, config=config)
+    # A policy seeded like the game would draw the same numbers as the spawner
+    game.input_source = POLICIES[policy_name](game, random.Random(f"policy-{seed}"))
+    steps = game.simulate(max_steps)
+    return steps, game.score, game.coins_collected
+
+
+def parse_value(name, text):
+    """Parse one --set value according to the RacerConfig field's annotated type"""
+    field_type = {f.name: f.type for f in fields(RacerConfig)}[name]
+    try:
+        if field_type is tuple:
+            return tuple(int(part) for part in text.split(':'))
+        return field_type(text)
+    except ValueError:
+        raise ValueError(f"{name}: {text!r} is not a valid {field_type.__name__}") from None
+
+
+def parse_grid(settings):
+    """Turn ['name=v1,v2', ...] into a list of RacerConfig combinations
+
+    Raises ValueError for an unknown field, a value that doesn't parse, or
+    a combination RacerConfig rejects.
+    """
+    names = {f.name for f in fields(RacerConfig)}
+    axes = []
+    for setting in settings:
+        name, _, values = setting.partition('=')
+        if name not in names:
+            raise ValueError(f"unknown RacerConfig field: {name}")
+        axes.append([(name, parse_value(name, v)) for v in values.split(',')])
+    return [replace(RacerConfig(), **dict(combo)) for combo in itertools.product(*axes)]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summarize(results):
+    """Aggregate (steps, score, coins) tuples into summary statistics"""
+    steps, scores, coins = zip(*results)
+    return {
+        'episodes': len(results),
+        'survival_mean': statistics.fmean(steps),
+        'survival_p10': percentile(steps, 10),
+        'survival_p50': percentile(steps, 50),
+        'survival_p90': percentile(steps, 90),
+        'score_mean': statistics.fmean(scores),
+        'score_p90': percentile(scores, 90),
+        'coins_mean': statistics.fmean(coins),
+        'coins_p50': percentile(coins, 50),
+        'coins_p90': percentile(coins, 90),
+    }
+
+
+def sweep(configs, policies, episodes, max_steps, seed=0, workers=None):
+    """Run every (config, policy) combination; returns a list of result rows"""
+    combos = list(itertools.product(configs, policies))
+    tasks = [(config, policy, seed + i, max_steps)
+             for config, policy in combos for i in range(episodes)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_episode, tasks, chunksize=max(1, len(tasks) // (4 * (os.cpu_count() or 1)))))
+    rows = []
+    for k, (config, policy) in enumerate(combos):
+        row = {**asdict(config), 'policy': policy}
+        row.update(summarize(results[k * episodes:(k + 1) * episodes]))
+        rows.append(row)
+    return rows
+
+
+def print_table(rows, swept):
+    columns = swept + ['policy', 'survival_mean', 'survival_p50', 'survival_p90',
+                       'score_mean', 'coins_mean', 'coins_p90']
+    widths = [max(len(c), 12) for c in columns]
+    print('  '.join(c.rjust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        cells = []
+        for c, w in zip(columns, widths):
+            value = row[c]
+            cells.append((f"{value:.1f}" if isinstance(value, float) else str(value)).rjust(w))
+        print('  '.join(cells))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Sweep racer difficulty parameters")
+    parser.add_argument('--set', action='append', default=[], metavar='FIELD=V1,V2',
+                        help="RacerConfig field values to sweep (tuples as a:b)")
+    parser.add_argument('--policy', default='random,dodge', help="comma-separated policies")
+    parser.add_argument('--episodes', type=int, default=20, help="episodes per combination")
+    parser.add_argument('--max-steps', type=int, default=36000, help="step cap per episode")
+    parser.add_argument('--seed', type=int, default=0, help="first episode seed")
+    parser.add_argument('--workers', type=int, default=None, help="process count (default: all cores)")
+    parser.add_argument('--csv', help="also write the results table to this CSV file")
+    args = parser.parse_args(argv)
+
+    policies = args.policy.split(',')
+    for policy in policies:
+        if policy not in POLICIES:
+            parser.error(f"unknown policy {policy!r} (choose from {', '.join(POLICIES)})")
+    # Check every combination here, before any worker starts
+    try:
+        configs = parse_grid(args.set)
+    except ValueError as error:
+        parser.error(str(error))
+    rows = sweep(configs, policies, args.episodes, args.max_steps, args.seed, args.workers)
+
+    print_table(rows, [s.partition('=')[0] for s in args.set])
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,8 +1,11 @@
 import pygame
 import random
-import time
+from collections import deque
 from pygame.locals import *
 
+from frameprof import FrameProfiler
+from textcache import get_atlas, get_font, render_text
+
 # Initialize pygame
 pygame.init()
 
@@ -12,7 +15,9 @@ WINDOW_HEIGHT = 600
 GRID_SIZE = 20
 GRID_WIDTH = WINDOW_WIDTH // GRID_SIZE
 GRID_HEIGHT = WINDOW_HEIGHT // GRID_SIZE
-FPS = 10
+FPS = 60  # Render rate
+TICK_RATE = 10  # Logic ticks (snake moves) per second
+MAX_FRAME_TIME = 0.25  # Longest frame the tick accumulator will catch up on
 
 # Directions
 UP = (0, -1)
@@ -28,95 +33,292 @@ RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 PURPLE = (128, 0, 128)
 
-# Food types with weights and durations (in seconds)
+def cell_rect(position):
+    """Screen rect of a board cell"""
+    return pygame.Rect((position[0] * GRID_SIZE, position[1] * GRID_SIZE), (GRID_SIZE, GRID_SIZE))
+
+def lerp_rect(start, end, alpha):
+    """Cell-sized rect a fraction alpha of the way from cell start to cell end"""
+    return pygame.Rect(
+        (round((start[0] + (end[0] - start[0]) * alpha) * GRID_SIZE),
+         round((start[1] + (end[1] - start[1]) * alpha) * GRID_SIZE)),
+        (GRID_SIZE, GRID_SIZE))
+
+def adjacent(a, b):
+    """True if two cells are neighbours without wrapping around the board"""
+    return abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1
+
+# Food types with weights and durations (in logic ticks)
 FOOD_TYPES = [
     {"color": RED, "weight": 70, "points": 1, "duration": None},  # Normal food (no timer)
-    {"color": YELLOW, "weight": 20, "points": 3, "duration": 8},  # Bonus food
-    {"color": PURPLE, "weight": 10, "points": 5, "duration": 5}   # Special food
+    {"color": YELLOW, "weight": 20, "points": 3, "duration": 8 * TICK_RATE},  # Bonus food
+    {"color": PURPLE, "weight": 10, "points": 5, "duration": 5 * TICK_RATE}   # Special food
 ]
 
+class FreeCells:
+    """Set of free cell indices with O(1) add, remove and uniform random sample
+
+    Free cells are packed at the front of a list; removing one swaps the last
+    entry into its slot, and a reverse map tracks each cell's slot.
+    """
+    def __init__(self, size):
+        self.cells = list(range(size))
+        self.slots = list(range(size))  # Cell index -> slot in self.cells, or -1 if not free
+
+    def __len__(self):
+        return len(self.cells)
+
+    def add(self, cell):
+        if self.slots[cell] == -1:
+            self.slots[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def remove(self, cell):
+        slot = self.slots[cell]
+        if slot == -1:
+            return
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[slot] = last
+            self.slots[last] = slot
+        self.slots[cell] = -1
+
+    def sample(self, rng=random):
+        """A uniformly random free cell, or None if there are none"""
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
+
+class Occupancy:
+    """Number of snake segments on each board cell, stored in a flat bytearray
+
+    Also keeps a FreeCells index of the empty cells in sync.
+    """
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.clear()
+
+    def count(self, position):
+        """Number of segments on a cell"""
+        return self.counts[position[1] * self.width + position[0]]
+
+    def add(self, position):
+        cell = position[1] * self.width + position[0]
+        self.counts[cell] += 1
+        if self.counts[cell] == 1:
+            self.free.remove(cell)
+
+    def remove(self, position):
+        cell = position[1] * self.width + position[0]
+        self.counts[cell] -= 1
+        if self.counts[cell] == 0:
+            self.free.add(cell)
+
+    def clear(self):
+        self.counts = bytearray(self.width * self.height)
+        self.free = FreeCells(self.width * self.height)
+
+    def reserve(self, position):
+        """Take an empty cell out of the free-cell index (e.g. while food is on it)"""
+        self.free.remove(position[1] * self.width + position[0])
+
+    def release(self, position):
+        """Return a reserved cell to the free-cell index if no segment is on it"""
+        cell = position[1] * self.width + position[0]
+        if self.counts[cell] == 0:
+            self.free.add(cell)
+
+    def random_free_cell(self, rng=random):
+        """Uniformly random empty cell as (x, y), or None if the board is full"""
+        cell = self.free.sample(rng)
+        if cell is None:
+            return None
+        return (cell % self.width, cell // self.width)
+
 class Snake:
-    def __init__(self):
-        """Initialize the snake with starting position and length"""
-        self.positions = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        self.length = 1
-        self.direction = RIGHT
+    def __init__(self, occupancy=None):
+        """Initialize the snake with starting position and length
+
+        occupancy sets the board (default: an Occupancy for the window-sized grid).
+        """
+        self.occupancy = occupancy or Occupancy()
+        self.reset()
         self.color = GREEN
-        self.score = 0
 
     def get_head_position(self):
         """Return the position of the snake's head"""
         return self.positions[0]
 
+    def occupies(self, position):
+        """Check whether any segment of the snake is on a cell"""
+        return self.occupancy.count(position) > 0
+
     def update(self):
         """Update the snake's position based on current direction"""
         head = self.get_head_position()
         x, y = self.direction
-        new_x = (head[0] + x) % GRID_WIDTH
-        new_y = (head[1] + y) % GRID_HEIGHT
+        new_x = (head[0] + x) % self.occupancy.width
+        new_y = (head[1] + y) % self.occupancy.height
+        new_head = (new_x, new_y)
         
-        # Check for self collision
-        if (new_x, new_y) in self.positions[:-1]:
+        # Check for self collision against every segment but the current tail
+        if self.occupancy.count(new_head) - (new_head == self.positions[-1]) > 0:
             return True  # Game over
         
-        self.positions.insert(0, (new_x, new_y))
+        self.positions.appendleft(new_head)
+        self.occupancy.add(new_head)
+        self.vacated = None
         if len(self.positions) > self.length:
-            self.positions.pop()
+            self.vacated = self.positions.pop()
+            self.occupancy.remove(self.vacated)
         
         return False  # Game continues
 
     def reset(self):
         """Reset the snake to initial state"""
-        self.positions = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
+        start = (self.occupancy.width // 2, self.occupancy.height // 2)
+        self.positions = deque([start])
+        self.occupancy.clear()
+        self.occupancy.add(start)
+        self.vacated = None  # Cell the tail left on the last update, if any
         self.length = 1
         self.direction = RIGHT
         self.score = 0
 
-    def render(self, surface):
-        """Draw the snake on the game surface"""
+    def moving_rects(self, alpha):
+        """Rects of the tail and head segments a fraction alpha through the last move
+
+        Moves that wrapped around the board edge are not interpolated.
+        """
+        head = self.positions[0]
+        rects = []
+        if self.vacated is not None and adjacent(self.vacated, self.positions[-1]):
+            rects.append(lerp_rect(self.vacated, self.positions[-1], alpha))
+        previous = self.positions[1] if len(self.positions) > 1 else self.vacated
+        if previous is not None and adjacent(previous, head):
+            rects.append(lerp_rect(previous, head, alpha))
+        else:
+            rects.append(cell_rect(head))
+        return rects
+
+    def render(self, surface, alpha=1.0):
+        """Draw the snake on the game surface, alpha of the way through its last move"""
+        head = self.positions[0]
         for position in self.positions:
-            rect = pygame.Rect((position[0] * GRID_SIZE, position[1] * GRID_SIZE), (GRID_SIZE, GRID_SIZE))
-            pygame.draw.rect(surface, self.color, rect)
-            pygame.draw.rect(surface, BLACK, rect, 1)  # Border
+            # The head cell is covered by the moving head unless another segment is on it
+            if self.occupancy.count(position) > (position == head):
+                self.render_segment(surface, cell_rect(position))
+        for rect in self.moving_rects(alpha):
+            self.render_segment(surface, rect)
+
+    def render_segment(self, surface, rect):
+        """Draw one body segment"""
+        pygame.draw.rect(surface, self.color, rect)
+        pygame.draw.rect(surface, BLACK, rect, 1)  # Border
 
 class Food:
-    def __init__(self, snake_positions):
-        """Initialize food with random type and position"""
-        self.type = random.choices(FOOD_TYPES, weights=[f["weight"] for f in FOOD_TYPES])[0]
+    def __init__(self, snake, tick=0, rng=random):
+        """Initialize food with random type and position, spawned at logic tick `tick`"""
+        self.type = rng.choices(FOOD_TYPES, weights=[f["weight"] for f in FOOD_TYPES])[0]
         self.color = self.type["color"]
         self.points = self.type["points"]
-        self.spawn_time = time.time()
+        self.spawn_tick = tick
         self.duration = self.type["duration"]
-        self.randomize_position(snake_positions)
+        self.randomize_position(snake, rng)
 
-    def randomize_position(self, snake_positions):
-        """Generate random position for food that doesn't overlap with snake"""
-        while True:
-            self.position = (random.randint(0, GRID_WIDTH - 1), random.randint(0, GRID_HEIGHT - 1))
-            if self.position not in snake_positions:
-                break
+    def randomize_position(self, snake, rng=random):
+        """Pick a random cell not covered by the snake (None when the board is full)"""
+        self.position = snake.occupancy.random_free_cell(rng)
 
-    def is_expired(self):
-        """Check if timed food has expired"""
+    def is_expired(self, tick):
+        """Check if timed food has expired by logic tick `tick`"""
         if self.duration is None:
             return False
-        return time.time() - self.spawn_time > self.duration
+        return tick - self.spawn_tick > self.duration
+
+    def render(self, surface, tick=0, offset=(0, 0)):
+        """Draw the food on the game surface with timer indicator if applicable
 
-    def render(self, surface):
-        """Draw the food on the game surface with timer indicator if applicable"""
-        rect = pygame.Rect((self.position[0] * GRID_SIZE, self.position[1] * GRID_SIZE), (GRID_SIZE, GRID_SIZE))
+        tick may be fractional (between logic ticks) for a smooth timer bar.
+        offset is the board pixel drawn at the surface's top-left, for scrolling views.
+        """
+        if self.position is None:
+            return
+        rect = cell_rect(self.position).move(-offset[0], -offset[1])
         pygame.draw.rect(surface, self.color, rect)
         
         # Draw timer for timed food
         if self.duration is not None:
-            time_left = max(0, self.duration - (time.time() - self.spawn_time))
+            time_left = max(0, self.duration - (tick - self.spawn_tick))
             timer_width = (time_left / self.duration) * GRID_SIZE
-            timer_rect = pygame.Rect(
-                (self.position[0] * GRID_SIZE, self.position[1] * GRID_SIZE + GRID_SIZE - 3),
-                (timer_width, 3)
-            )
+            timer_rect = pygame.Rect((rect.left, rect.bottom - 3), (timer_width, 3))
             pygame.draw.rect(surface, WHITE, timer_rect)
 
+class SnakeGame:
+    """Snake simulation advanced in fixed logic ticks
+
+    Needs no display or clock, so it can run headless as fast as the CPU
+    allows; food timers are counted in ticks, so runs with the same seed and
+    inputs are reproducible.
+    """
+    def __init__(self, seed=None, occupancy=None):
+        self.rng = random.Random(seed)
+        self.snake = Snake(occupancy)
+        self.reset()
+
+    def reset(self):
+        """Start a new game"""
+        self.snake.reset()
+        self.tick = 0
+        self.game_over = False
+        self.food = Food(self.snake, self.tick, self.rng)
+        self.dirty_cells = set()  # Cells changed since the last take_dirty_cells()
+
+    def turn(self, direction):
+        """Change direction unless it would reverse the snake onto itself"""
+        dx, dy = self.snake.direction
+        if direction != (-dx, -dy):
+            self.snake.direction = direction
+
+    def take_dirty_cells(self):
+        """Cells changed since the last call; the game starts a new set"""
+        cells, self.dirty_cells = self.dirty_cells, set()
+        return cells
+
+    def new_food(self):
+        if self.food.position is not None:
+            self.dirty_cells.add(self.food.position)
+        self.food = Food(self.snake, self.tick, self.rng)
+
+    def step(self):
+        """Advance one logic tick"""
+        if self.game_over:
+            return
+        self.tick += 1
+        snake = self.snake
+        
+        # Update snake position
+        self.game_over = snake.update()
+        if not self.game_over:
+            self.dirty_cells.add(snake.get_head_position())
+            if snake.vacated is not None:
+                self.dirty_cells.add(snake.vacated)
+        
+        # Check if food expired
+        if self.food.is_expired(self.tick):
+            self.new_food()
+        
+        # Check if snake ate food
+        if snake.get_head_position() == self.food.position:
+            snake.length += 1
+            snake.score += self.food.points
+            self.new_food()
+        
+        # No free cell left for food: the snake fills the board
+        if self.food.position is None:
+            self.game_over = True
+
 def draw_grid(surface):
     """Draw grid lines on the game surface"""
     for y in range(0, WINDOW_HEIGHT, GRID_SIZE):
@@ -124,86 +326,193 @@ def draw_grid(surface):
             rect = pygame.Rect((x, y), (GRID_SIZE, GRID_SIZE))
             pygame.draw.rect(surface, BLACK, rect, 1)
 
+class BoardRenderer:
+    """Incremental renderer for the board
+
+    The empty grid is rendered once into a cached background. Each frame only
+    the cells under the moving head and tail, cells the game reported as
+    changed, the food cell(s) and the score region are repainted, and only
+    those rects are passed to display.update().
+    """
+    def __init__(self, screen):
+        self.screen = screen
+        self.background = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.background.fill(BLACK)
+        draw_grid(self.background)
+        self.background = self.background.convert()
+        self.invalidate()
+
+    def invalidate(self):
+        """Force a full repaint on the next draw"""
+        self.full_redraw = True
+        self.food = None
+        self.score = None
+        self.score_rect = pygame.Rect(10, 10, 0, 0)
+        self.last_cells = set()
+
+    def paint_cell(self, position, snake, head):
+        """Restore one cell from the background and redraw the static body segment on it"""
+        rect = cell_rect(position)
+        self.screen.blit(self.background, rect, rect)
+        if snake.occupancy.count(position) > (position == head):
+            snake.render_segment(self.screen, rect)
+        return rect
+
+    def draw(self, game, alpha=1.0):
+        """Draw the changes since the last frame; returns the dirty rects
+
+        alpha is how far (0..1) the snake is through its current move.
+        """
+        snake, food = game.snake, game.food
+        head = snake.get_head_position()
+
+        # Cells under the moving head and tail, and food whose look changes
+        current = {head, snake.positions[-1]}
+        if len(snake.positions) > 1:
+            current.add(snake.positions[1])
+        if snake.vacated is not None:
+            current.add(snake.vacated)
+        if food.position is not None and (food is not self.food or food.duration is not None):
+            current.add(food.position)
+        self.food = food
+        cells = current | self.last_cells | game.take_dirty_cells()
+        self.last_cells = current
+
+        full_redraw = self.full_redraw
+        if full_redraw:
+            self.full_redraw = False
+            self.screen.blit(self.background, (0, 0))
+            cells.update(snake.positions)
+            if food.position is not None:
+                cells.add(food.position)
+
+        # The score sits on top of the board: redraw it when it changes or
+        # when a repainted cell would wipe part of it
+        redraw_score = full_redraw or snake.score != self.score or \
+            self.score_rect.collidelist([cell_rect(position) for position in cells]) != -1
+        if redraw_score:
+            region = self.score_rect.union(score_rect(snake.score))
+            for y in range(region.top // GRID_SIZE, (region.bottom - 1) // GRID_SIZE + 1):
+                for x in range(region.left // GRID_SIZE, (region.right - 1) // GRID_SIZE + 1):
+                    cells.add((x, y))
+
+        dirty = [self.paint_cell(position, snake, head) for position in cells]
+        for rect in snake.moving_rects(alpha):
+            snake.render_segment(self.screen, rect)
+        if food.position in cells:
+            food.render(self.screen, game.tick + alpha)
+        if redraw_score:
+            self.score = snake.score
+            self.score_rect = show_score(self.screen, snake.score)
+        if full_redraw:
+            return [self.screen.get_rect()]
+        return dirty
+
 def show_game_over(surface, score):
     """Display game over screen with final score"""
-    font = pygame.font.SysFont('arial', 36)
-    game_over_text = font.render("GAME OVER", True, RED)
-    score_text = font.render(f"Score: {score}", True, WHITE)
-    restart_text = font.render("Press R to restart", True, WHITE)
+    font = get_font('arial', 36)
+    game_over_text = render_text(font, "GAME OVER", RED)
+    score_text = render_text(font, f"Score: {score}", WHITE)
+    restart_text = render_text(font, "Press R to restart", WHITE)
     
     surface.blit(game_over_text, (WINDOW_WIDTH // 2 - game_over_text.get_width() // 2, WINDOW_HEIGHT // 2 - 60))
     surface.blit(score_text, (WINDOW_WIDTH // 2 - score_text.get_width() // 2, WINDOW_HEIGHT // 2))
     surface.blit(restart_text, (WINDOW_WIDTH // 2 - restart_text.get_width() // 2, WINDOW_HEIGHT // 2 + 60))
 
+def score_rect(score):
+    """Screen rect show_score() would cover for a score"""
+    font = get_font('arial', 20)
+    label_width, label_height = render_text(font, "Score: ", WHITE).get_size()
+    digits_width, digits_height = get_atlas(font, WHITE).size(str(score))
+    return pygame.Rect(10, 10, label_width + digits_width, max(label_height, digits_height))
+
 def show_score(surface, score):
     """Display current score during gameplay"""
-    font = pygame.font.SysFont('arial', 20)
-    score_text = font.render(f"Score: {score}", True, WHITE)
-    surface.blit(score_text, (10, 10))
+    font = get_font('arial', 20)
+    label_rect = surface.blit(render_text(font, "Score: ", WHITE), (10, 10))
+    # The number changes often, so it is drawn from pre-rendered digit glyphs
+    return label_rect.union(get_atlas(font, WHITE).blit(surface, str(score), label_rect.topright))
 
-def main():
-    """Main game function"""
+def main(game=None, renderer_class=None):
+    """Main game function
+
+    Logic runs at a fixed TICK_RATE driven by a time accumulator, while
+    rendering runs at FPS and interpolates the snake between ticks. Other
+    modes pass their own game and renderer class (default: a window-sized
+    SnakeGame drawn by BoardRenderer).
+    """
     clock = pygame.time.Clock()
+    profiler = FrameProfiler.from_env()
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption("Enhanced Snake Game")
+    renderer = (renderer_class or BoardRenderer)(screen)
     
-    snake = Snake()
-    food = Food(snake.positions)
-    
-    game_over = False
+    game = game or SnakeGame()
+    game_over_shown = False
+    tick_seconds = 1.0 / TICK_RATE
+    accumulator = 0.0
+    elapsed = 0.0
 
     while True:
+        profiler.begin_frame()
         for event in pygame.event.get():
+            if profiler.handle_event(event):
+                if not profiler.overlay_visible:
+                    renderer.invalidate()
+                    game_over_shown = False
+                continue
             if event.type == QUIT:
+                profiler.close()
                 pygame.quit()
                 return
             
             elif event.type == KEYDOWN:
-                if game_over:
+                if game.game_over:
                     if event.key == K_r:
                         # Reset game
-                        snake.reset()
-                        food = Food(snake.positions)
-                        game_over = False
+                        game.reset()
+                        renderer.invalidate()
+                        accumulator = 0.0
                 else:
                     # Handle direction changes
-                    if event.key == K_UP and snake.direction != DOWN:
-                        snake.direction = UP
-                    elif event.key == K_DOWN and snake.direction != UP:
-                        snake.direction = DOWN
-                    elif event.key == K_LEFT and snake.direction != RIGHT:
-                        snake.direction = LEFT
-                    elif event.key == K_RIGHT and snake.direction != LEFT:
-                        snake.direction = RIGHT
+                    if event.key == K_UP:
+                        game.turn(UP)
+                    elif event.key == K_DOWN:
+                        game.turn(DOWN)
+                    elif event.key == K_LEFT:
+                        game.turn(LEFT)
+                    elif event.key == K_RIGHT:
+                        game.turn(RIGHT)
+        profiler.mark('events')
         
-        if not game_over:
-            # Update snake position
-            game_over = snake.update()
-            
-            # Check if food expired
-            if food.is_expired():
-                food = Food(snake.positions)
-            
-            # Check if snake ate food
-            if snake.get_head_position() == food.position:
-                snake.length += 1
-                snake.score += food.points
-                food = Food(snake.positions)
-            
-            # Clear screen
-            screen.fill(BLACK)
-            draw_grid(screen)
-            
-            # Draw game elements
-            snake.render(screen)
-            food.render(screen)
-            show_score(screen, snake.score)
+        if not game.game_over:
+            # Run as many fixed logic ticks as the elapsed time calls for
+            accumulator += elapsed
+            while accumulator >= tick_seconds and not game.game_over:
+                game.step()
+                accumulator -= tick_seconds
+        profiler.mark('update')
+        
+        if not game.game_over:
+            # Repaint only the cells that changed, interpolating between ticks
+            dirty = renderer.draw(game, accumulator / tick_seconds)
+            game_over_shown = False
+        elif not game_over_shown:
+            # Show game over screen (drawn once, it doesn't change)
+            renderer.draw(game)
+            show_game_over(screen, game.snake.score)
+            game_over_shown = True
+            dirty = [screen.get_rect()]
         else:
-            # Show game over screen
-            show_game_over(screen, snake.score)
+            dirty = []
         
-        pygame.display.update()
-        clock.tick(FPS)
+        overlay = profiler.draw_overlay(screen)
+        if overlay:
+            dirty.append(overlay)
+        pygame.display.update(dirty)
+        profiler.mark('draw')
+        elapsed = min(clock.tick(FPS) / 1000.0, MAX_FRAME_TIME)
+        profiler.end_frame()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
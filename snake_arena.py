@@ -0,0 +1,301 @@
+"""Multi-snake arena: hundreds of bot snakes and local players on one board.
+
+All snakes share one Occupancy grid. Each tick every live snake moves at
+once: tails that move away are released first, and then each new head is
+checked against the grid. A snake dies if its new head lands on a segment,
+or if another snake's head enters the same cell that tick, in which case
+they all die. The outcome does not depend on the order of the snakes.
+Dead snakes leave the board and respawn after RESPAWN_TICKS. Foods are
+kept on free cells drawn from the grid's FreeCells index, so spawning,
+food respawn and collision checks are O(1) per snake or food.
+
+Usage: python snake_arena.py [BOTS]
+"""
+import random
+import sys
+from collections import deque
+
+import pygame
+from pygame.locals import *
+
+from frameprof import FrameProfiler
+from snake2 import (
+    FPS, TICK_RATE, MAX_FRAME_TIME, WINDOW_WIDTH, WINDOW_HEIGHT, UP, DOWN, LEFT, RIGHT,
+    BLACK, GREEN, WHITE, Food, Occupancy,
+)
+from textcache import get_font, render_text
+
+# Arena constants
+ARENA_CELL = 4  # Cell size in pixels
+ARENA_WIDTH = WINDOW_WIDTH // ARENA_CELL
+ARENA_HEIGHT = WINDOW_HEIGHT // ARENA_CELL
+BOT_COUNT = 200
+FOOD_COUNT = 300
+START_LENGTH = 3
+RESPAWN_TICKS = 3 * TICK_RATE
+
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+PLAYER_KEYS = [
+    {K_UP: UP, K_DOWN: DOWN, K_LEFT: LEFT, K_RIGHT: RIGHT},
+    {K_w: UP, K_s: DOWN, K_a: LEFT, K_d: RIGHT},
+]
+
+
+class ArenaSnake:
+    """One snake in the arena; bots steer themselves, players are steered by key events"""
+    def __init__(self, color, bot=True):
+        self.color = color
+        self.bot = bot
+        self.positions = deque()
+        self.length = START_LENGTH
+        self.direction = RIGHT
+        self.score = 0
+        self.alive = False
+        self.respawn_tick = 0
+        self.target = None  # Food cell a bot is heading for
+
+    def get_head_position(self):
+        return self.positions[0]
+
+
+class Arena:
+    """Shared board with many snakes and foods, advanced in logic ticks
+
+    changes lists the (cell, colour) repaints of the current tick; a colour
+    of None means the cell is empty again. step() starts a new list and
+    returns it, so nothing builds up when nobody draws.
+    """
+    def __init__(self, bots=BOT_COUNT, players=1, foods=FOOD_COUNT,
+                 width=ARENA_WIDTH, height=ARENA_HEIGHT, seed=None):
+        self.rng = random.Random(seed)
+        self.width = width
+        self.height = height
+        self.occupancy = Occupancy(width, height)
+        self.food_count = foods
+        self.foods = {}  # Cell -> Food
+        self.food_cells = None  # tuple(self.foods) for bots picking targets, rebuilt on demand
+        self.tick = 0
+        self.changes = []
+        self.players = [ArenaSnake(color, bot=False) for color in [GREEN, WHITE][:players]]
+        self.snakes = list(self.players)
+        for i in range(bots):
+            color = pygame.Color(0)
+            color.hsva = (i * 137.5 % 360, 70, 90, 100)
+            self.snakes.append(ArenaSnake(color))
+        for snake in self.snakes:
+            self.spawn(snake)
+        self.fill_food()
+
+    def spawn(self, snake):
+        """Put a snake back on a random free cell; returns False if the board is full"""
+        position = self.occupancy.random_free_cell(self.rng)
+        if position is None:
+            return False
+        snake.positions = deque([position])
+        snake.length = START_LENGTH
+        snake.direction = self.rng.choice(DIRECTIONS)
+        snake.score = 0
+        snake.alive = True
+        snake.target = None
+        self.occupancy.add(position)
+        self.changes.append((position, snake.color))
+        return True
+
+    def fill_food(self):
+        """Top the board up to food_count foods"""
+        while len(self.foods) < self.food_count:
+            # Food only needs the .occupancy of the object it is placed for
+            food = Food(self, self.tick, self.rng)
+            if food.position is None:
+                break
+            self.occupancy.reserve(food.position)
+            self.foods[food.position] = food
+            self.changes.append((food.position, food.color))
+
+    def turn(self, snake, direction):
+        """Change direction unless it would reverse the snake onto itself"""
+        dx, dy = snake.direction
+        if direction != (-dx, -dy):
+            snake.direction = direction
+
+    def next_cell(self, position, direction):
+        return ((position[0] + direction[0]) % self.width, (position[1] + direction[1]) % self.height)
+
+    def steer(self, snake):
+        """Bot policy: head for a target food, avoiding cells that are occupied now"""
+        if snake.target not in self.foods:
+            if self.food_cells is None:
+                self.food_cells = tuple(self.foods)
+            snake.target = self.rng.choice(self.food_cells) if self.food_cells else None
+        head = snake.get_head_position()
+        dx, dy = snake.direction
+        best, best_distance = None, None
+        for direction in (snake.direction, (dy, -dx), (-dy, dx)):  # Straight, left, right
+            cell = self.next_cell(head, direction)
+            if self.occupancy.count(cell):
+                continue
+            distance = 0
+            if snake.target is not None:
+                # Distance on the wrapping board
+                x = abs(cell[0] - snake.target[0])
+                y = abs(cell[1] - snake.target[1])
+                distance = min(x, self.width - x) + min(y, self.height - y)
+            if best is None or distance < best_distance:
+                best, best_distance = direction, distance
+        if best is not None:
+            snake.direction = best
+
+    def step(self):
+        """Advance one logic tick; returns its repaints"""
+        self.tick += 1
+        self.changes = []
+        occupancy = self.occupancy
+        live = [snake for snake in self.snakes if snake.alive]
+        self.food_cells = None
+        for snake in live:
+            if snake.bot:
+                self.steer(snake)
+
+        # Move every tail first, so heads may follow into the cells they free
+        heads = []
+        entering = {}
+        for snake in live:
+            head = self.next_cell(snake.get_head_position(), snake.direction)
+            heads.append(head)
+            entering[head] = entering.get(head, 0) + 1
+            if len(snake.positions) >= snake.length:
+                tail = snake.positions.pop()
+                occupancy.remove(tail)
+                self.changes.append((tail, None))
+
+        # Decide every collision before any head moves, so order doesn't matter
+        dead = [entering[head] > 1 or occupancy.count(head) > 0 for head in heads]
+
+        for snake, head, died in zip(live, heads, dead):
+            if died:
+                self.kill(snake)
+                continue
+            snake.positions.appendleft(head)
+            occupancy.add(head)
+            self.changes.append((head, snake.color))
+            food = self.foods.pop(head, None)
+            if food is not None:
+                snake.length += 1
+                snake.score += food.points
+
+        # Expire timed food
+        for position, food in list(self.foods.items()):
+            if food.is_expired(self.tick):
+                del self.foods[position]
+                occupancy.release(position)
+                self.changes.append((position, None))
+
+        for snake in self.snakes:
+            if not snake.alive and snake.respawn_tick <= self.tick:
+                self.spawn(snake)
+        self.fill_food()
+        return self.changes
+
+    def kill(self, snake):
+        """Take a snake off the board until it respawns"""
+        for position in snake.positions:
+            self.occupancy.remove(position)
+            self.changes.append((position, None))
+        snake.positions.clear()
+        snake.alive = False
+        snake.respawn_tick = self.tick + RESPAWN_TICKS
+
+
+class ArenaRenderer:
+    """Keeps a board surface up to date from the repaints Arena.step() returns"""
+    def __init__(self, screen, arena):
+        self.screen = screen
+        self.arena = arena
+        self.board = pygame.Surface((arena.width * ARENA_CELL, arena.height * ARENA_CELL)).convert()
+        self.hud_rect = pygame.Rect(10, 10, 0, 0)
+        self.invalidate()
+
+    def invalidate(self):
+        """Rebuild the board surface from scratch on the next draw"""
+        self.full_redraw = True
+
+    def paint(self, position, color):
+        rect = pygame.Rect(position[0] * ARENA_CELL, position[1] * ARENA_CELL, ARENA_CELL, ARENA_CELL)
+        self.board.fill(color or BLACK, rect)
+        return rect
+
+    def draw(self, changes):
+        """Apply the repaints of the ticks since the last draw; returns the dirty rects"""
+        arena = self.arena
+        if self.full_redraw:
+            self.full_redraw = False
+            self.board.fill(BLACK)
+            for snake in arena.snakes:
+                for position in snake.positions:
+                    self.paint(position, snake.color)
+            for position, food in arena.foods.items():
+                self.paint(position, food.color)
+            dirty = [self.board.get_rect()]
+        else:
+            dirty = [self.paint(position, color) for position, color in changes]
+
+        # The HUD is drawn over the board, so restore what it covered first
+        dirty.append(self.hud_rect)
+        for rect in dirty:
+            self.screen.blit(self.board, rect, rect)
+        players = " ".join(f"P{i + 1}: {snake.score}" for i, snake in enumerate(arena.players))
+        alive = sum(snake.alive for snake in arena.snakes)
+        text = render_text(get_font('arial', 20), f"{players}  Alive: {alive}/{len(arena.snakes)}", WHITE)
+        self.hud_rect = self.screen.blit(text, (10, 10))
+        dirty.append(self.hud_rect)
+        return dirty
+
+
+def main(argv):
+    bots = int(argv[0]) if argv else BOT_COUNT
+    clock = pygame.time.Clock()
+    profiler = FrameProfiler.from_env()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("Snake Arena")
+    arena = Arena(bots=bots)
+    renderer = ArenaRenderer(screen, arena)
+    tick_seconds = 1.0 / TICK_RATE
+    accumulator = 0.0
+    elapsed = 0.0
+
+    while True:
+        profiler.begin_frame()
+        for event in pygame.event.get():
+            if profiler.handle_event(event):
+                if not profiler.overlay_visible:
+                    renderer.invalidate()
+                continue
+            if event.type == QUIT:
+                profiler.close()
+                pygame.quit()
+                return
+            elif event.type == KEYDOWN:
+                for snake, keys in zip(arena.players, PLAYER_KEYS):
+                    if event.key in keys and snake.alive:
+                        arena.turn(snake, keys[event.key])
+        profiler.mark('events')
+
+        accumulator += elapsed
+        changes = []
+        while accumulator >= tick_seconds:
+            changes += arena.step()
+            accumulator -= tick_seconds
+        profiler.mark('update')
+
+        dirty = renderer.draw(changes)
+        overlay = profiler.draw_overlay(screen)
+        if overlay:
+            dirty.append(overlay)
+        pygame.display.update(dirty)
+        profiler.mark('draw')
+        elapsed = min(clock.tick(FPS) / 1000.0, MAX_FRAME_TIME)
+        profiler.end_frame()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
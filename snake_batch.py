@@ -0,0 +1,266 @@
+"""Vectorized batch engine that steps many snake games at once.
+
+Every game is a row in a set of NumPy arrays: a ring buffer of body cells,
+a per-cell occupancy count, and the food cell, type and spawn tick. The
+rules mirror ``snake2.SnakeGame.step()`` (wraparound, self-collision,
+growth, food expiry in logic ticks); run this module to check it against
+the object-based implementation.
+"""
+import random
+
+import numpy as np
+
+import snake2
+from snake2 import GRID_WIDTH, GRID_HEIGHT, FOOD_TYPES, UP, DOWN, LEFT, RIGHT
+
+# Actions are indices into DIRECTIONS; -1 keeps the current direction
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+DIRECTION_X = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+DIRECTION_Y = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+OPPOSITE = np.array([DIRECTIONS.index((-d[0], -d[1])) for d in DIRECTIONS], dtype=np.int8)
+NO_ACTION = -1
+
+# Food types in snake2 order; a duration of 0 means untimed
+FOOD_POINTS = np.array([f["points"] for f in FOOD_TYPES], dtype=np.int32)
+FOOD_DURATIONS = np.array([f["duration"] or 0 for f in FOOD_TYPES], dtype=np.int64)
+FOOD_WEIGHTS = np.array([f["weight"] for f in FOOD_TYPES], dtype=np.float64)
+
+# Observation channels
+OBS_BODY, OBS_HEAD, OBS_FOOD = range(3)
+
+
+class BatchSnake:
+    """N snake games stored as NumPy arrays and stepped in one call
+
+    With auto_reset, games that end are restarted at the end of the step
+    that ended them (step() still reports them as done).
+    """
+    def __init__(self, n, seed=None, width=GRID_WIDTH, height=GRID_HEIGHT, auto_reset=False):
+        self.n = n
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+        self.food_probabilities = FOOD_WEIGHTS / FOOD_WEIGHTS.sum()
+        self.rows = np.arange(n)
+
+        # Body ring buffers: segment k of game i is body[i, (head[i] + k) % cells]
+        self.body = np.zeros((n, self.cells), dtype=np.int32)
+        self.head = np.zeros(n, dtype=np.int64)
+        self.size = np.zeros(n, dtype=np.int64)  # Segments currently on the board
+        self.length = np.zeros(n, dtype=np.int64)  # Length the snake grows to
+        self.occupancy = np.zeros((n, self.cells), dtype=np.uint8)
+
+        # Per-game state
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.food_cell = np.zeros(n, dtype=np.int64)  # -1 when the board is full
+        self.food_type = np.zeros(n, dtype=np.int8)
+        self.food_spawn_tick = np.zeros(n, dtype=np.int64)
+
+        # Food spawned by the most recent step/reset as (games, types, cells) (used by the equivalence check)
+        self.last_draws = []
+        self.reset()
+
+    def reset(self, mask=None):
+        """Reset the games selected by a boolean mask (all games by default)"""
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        mask = np.array(mask, dtype=bool)  # May alias self.game_over, which is cleared below
+        env = np.flatnonzero(mask)
+        start = (self.height // 2) * self.width + self.width // 2
+        self.occupancy[env] = 0
+        self.occupancy[env, start] = 1
+        self.body[env, 0] = start
+        self.head[env] = 0
+        self.size[env] = 1
+        self.length[env] = 1
+        self.direction[env] = DIRECTIONS.index(RIGHT)
+        self.score[env] = 0
+        self.tick[env] = 0
+        self.game_over[env] = False
+        self._spawn_food(env)
+
+    def _spawn_food(self, env):
+        """Pick a food type and a uniformly random free cell for each selected game"""
+        if not env.size:
+            return
+        kind = self.rng.choice(len(FOOD_TYPES), size=env.size, p=self.food_probabilities)
+        # The k-th free cell is the first whose running count of free cells exceeds k
+        free = np.cumsum(self.occupancy[env] == 0, axis=1)
+        available = free[:, -1]
+        k = self.rng.integers(0, np.maximum(available, 1))
+        cell = np.argmax(free > k[:, None], axis=1)
+        cell[available == 0] = -1
+        self.food_type[env] = kind
+        self.food_cell[env] = cell
+        self.food_spawn_tick[env] = self.tick[env]
+        self.last_draws.append((env, kind, cell))
+
+    def step(self, actions):
+        """Advance every running game by one logic tick
+
+        actions is an int array of direction indices (or NO_ACTION), one per
+        game; reversing onto the body is ignored, like SnakeGame.turn().
+        Returns (points gained this tick, mask of games that ended this tick).
+        """
+        actions = np.asarray(actions)
+        rows = self.rows
+        active = ~self.game_over
+        self.last_draws = []
+        self.tick[active] += 1
+
+        turn = active & (actions >= 0) & (actions != OPPOSITE[self.direction])
+        self.direction[turn] = actions[turn]
+
+        # Next head cell with wraparound
+        head = self.body[rows, self.head]
+        x = (head % self.width + DIRECTION_X[self.direction]) % self.width
+        y = (head // self.width + DIRECTION_Y[self.direction]) % self.height
+        new_head = y * self.width + x
+
+        # Collide with every segment but the current tail (it moves away this tick)
+        tail_slot = (self.head + self.size - 1) % self.cells
+        tail = self.body[rows, tail_slot]
+        blocked = self.occupancy[rows, new_head].astype(np.int64) - (new_head == tail) > 0
+        crashed = active & blocked
+
+        # Move: push the new head, then pop the tail unless the snake is growing
+        env = np.flatnonzero(active & ~blocked)
+        self.head[env] = (self.head[env] - 1) % self.cells
+        self.body[env, self.head[env]] = new_head[env]
+        self.occupancy[env, new_head[env]] += 1
+        self.size[env] += 1
+        env = env[self.size[env] > self.length[env]]
+        self.occupancy[env, tail[env]] -= 1
+        self.size[env] -= 1
+
+        # Expire timed food
+        duration = FOOD_DURATIONS[self.food_type]
+        expired = active & (duration > 0) & (self.tick - self.food_spawn_tick > duration)
+        self._spawn_food(np.flatnonzero(expired))
+
+        # Eat
+        eaten = active & (self.body[rows, self.head] == self.food_cell)
+        gained = np.where(eaten, FOOD_POINTS[self.food_type], 0)
+        self.length += eaten
+        self.score += gained
+        self._spawn_food(np.flatnonzero(eaten))
+
+        # No free cell left for food: the snake fills the board
+        done = active & (crashed | (self.food_cell < 0))
+        self.game_over |= done
+        if self.auto_reset:
+            self.reset(done)
+        return gained, done
+
+    def positions(self, i):
+        """Body cells of game i as (x, y) tuples, head first"""
+        slots = (self.head[i] + np.arange(self.size[i])) % self.cells
+        return [(int(c) % self.width, int(c) // self.width) for c in self.body[i, slots]]
+
+    def observe(self):
+        """Observation tensor of shape (n, 3, height, width), uint8
+
+        Channels are OBS_BODY (every segment), OBS_HEAD and OBS_FOOD.
+        """
+        obs = np.zeros((self.n, 3, self.cells), dtype=np.uint8)
+        obs[:, OBS_BODY] = self.occupancy > 0
+        obs[self.rows, OBS_HEAD, self.body[self.rows, self.head]] = 1
+        env = np.flatnonzero(self.food_cell >= 0)
+        obs[env, OBS_FOOD, self.food_cell[env]] = 1
+        return obs.reshape(self.n, 3, self.height, self.width)
+
+
+class _ScriptedRandom:
+    """Stands in for random.Random in snake2, returning queued values in call order
+
+    Queued cells are translated to the slot FreeCells keeps them in.
+    """
+    def __init__(self, snake):
+        self.snake = snake
+        self.queue = []
+
+    def choices(self, population, weights=None):
+        return [population[int(self.queue.pop(0))]]
+
+    def randrange(self, n):
+        cell = int(self.queue.pop(0))
+        slot = self.snake.occupancy.free.slots[cell]
+        assert 0 <= slot < n, (cell, slot, n)
+        return slot
+
+
+def _object_state(game):
+    """Comparable summary of a snake2.SnakeGame"""
+    snake = game.snake
+    return (list(snake.positions), snake.length, snake.score, snake.direction, game.tick,
+            game.game_over, game.food.position, FOOD_TYPES.index(game.food.type),
+            game.food.spawn_tick)
+
+
+def _batch_state(batch, i):
+    """Comparable summary of game i of a BatchSnake"""
+    cell = int(batch.food_cell[i])
+    food = (cell % batch.width, cell // batch.width) if cell >= 0 else None
+    return (batch.positions(i), int(batch.length[i]), int(batch.score[i]),
+            DIRECTIONS[batch.direction[i]], int(batch.tick[i]), bool(batch.game_over[i]),
+            food, int(batch.food_type[i]), int(batch.food_spawn_tick[i]))
+
+
+def _queue_draws(games, draws):
+    """Feed the food the batch engine spawned to the matching object games"""
+    for env, kind, cell in draws:
+        for i, k, c in zip(env.tolist(), kind.tolist(), cell.tolist()):
+            games[i].rng.queue += [k] if c < 0 else [k, c]
+
+
+def check_equivalence(n=16, steps=5000, seed=0):
+    """Step a BatchSnake and n snake2.SnakeGame objects side by side
+
+    Each object game replays the food the batch engine drew, and both are
+    driven with the same random actions (biased towards the food so snakes
+    grow). Raises AssertionError on the first mismatch. Finished games are
+    restarted on both sides.
+    """
+    batch = BatchSnake(n, seed=seed, auto_reset=True)
+    policy = random.Random(seed)
+    games = []
+    for _ in range(n):
+        game = snake2.SnakeGame()
+        game.rng = _ScriptedRandom(game.snake)
+        games.append(game)
+    _queue_draws(games, batch.last_draws)
+    for game in games:
+        game.reset()
+
+    for step in range(steps):
+        actions = []
+        for game in games:
+            head, food = game.snake.get_head_position(), game.food.position
+            if food is not None and policy.random() < 0.7:
+                direction = (RIGHT if food[0] > head[0] else LEFT if food[0] < head[0]
+                             else DOWN if food[1] > head[1] else UP)
+                actions.append(DIRECTIONS.index(direction))
+            else:
+                actions.append(policy.randrange(-1, 4))
+        _, done = batch.step(np.array(actions))
+        _queue_draws(games, batch.last_draws)
+        for i, game in enumerate(games):
+            if actions[i] != NO_ACTION:
+                game.turn(DIRECTIONS[actions[i]])
+            game.step()
+            assert game.game_over == done[i], (step, i)
+            if game.game_over:
+                game.reset()
+            assert not game.rng.queue, (step, i, "unused random values")
+            assert _object_state(game) == _batch_state(batch, i), (step, i)
+    return steps
+
+
+if __name__ == "__main__":
+    check_equivalence()
+    print("Equivalence check passed")
@@ -0,0 +1,221 @@
+"""Huge-board snake mode with a scrolling camera.
+
+The board is split into square chunks of CHUNK_CELLS cells. ChunkedOccupancy
+only allocates counts for chunks the snake is on, so memory follows the
+snake, not the board. ChunkRenderer keeps a cached surface for each chunk
+near the camera and repaints single cells in it when they change. Each
+frame it blits the few chunks the viewport overlaps, so drawing cost
+depends on the window size and not on the board size.
+
+Usage: python snake_huge.py [SIZE]   (board is SIZE x SIZE cells, default 1024)
+"""
+import random
+import sys
+from collections import OrderedDict
+
+import pygame
+
+import snake2
+from snake2 import GRID_SIZE, BLACK, SnakeGame, draw_grid, show_score
+
+CHUNK_CELLS = 32  # Chunk edge in cells
+MAX_CACHED_CHUNKS = 16  # Chunk surfaces kept around the camera
+MAX_REJECTIONS = 64  # Random probes before random_free_cell falls back to a scan
+DEFAULT_SIZE = 1024
+
+
+class ChunkedOccupancy:
+    """Occupancy with the same interface, storing counts per chunk of cells
+
+    Chunks are allocated when a segment first enters them and dropped when
+    their last segment leaves. Reserved cells (e.g. under food) are kept in
+    a set. Free cells are sampled by rejection, which is fast while the
+    board is mostly empty.
+    """
+    def __init__(self, width, height, chunk=CHUNK_CELLS):
+        self.width = width
+        self.height = height
+        self.chunk = chunk
+        self.clear()
+
+    def locate(self, position):
+        """(chunk key, index inside the chunk) of a cell"""
+        x, y = position
+        chunk = self.chunk
+        return (x // chunk, y // chunk), (y % chunk) * chunk + x % chunk
+
+    def count(self, position):
+        """Number of segments on a cell"""
+        key, index = self.locate(position)
+        counts = self.chunks.get(key)
+        return counts[index] if counts is not None else 0
+
+    def add(self, position):
+        key, index = self.locate(position)
+        counts = self.chunks.get(key)
+        if counts is None:
+            counts = self.chunks[key] = bytearray(self.chunk * self.chunk)
+            self.used[key] = 0
+        counts[index] += 1
+        if counts[index] == 1:
+            self.used[key] += 1
+            self.occupied += 1
+            self.reserved.discard(position)  # As in Occupancy, a segment ends the reservation
+
+    def remove(self, position):
+        key, index = self.locate(position)
+        counts = self.chunks[key]
+        counts[index] -= 1
+        if counts[index] == 0:
+            self.occupied -= 1
+            self.used[key] -= 1
+            if self.used[key] == 0:
+                del self.chunks[key], self.used[key]
+
+    def clear(self):
+        self.chunks = {}  # Chunk key -> bytearray of per-cell counts
+        self.used = {}  # Chunk key -> number of occupied cells in it
+        self.occupied = 0
+        self.reserved = set()  # Empty cells random_free_cell() must not return
+
+    def reserve(self, position):
+        """Keep an empty cell from being sampled as free (e.g. while food is on it)"""
+        if not self.count(position):
+            self.reserved.add(position)
+
+    def release(self, position):
+        """Make a reserved cell sampleable again"""
+        self.reserved.discard(position)
+
+    def is_free(self, position):
+        """Whether a cell has no segment on it and is not reserved"""
+        return not self.count(position) and position not in self.reserved
+
+    def random_free_cell(self, rng=random):
+        """Uniformly random empty cell as (x, y), or None if the board is full"""
+        if self.occupied + len(self.reserved) >= self.width * self.height:
+            return None
+        for _ in range(MAX_REJECTIONS):
+            position = (rng.randrange(self.width), rng.randrange(self.height))
+            if self.is_free(position):
+                return position
+        # Nearly full board: pick among the free cells directly
+        free = [(x, y) for y in range(self.height) for x in range(self.width)
+                if self.is_free((x, y))]
+        return free[rng.randrange(len(free))]
+
+
+class ChunkRenderer:
+    """Scrolling renderer that follows the snake's head
+
+    Chunk surfaces hold the grid and the static body segments. They are
+    built when a chunk comes into view, kept in a small LRU, and patched
+    cell by cell from game.take_dirty_cells() afterwards. The moving head
+    and tail, the food and the score are drawn on top every frame.
+    """
+    def __init__(self, screen, chunk=CHUNK_CELLS, max_cached=MAX_CACHED_CHUNKS):
+        self.screen = screen
+        self.chunk = chunk
+        self.chunk_pixels = chunk * GRID_SIZE
+        self.max_cached = max_cached
+        self.grid = pygame.Surface((self.chunk_pixels, self.chunk_pixels))
+        self.grid.fill(BLACK)
+        draw_grid(self.grid)
+        self.grid = self.grid.convert()
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop every cached chunk surface"""
+        self.surfaces = OrderedDict()
+        self.head = None
+
+    def local_rect(self, position):
+        """Rect of a cell inside its chunk surface"""
+        return pygame.Rect(((position[0] % self.chunk) * GRID_SIZE, (position[1] % self.chunk) * GRID_SIZE),
+                           (GRID_SIZE, GRID_SIZE))
+
+    def chunk_surface(self, key, snake):
+        """Cached surface for a chunk, built on first use"""
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.grid.copy()
+        counts = snake.occupancy.chunks.get(key)
+        if counts is not None:
+            head = snake.get_head_position()
+            for index, count in enumerate(counts):
+                if count:
+                    position = (key[0] * self.chunk + index % self.chunk, key[1] * self.chunk + index // self.chunk)
+                    if count > (position == head):
+                        snake.render_segment(surface, self.local_rect(position))
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_cached:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def paint_cell(self, position, snake, head):
+        """Bring one cell of a cached chunk surface up to date"""
+        surface = self.surfaces.get((position[0] // self.chunk, position[1] // self.chunk))
+        if surface is None:
+            return  # Built from scratch when it comes into view
+        rect = self.local_rect(position)
+        surface.blit(self.grid, rect, rect)
+        if snake.occupancy.count(position) > (position == head):
+            snake.render_segment(surface, rect)
+
+    def camera(self, snake, alpha):
+        """Board pixel rect shown in the window, centred on the moving head"""
+        occupancy = snake.occupancy
+        board = pygame.Rect(0, 0, occupancy.width * GRID_SIZE, occupancy.height * GRID_SIZE)
+        camera = self.screen.get_rect()
+        camera.center = snake.moving_rects(alpha)[-1].center
+        return camera.clamp(board)
+
+    def draw(self, game, alpha=1.0):
+        """Draw the visible part of the board; returns the dirty rects"""
+        snake, food = game.snake, game.food
+        head = snake.get_head_position()
+
+        # The old head cell becomes a static segment once the head moves on
+        cells = game.take_dirty_cells()
+        if self.head is not None and self.head != head:
+            cells.add(self.head)
+        self.head = head
+        for position in cells:
+            self.paint_cell(position, snake, head)
+
+        camera = self.camera(snake, alpha)
+        occupancy = snake.occupancy
+        self.screen.fill(BLACK)
+        last_x = (occupancy.width - 1) // self.chunk
+        last_y = (occupancy.height - 1) // self.chunk
+        for ky in range(camera.top // self.chunk_pixels, min(last_y, (camera.bottom - 1) // self.chunk_pixels) + 1):
+            for kx in range(camera.left // self.chunk_pixels, min(last_x, (camera.right - 1) // self.chunk_pixels) + 1):
+                # Chunks on the far edges may hang over the end of the board
+                area = pygame.Rect(0, 0, min(self.chunk_pixels, occupancy.width * GRID_SIZE - kx * self.chunk_pixels),
+                                   min(self.chunk_pixels, occupancy.height * GRID_SIZE - ky * self.chunk_pixels))
+                self.screen.blit(self.chunk_surface((kx, ky), snake),
+                                 (kx * self.chunk_pixels - camera.x, ky * self.chunk_pixels - camera.y), area)
+
+        for rect in snake.moving_rects(alpha):
+            snake.render_segment(self.screen, rect.move(-camera.x, -camera.y))
+        if food.position is not None:
+            food_rect = snake2.cell_rect(food.position)
+            if camera.colliderect(food_rect):
+                food.render(self.screen, game.tick + alpha, camera.topleft)
+            else:
+                # Off screen: mark the edge of the view in the food's direction
+                marker = food_rect.move(-camera.x, -camera.y).clamp(self.screen.get_rect())
+                pygame.draw.rect(self.screen, food.color, marker.inflate(-8, -8))
+        show_score(self.screen, snake.score)
+        return [self.screen.get_rect()]
+
+
+def main(argv):
+    size = int(argv[0]) if argv else DEFAULT_SIZE
+    snake2.main(SnakeGame(occupancy=ChunkedOccupancy(size, size)), ChunkRenderer)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,106 @@
+"""Shared font and text-render cache for racer2, snake2 and paint2.
+
+get_font() caches font objects by (name, size), so SysFont's system lookup
+and file load happen once per font. render_text() keeps rendered surfaces in
+a bounded LRU keyed by (font, text, colour, antialias). For strings that
+change every frame (scores, timings) GlyphAtlas renders each character once
+and blits glyphs side by side.
+"""
+from collections import OrderedDict
+
+import pygame
+
+TEXT_CACHE_SIZE = 512
+
+_fonts = {}
+
+
+def get_font(name, size):
+    """Cached pygame.font.SysFont(name, size)"""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(name, size)
+    return font
+
+
+class TextCache:
+    """Bounded LRU of rendered text surfaces"""
+    def __init__(self, maxsize=TEXT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+
+    def render(self, font, text, color, antialias=True):
+        """Same as font.render(text, antialias, color), but cached"""
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.maxsize:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+class GlyphAtlas:
+    """Per-character glyph surfaces for one font and colour
+
+    Glyphs are rendered the first time a character is used. Text is drawn by
+    blitting glyphs next to each other, so changing numbers never trigger a
+    font render.
+    """
+    def __init__(self, font, color, antialias=True, chars="0123456789"):
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.glyphs = {}
+        self.height = font.get_height()
+        for char in chars:
+            self.glyph(char)
+
+    def glyph(self, char):
+        surface = self.glyphs.get(char)
+        if surface is None:
+            surface = self.glyphs[char] = self.font.render(char, self.antialias, self.color)
+        return surface
+
+    def size(self, text):
+        return sum(self.glyph(char).get_width() for char in text), self.height
+
+    def blit(self, surface, text, pos):
+        """Draw text at pos; returns the rect covered"""
+        x, y = pos
+        for char in text:
+            glyph = self.glyph(char)
+            surface.blit(glyph, (x, y))
+            x += glyph.get_width()
+        return pygame.Rect(pos, (x - pos[0], self.height))
+
+    def render(self, text):
+        """Text as a new transparent surface (for sprites that need an image)"""
+        image = pygame.Surface(self.size(text), pygame.SRCALPHA)
+        self.blit(image, text, (0, 0))
+        return image
+
+
+_text_cache = TextCache()
+_atlases = {}
+
+
+def render_text(font, text, color, antialias=True):
+    """Render text through the shared LRU cache"""
+    return _text_cache.render(font, text, color, antialias)
+
+
+def get_atlas(font, color, antialias=True):
+    """Shared GlyphAtlas for a font and colour"""
+    key = (font, tuple(color), antialias)
+    atlas = _atlases.get(key)
+    if atlas is None:
+        atlas = _atlases[key] = GlyphAtlas(font, color, antialias)
+    return atlas